@@ -0,0 +1,247 @@
+// Generated by scripts/image-placeholders.py from data/menu.ts. Do not edit by hand.
+
+export interface ImagePlaceholder {
+  width: number
+  height: number
+  color: string
+  blurhash: string
+  blurDataURL: string
+}
+
+export const IMAGE_PLACEHOLDERS: Record<string, ImagePlaceholder> = {
+  '/images/burgers/classic.jpg': {
+    width: 768,
+    height: 768,
+    color: '#acb3b8',
+    blurhash: 'LPK1E-^%P;EkxcM|NGe.K+R.H?%0',
+    blurDataURL: 'data:image/webp;base64,UklGRn4AAABXRUJQVlA4IHIAAABwAgCdASoQABAAA4BaJbACdFQAAy9CGZ5Fy44AAP38gj9Vye4mhVNT/Z6rVEm5vJRWoUhjjGO3CmFVRLDfBqMusbMU/ZuWgihf7Ke+iUmiOm10WeCJ7CYttbqVmfTOQ3749DRMQ+bVBQksT9JZwHiPzgA=',
+  },
+  '/images/burgers/classic-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#53585b',
+    blurhash: 'LKF;.q^$2c9wIVM|RQniBCSirXxZ',
+    blurDataURL: 'data:image/webp;base64,UklGRoAAAABXRUJQVlA4IHQAAADwAQCdASoQABAAA4BaJbACdADbWwVkhIAA/uXnhGhXd/cI+h+Bg807fUqpMzeWrVib4XVkqIAH/9uV9zfb3rXDnDVXf0MGWTWco+0pE12IYqDf4bVcpnSgGjuAlrNaOvQvth3HBJLoyXxvBxTZJD0XrjwAAA==',
+  },
+  '/images/burgers/burger-transparent-2.png': {
+    width: 600,
+    height: 600,
+    color: '#eaa757',
+    blurhash: 'LaNvJ9-m*JIqv~s:tRa#?cS4NHso',
+    blurDataURL: 'data:image/webp;base64,UklGRmIBAABXRUJQVlA4WAoAAAAQAAAADwAADwAAQUxQSLAAAAABgGJt2zLl+b5/sDoJbbYFkrW/YolJ6BZI2plJrAEaSXdAd3eoJH/lQb5/1hAREwBElCtrWzubU60IACKmbph8WUAMEVXSVE2NXEdEzm9j0r44Cmzwm4XCbYThffOU29V8iOj6dk+ojiHD6pMy7f6Sh/IprYDKw4DOA2rK7a0fE/mXsdBlpu2KUocKa7VXkqYiaiRHmlvaqw/GpFwv4n9L39BoZXJkoLsRIYSYoc4MAFZQOCCMAAAAUAIAnQEqEAAQAAOAWiWwAnS6ABCWFCQ/B+YIAP6QtpXgUrs/MvOoBxYz0JY8sfl5Q7NEpH/Zx48jg/rdIGBt/og9zPEgpHn6lrw7Y/KIpPMA9VttQW/hzMj68+k6Ynck/rhMZCQnuomaFpuJ/+P//rDCEHhiQYiB9Y8ZTpel59skzd/o3TRoouCboAA=',
+  },
+  '/images/burgers/double-trouble.jpg': {
+    width: 768,
+    height: 768,
+    color: '#bbc4c6',
+    blurhash: 'LSKKQP?FcuERo#M|WUocPBS5H?xY',
+    blurDataURL: 'data:image/webp;base64,UklGRoIAAABXRUJQVlA4IHYAAAAwAgCdASoQABAAA4BaJbACdFQAAzAru51QAAD+mnKwhw2Xh7Q1J6n+NAKqAFPTGW5fdQ5AC3EvtmUaE9ioWWodB5oBdCinpCwEjq9SKH1y2TihoDDh88SE6FT3MKjcacqFi+XtBrahHiYKCKKc6HB2HyCyAAAA',
+  },
+  '/images/burgers/double-trouble-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#4c5357',
+    blurhash: 'LEE.CE~A1*59D%M{NGoJ6UNfrW%1',
+    blurDataURL: 'data:image/webp;base64,UklGRnwAAABXRUJQVlA4IHAAAACQAgCdASoQABAAA4BaJbACdGaA2wAFwyn+qJP+AAD+6fPExjz8qWQRAxjL9kSkeq7qrJRuVknGhdJlk5Sy5Uhe1JYfiKpxtdxOv7PPaSpqtH/NonFArikWyM0F+eyxgIiKoFVscF3342/YhWDwAAAA',
+  },
+  '/images/burgers/burger-transparent-1.png': {
+    width: 600,
+    height: 600,
+    color: '#fbb606',
+    blurhash: 'LaNcG^?E*0ENv~soo}a}?wNINGs,',
+    blurDataURL: 'data:image/webp;base64,UklGRloBAABXRUJQVlA4WAoAAAAQAAAADwAADwAAQUxQSK4AAAABgCrJtmpnXbDvhRk1s2d2zByLltFyXDxZzheg59jo54L37XNW4J58Q0RMAOAA+f1Tk90FgA3ARsPFF0l+3bTAho1ZkkpEkdyEjTqK0Fc8jgC79GgU3sOqOFPaT6vQjuWgg8pPeAQHuS/aQAkPI3D+rLSJ9y4SDikGpduQVaYUTRzNvPQ80SaP26uvJLVIWBTJFScyc/72g/6hgwD+ppY2dnQ2VRdEA5Zlu/inYwFWUDgghgAAAHACAJ0BKhAAEAADgFolsAJ0ugAQkRdu0wZSxgAA/eLLC42yZbCn3Cx3rehTDxhmii/3Eq0xsXuZ3EAiRqd9vDAhar/u5UvyZXepLKx7CKmnrvgylolDxDhMwyRlGyUTA3Wf5L32Ak3n/+Fdbq9GBuxYZ2t5ePzFgM1/Wo87HxDr8qRtpUAA',
+  },
+  '/images/burgers/heatwave.jpg': {
+    width: 768,
+    height: 768,
+    color: '#d8d9d9',
+    blurhash: 'LUN0VX?aYkS$_3M{V[xaPqNHQ,sl',
+    blurDataURL: 'data:image/webp;base64,UklGRogAAABXRUJQVlA4IHwAAABwAgCdASoQABAAA4BaJbACdAYuHbHhLLEFeyg4AP7q4s/7zzqpbaKExhIVAoMPL7xMmpM1f78EsRNkf2p8Q8PlBt3V773otKlgyQw0xMgbST7qSOST1vyMRDAiqkGmAU/Tqbe8aCASCbyi5Py10aCBV1QZGm5wRaMluAAA',
+  },
+  '/images/burgers/heatwave-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#44484a',
+    blurhash: 'LNGHPB-o6AS5IVRjRjjF1OR.rqt5',
+    blurDataURL: 'data:image/webp;base64,UklGRoQAAABXRUJQVlA4IHgAAABQAgCdASoQABAAA4BaJbACdFQAuzMD7NDGUuQA/uyxWQpG1sN2F/b3APvbcqIHewDOgVhYcom4T4Fsk29gAJCUbWMm0AljoZtBofJmibOfMCL1dQvZZ3VFraooRjc4U+2ail4fWndl2NWWH/gvZiHnUUGGFRsNgAA=',
+  },
+  '/images/burgers/bbq-stack.jpg': {
+    width: 768,
+    height: 768,
+    color: '#75787a',
+    blurhash: 'LEFEv1^i7$10xvNGIpn%5=Sim+-T',
+    blurDataURL: 'data:image/webp;base64,UklGRm4AAABXRUJQVlA4IGIAAADQAQCdASoQABAAA4BaJbACdACXf8X6YAD+qYAAO4W6JQ6BtWkysiK+vbET0DXgMjXGvJ4FhFG72KKqsPLbt2DJ3QFYtYq/muAHrAxlfjOdbIYEBRhVIXPUBQs/fjX8VgAAAA==',
+  },
+  '/images/burgers/bbq-stack-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#44494b',
+    blurhash: 'LKEBZ{=_1i5TayR*NHsmAbSirrxF',
+    blurDataURL: 'data:image/webp;base64,UklGRnAAAABXRUJQVlA4IGQAAADQAQCdASoQABAAA4BaJbACdFQAA0/XEAD+6fPE4a9XYvlZywBrIclC57z+oTHsucW5BJPnittcZJ/Wx/uzbgrVSoHw/Cso2D8rxJjVMpd67R1mK8lKUf5A0T3/mQirZ0AXfsAA',
+  },
+  '/images/burgers/melt.jpg': {
+    width: 768,
+    height: 768,
+    color: '#acb4b6',
+    blurhash: 'LSKm;4?GT}ESWZM|RkaeKkNIMcxr',
+    blurDataURL: 'data:image/webp;base64,UklGRoYAAABXRUJQVlA4IHoAAABwAgCdASoQABAAA4BaJbACdFQAGeAOs7zBoQu4AP4FKmqUdqBiYK/1/OLq/uClgOqaQwot6Kpmj6NFvH1hv+YHFZpo+kanfNk/G0nUsx12bHguoM5yfamdByl1112A95JNpGy6AITKy1p8h7n1VlytKVzEhYCg6htAAA==',
+  },
+  '/images/burgers/melt-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#4c545a',
+    blurhash: 'LJHdpX?F1*R:9FIVIpRj1*S5vyxZ',
+    blurDataURL: 'data:image/webp;base64,UklGRoQAAABXRUJQVlA4IHgAAADwAQCdASoQABAAA4BaJbACdFQAAZvCqEAA/tzL7FmpOPIM0/C3o+gey2sXXHQjPmRCQr5mggYgqcErIvN89M6MC/1ta52EH/W3sBktvcIwvMYopwUgGkGoaAYD+JW8v1ZdnRdbZQjQDvDj8yg4Uv3FRgAPLfwGIAA=',
+  },
+  '/images/burgers/veggie.jpg': {
+    width: 768,
+    height: 768,
+    color: '#94979b',
+    blurhash: 'LLIXmZ?ZPqIuRTIoRRrsBXRnVDxs',
+    blurDataURL: 'data:image/webp;base64,UklGRoAAAABXRUJQVlA4IHQAAADwAQCdASoQABAAA4BaJbACdADvUuthPQAA4beCJLjSSwtnJBTzg8+vKhfOdrflUdnb4ewRNEukMOHFMCXGJSG99NgVC+s44ffrwP5lGibo7/uJWRlxEyyHpI0Y/SFmm8inXO8N1DLEsaqA21RRdQKhN0AAAA==',
+  },
+  '/images/burgers/veggie-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#464a4a',
+    blurhash: 'LIF#U8^%2d5TMyM|M{s91NNev|%0',
+    blurDataURL: 'data:image/webp;base64,UklGRoAAAABXRUJQVlA4IHQAAADwAQCdASoQABAAA4BaJbACdAYwxnK2JAAA/tzL8xJvB32ZMcnXYzxNQGK8/dSVzfka102rpPoMxHwiW30DoIM8P7HwQCEoJjJSmm4WDPC2DnI1V0081DI8AvTACSvKck4ZrR13ImOS4jX7CPA5skh2JBBgAA==',
+  },
+  '/images/burgers/special.jpg': {
+    width: 768,
+    height: 768,
+    color: '#d6d7d9',
+    blurhash: 'LYNJg]?ap{N{x]IoRPn%GaWYMJs,',
+    blurDataURL: 'data:image/webp;base64,UklGRm4AAABXRUJQVlA4IGIAAACQAgCdASoQABAAA4BaJbACdFQAA5a1HoSgMQ4OAAD+4YJ18yVN/p0wURTfexM8zCHChm6EFEXPofokyw4h7xlyx7yxb1Y1nlOLTTAKAytRtTMfOarpPADSNBRQMhRjJAAAAA==',
+  },
+  '/images/burgers/special-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#43494b',
+    blurhash: 'LPHdNk-o74SOD*RjRkWC1NS5m,oJ',
+    blurDataURL: 'data:image/webp;base64,UklGRoIAAABXRUJQVlA4IHYAAADwAQCdASoQABAAA4BaJbACdHMAArvucAAA/uyxWQpG1sNRc5TVcEoaq0Q6F1a5J0Fugbrcvt36RQ2ABzjDywIh7nVGq9uhgiuERTzi1brSa3ZJ96iSdOg4VWF8WWELkpz8LDDoDvs/lY1H+fJdvTfL+evIwAAA',
+  },
+  '/images/burgers/burger-transparent-3.png': {
+    width: 600,
+    height: 600,
+    color: '#f8a705',
+    blurhash: 'LeN9n3$|.mIrrXoLo}f8?vS5Rjs:',
+    blurDataURL: 'data:image/webp;base64,UklGRnYBAABXRUJQVlA4WAoAAAAQAAAADwAADwAAQUxQSLMAAAABgJpt27Llfr/nxV2Tu8saElmABahuDZJDc8iaHKq7uyQdQF95kPdjhoiYAICQ0rZ6eTxbEwsCQKh+ZedtJQiEKmZtrDGauQIkoi6NYqfiiwhggD/Z15qb8rC1PWNdmrtzkyhzkY1fF0BFR6xdlt8ihSca/TQPkgxFq5/iXqB2+J6Ny/LjRGwns9Lmr1afvJhY1n7M/5wBgOSOud2bh7vzjcmGWOEJCQAUIOHvSRIAIEgKAABWUDggnAAAANACAJ0BKhAAEAADgFolsAJ0ugCeAByP4vNDkb0KCDAA/lsREvFAKU6EvGpDPB5aviYiZiL9P9MX2o/qAxW4BOKmZi0qnXoRQOI+yRTgujWwmwXhsCsHHTc+/+ElpRevtefvFER8hXIWNR67+ZKBA4EF0l7r0Nhr51IwN+P/9cWgabSV795VSboCxMynhfgfsRWMtC8CYX/A6JtAAA==',
+  },
+  '/images/burgers/truffle.jpg': {
+    width: 768,
+    height: 768,
+    color: '#abb3b7',
+    blurhash: 'LKIN{q~BPq9xt9IVM{jFKjShI9%1',
+    blurDataURL: 'data:image/webp;base64,UklGRn4AAABXRUJQVlA4IHIAAAAQAgCdASoQABAAA4BaJbACdADwKAZaIOYAAOJd3DawH7VFvwnLKy8u7+i7w5ZhlsVXekZF5d70rsy7tl1zLPzZbuRURlh8aXuPd3vNTZE6SBndkBDyg1KjM/eBJOppFufXqBXPX3iG+P3XrFhfkeMFkAA=',
+  },
+  '/images/burgers/truffle-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#3c4447',
+    blurhash: 'LDD[,=~A1%5SR4M|E2Rk5qNxnM%1',
+    blurDataURL: 'data:image/webp;base64,UklGRngAAABXRUJQVlA4IGwAAABwAgCdASoQABAAA4BaJbACdGaAAsoEoyZcChIAAP7s1W1flWmalF7Oe8M/6/bRaN1/rQ9mEyCXbNujHbCdljHgMeUUtsk9f0l29LyUFiCG5/FVIm/Xy0cFrOSxDoqrY9IdObOW1QZoOhUWAAA=',
+  },
+  '/images/burgers/sweet-spicy.jpg': {
+    width: 768,
+    height: 768,
+    color: '#b7aba4',
+    blurhash: 'LNJ?{O~VGaNf?bR*V[nj7gIqicxW',
+    blurDataURL: 'data:image/webp;base64,UklGRngAAABXRUJQVlA4IGwAAAAQAgCdASoQABAAA4BaJbACdAEfgPLFVKQAAP5ZYxjlHjjDB9t7ATr16JO1PUPyqTfWnOV9KBYvRzPnzTa5hGzYHWNR6qUPFIhlKRG/txZRt80Seuj+sJNWRTnFGKWoIsplEyXzmop8wlUAAAA=',
+  },
+  '/images/burgers/sweet-spicy-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#43474b',
+    blurhash: 'LTG%}Y-n6TofE2R*e:WB10R-v}js',
+    blurDataURL: 'data:image/webp;base64,UklGRn4AAABXRUJQVlA4IHIAAAAwAgCdASoQABAAA4BaJbACdAD0sr1feUGrgAD+71zML9g+9ZfXeahlRrv4Ttf4yOGHiaTjYMbjfFoNBhs/hCipJR6PHSv6epHOyni6W1x6lF0/7KFgPes46uYcRNuG5OF0qd7aY9dYEz4nwKDKm1gUgAA=',
+  },
+  '/images/burgers/blue-smoke.jpg': {
+    width: 768,
+    height: 768,
+    color: '#060608',
+    blurhash: 'LKByBS-oAbI@VsR%NHae0#Nb#+xY',
+    blurDataURL: 'data:image/webp;base64,UklGRnAAAABXRUJQVlA4IGQAAABwAgCdASoQABAAA4BaJZACdH8IIABgVcN39RaAAP722v0uRW+REg5GRbqnN+WYaIrJXQNreNpy3iAf5D183nPa9ttIx3UU2VOU1mGmubBqEIJ/QnadrqXvBK/FQON+2gPPwQAA',
+  },
+  '/images/burgers/blue-smoke-cross.jpg': {
+    width: 768,
+    height: 768,
+    color: '#040508',
+    blurhash: 'LHCF6O%15nRkaxWVIpWC0$R-$foL',
+    blurDataURL: 'data:image/webp;base64,UklGRnYAAABXRUJQVlA4IGoAAABwAgCdASoQABAAA4BaJbACdGaAArjEPHs6VSgAAP727V5bWwsR8BUWesF8gztW9pJ/0+0UktF9PU8fT4jozC5zT+gBmcD5BA9imuz7yA9YKLayioopajgtU8b1sJLzkTcz6Jm/DPs//iAA',
+  },
+  '/images/sides/fries.jpg': {
+    width: 768,
+    height: 768,
+    color: '#e7e9e7',
+    blurhash: 'LWO:Ry?au6R.%LIoNes:PCofMcoc',
+    blurDataURL: 'data:image/webp;base64,UklGRmwAAABXRUJQVlA4IGAAAAAwAgCdASoQABAAA4BaJbACdAEPAi7CVyc4AAD+8APyghLoxS+PZEoz6RUy38KExkUHCLqR3XcA7K8NaXCre4NpRNDulE6Pex9zTYEUHrNDUFa6r1FdALSKztsnfrKsAAA=',
+  },
+  '/images/sides/loaded-fries.jpg': {
+    width: 768,
+    height: 768,
+    color: '#e5e8e9',
+    blurhash: 'LVOWHL_2ysNK-UIUR+t7PWf,H?s,',
+    blurDataURL: 'data:image/webp;base64,UklGRm4AAABXRUJQVlA4IGIAAACwAgCdASoQABAAA4BaJbACdH8IIABmTC5kfttR56AA/vAHhv2/TLgZ1WhH49tT6cz2E4sG1zkr2yHohBa9DWRMgh2S+S/jRWRWN9DTzCJ5DHnjkqjHuVncIi4Ax9cRINhAAA==',
+  },
+  '/images/sides/sweet-potato-fries.jpg': {
+    width: 768,
+    height: 768,
+    color: '#d7d9d7',
+    blurhash: 'LVOfu*?b*0WV#7IUOEt7c@ozH?jF',
+    blurDataURL: 'data:image/webp;base64,UklGRnwAAABXRUJQVlA4IHAAAABwAgCdASoQABAAA4BaJbACdH8AFxIUWOD++OIAAP7wCoeApjrge0Sr/9QOlPDPUk3xMZk7fsf5MmByub/qA87Jz8R8Kc5Bg277Fn5OxfdJgHg4k3QujyvNkR4JFubBDSdWh2h63G2jt7Z7v9KSAAAA',
+  },
+  '/images/sides/onion-rings.jpg': {
+    width: 768,
+    height: 768,
+    color: '#e7e8ea',
+    blurhash: 'LoP~m0-puPbcxuRjWYoeu5WXQ-oI',
+    blurDataURL: 'data:image/webp;base64,UklGRnYAAABXRUJQVlA4IGoAAABwAgCdASoQABAAA4BaJbACdHMAA1AqOEe/ZDcgAP70/cKbojvl3cCA4AJyrIul6ZhqnQkN5MDDt9xGYD4vi17Tx9XIVd8+T8/oES88hVLgDJx5urTCFMLclZT4TMU7MXqphOV1mtpHAAAA',
+  },
+  '/images/sides/mozz-sticks.jpg': {
+    width: 768,
+    height: 768,
+    color: '#e5e9eb',
+    blurhash: 'LiO:Ig-oysS$%MRjRjofuPS$R4n$',
+    blurDataURL: 'data:image/webp;base64,UklGRogAAABXRUJQVlA4IHwAAACwAgCdASoQABAAA4BaJbACdDiAByonT5G6dMhktwAA/vPso1uGVgG2ZPBVsl0DP57bvrfLP/l19gM35oOZ3x9KXFDN/AADIDzg4r6PJeNt+7XyeC/w/UC31Pp8rlDpBAyvN6aKLfAnYh/kC1SstLSPI/FX1aLuRcoZpcAA',
+  },
+  '/images/drinks/coca-cola.jpg': {
+    width: 768,
+    height: 768,
+    color: '#ccd3d6',
+    blurhash: 'LWL;sx%M?^azspRjM{j[bvofIAoe',
+    blurDataURL: 'data:image/webp;base64,UklGRlwAAABXRUJQVlA4IFAAAADQAQCdASoQABAAA4BaJQBdgB8ndpdMAAD+6EWuDsyRX1BQkuinizf5SGI2Kc06VY+JbRrCao8+W4cB4sYYTDiMdLy1BlA8Fk7qTDhKGHjQAA==',
+  },
+  '/images/drinks/sprite.jpg': {
+    width: 768,
+    height: 768,
+    color: '#17c868',
+    blurhash: 'LD7i+ny:BzTsx[oMR%fkDQS_vjnl',
+    blurDataURL: 'data:image/webp;base64,UklGRlgAAABXRUJQVlA4IEwAAADQAQCdASoQABAAA4BaJbACdACwngIOAAD8gAPlwfMHpY4S8YPDJZGLHRnmfhIKwrWqX2b4WpLpc1z/4aESL/3YYtf/pl/yfwdhAAAA',
+  },
+  '/images/drinks/fanta.jpg': {
+    width: 600,
+    height: 600,
+    color: '#f7f6f4',
+    blurhash: 'LuRe?Jx@ysaQtlWCVsodpJahVrov',
+    blurDataURL: 'data:image/webp;base64,UklGRm4AAABXRUJQVlA4IGIAAAAwAgCdASoQABAAA4BaJbACdDBUAZCBMK1tAAD+9w7ujJeoy0C+GJ6xO5ts2E/2XSNOpvQCqowdSQqM4owRwKZHVOteuZC896vdWVrxztjoksgbA84NlWPBhbsFVYlpkYAAAA==',
+  },
+  '/images/drinks/water-still.jpg': {
+    width: 768,
+    height: 768,
+    color: '#e5e6e9',
+    blurhash: 'L6Q0aS~q%3?c?HRjIUV[9Gt7M{f6',
+    blurDataURL: 'data:image/webp;base64,UklGRjAAAABXRUJQVlA4ICQAAAAwAQCdASoQABAAA4BaJaQAA3AA/vD1RzmeZ+jrtBGZksHAAAA=',
+  },
+  '/images/drinks/water-sparkling.jpg': {
+    width: 768,
+    height: 768,
+    color: '#d7dce3',
+    blurhash: 'LAO4J6?bx_?b^-a$E1R*0Lt7I9M|',
+    blurDataURL: 'data:image/webp;base64,UklGRlAAAABXRUJQVlA4IEQAAAAQAgCdASoQABAAA4BaJZwC7AEPDi3sHDcAAP7uHxABt0AjcVgMxEja1YAVZsUwV/5oL9KmMzqdiFIA58NgA9FW4MAAAA==',
+  },
+}
+
+export function getPlaceholder(path: string): ImagePlaceholder | undefined {
+  return IMAGE_PLACEHOLDERS[path]
+}
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the API-based generators
+Runs generate-pollinations-images.py, generate_hf_api.py and generate_hedged.py
+against local fake endpoints (fake_servers.py) under a set of latency/fault
+scenarios, and reports images/sec, p50/p95 job latency and peak memory for each
+
+Usage:
+    python3 scripts/bench_generators.py                         # every scenario
+    python3 scripts/bench_generators.py hf-cold-start pollinations-flaky
+    python3 scripts/bench_generators.py --save bench.json       # record a baseline
+    python3 scripts/bench_generators.py --compare bench.json    # exit 1 on a regression
+
+Each generator runs in its own process, in a scratch directory with a fresh
+cache, so nothing under public/images is touched
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_servers import HANDLERS, FakeServer
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Service -> (generator script, extra arguments)
+GENERATORS = {
+    'pollinations': ('generate-pollinations-images.py', []),
+    'hf': ('generate_hf_api.py', ['--max-attempts', '6', '--deadline', '120']),
+    'hedged': ('generate_hedged.py', ['--max-attempts', '6', '--deadline', '120', '--provider-state', 'providers.json']),
+}
+
+# How generate_hedged.py is pointed at each fake endpoint
+SERVICE_FLAGS = {'pollinations': '--pollinations-url', 'hf': '--hf-url'}
+
+# Latency specs and faults as understood by fake_servers.FakeServer
+SCENARIOS = {
+    'pollinations-steady': {'service': 'pollinations', 'latency': 'lognormal:0.4,0.3',
+                            'description': 'healthy service, ~0.4s median'},
+    'pollinations-long-tail': {'service': 'pollinations', 'latency': 'lognormal:0.4,1.0',
+                               'description': 'same median, heavy tail'},
+    'pollinations-flaky': {'service': 'pollinations', 'latency': 'lognormal:0.4,0.3', 'hang_rate': 0.1,
+                           'description': '10% of requests hang past the client timeout'},
+    'pollinations-large': {'service': 'pollinations', 'latency': '0.2', 'payload_kb': 4096,
+                           'description': '4MB images'},
+    'pollinations-bad-payloads': {'service': 'pollinations', 'latency': '0.2', 'bad_rate': 0.1,
+                                  'description': '10% of 200s are HTML error pages'},
+    'hf-warm': {'service': 'hf', 'latency': 'lognormal:0.5,0.3',
+                'description': 'model already loaded'},
+    'hf-cold-start': {'service': 'hf', 'latency': 'lognormal:0.5,0.3', 'loading': '0-4',
+                      'description': '503 model loading for the first 4s'},
+    'hf-flaky': {'service': 'hf', 'latency': 'lognormal:0.5,0.3', 'hang_rate': 0.1, 'loading': '0-2,8-10',
+                 'description': 'two loading phases and 10% timeouts'},
+    # 'servers' runs one fake endpoint per service for generate_hedged.py
+    'hedged-hanging-primary': {'service': 'hedged', 'description': 'fast HF with 15% hangs, steady Pollinations',
+                               'servers': {'pollinations': {'latency': 'lognormal:0.5,0.3'},
+                                           'hf': {'latency': 'lognormal:0.3,0.3', 'hang_rate': 0.15}}},
+    'hedged-cold-hf': {'service': 'hedged', 'description': 'HF is faster but loading for the first 4s',
+                       'servers': {'pollinations': {'latency': 'lognormal:0.6,0.3'},
+                                   'hf': {'latency': 'lognormal:0.3,0.3', 'loading': '0-4'}}},
+    'hedged-long-tail': {'service': 'hedged', 'description': 'both services with heavy tails',
+                         'servers': {'pollinations': {'latency': 'lognormal:0.4,1.0'},
+                                     'hf': {'latency': 'lognormal:0.4,1.0'}}},
+}
+
+# Relative change that counts as a regression in --compare
+DEFAULT_TOLERANCE = 0.25
+
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_scenario(name, scenario, concurrency, timeout, seed):
+    """Start the fake endpoint, run the generator against it, return its numbers"""
+    script, extra = GENERATORS[scenario['service']]
+    specs = scenario.get('servers') or {scenario['service']: scenario}
+    servers = {service: FakeServer(HANDLERS[service], latency=spec.get('latency', 0.0),
+                                   payload_bytes=spec.get('payload_kb') and spec['payload_kb'] * 1024,
+                                   loading=spec.get('loading'), hang_rate=spec.get('hang_rate', 0.0),
+                                   hang=timeout + 1, bad_rate=spec.get('bad_rate', 0.0), seed=seed).start()
+               for service, spec in specs.items()}
+    if 'servers' in scenario:
+        urls = [arg for service, server in servers.items() for arg in (SERVICE_FLAGS[service], server.url)]
+    else:
+        urls = ['--base-url', servers[scenario['service']].url]
+    try:
+        with tempfile.TemporaryDirectory(prefix=f'bench-{name}-') as workdir:
+            stats_file = os.path.join(workdir, 'stats.json')
+            log_file = os.path.join(workdir, 'output.log')
+            command = [sys.executable, os.path.join(SCRIPTS_DIR, script)] + urls + [
+                '--rate', '0', '--concurrency', str(concurrency),
+                '--timeout', str(timeout), '--force', '--no-dedupe',
+                '--cache-dir', os.path.join(workdir, 'cache'),
+                # Each generator saves its menu plan; keep it out of the repo's .cache
+                '--menu-state', os.path.join(workdir, 'menu-state.json'),
+                '--metrics-log', os.path.join(workdir, 'jobs.jsonl')] + extra
+            env = dict(os.environ, JOB_STATS_FILE=stats_file, PYTHONDONTWRITEBYTECODE='1')
+
+            started = time.perf_counter()
+            with open(log_file, 'w') as log:
+                process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+                # wait4 instead of wait(): it also hands back the child's resource usage
+                _, status, rusage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+            wall = time.perf_counter() - started
+
+            if process.returncode != 0 or not os.path.exists(stats_file):
+                with open(log_file) as log:
+                    tail = log.read()[-2000:]
+                raise RuntimeError(f"{script} exited with {process.returncode}:\n{tail}")
+            with open(stats_file) as f:
+                stats = json.load(f)
+    finally:
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+
+    return {
+        'ok': stats['ok'],
+        'failed': stats['failed'],
+        'images_per_sec': stats['images_per_sec'],
+        'p50': stats['p50'],
+        'p95': stats['p95'],
+        'retries': sum(job['attempts'] - 1 for job in stats['jobs']),
+        'requests': sum(server.requests for server in servers.values()),
+        'peak_rss_mb': peak_rss_mb(rusage),
+        'wall': wall,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Human-readable list of metrics that got worse than baseline by more than tolerance"""
+    found = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now['images_per_sec'] < before['images_per_sec'] * (1 - tolerance):
+            found.append(f"{name}: {before['images_per_sec']:.2f} -> {now['images_per_sec']:.2f} images/sec")
+        for metric, unit in (('p95', 's'), ('peak_rss_mb', 'MB')):
+            if now[metric] > before[metric] * (1 + tolerance):
+                found.append(f"{name}: {metric} {before[metric]:.1f} -> {now[metric]:.1f}{unit}")
+        if now['failed'] > before['failed']:
+            found.append(f"{name}: {before['failed']} -> {now['failed']} failed jobs")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--concurrency', type=int, default=4, help='generator --concurrency (default: 4)')
+    parser.add_argument('--timeout', type=float, default=2.0, help='generator --timeout in seconds (default: 2)')
+    parser.add_argument('--seed', type=int, default=1, help='seed for the fake servers, so runs are comparable')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON from --save; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'allowed relative slowdown before --compare fails (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--list', action='store_true', help='list scenarios and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, scenario in SCENARIOS.items():
+            print(f"  {name:<24} {scenario['description']}")
+        return
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    names = args.scenarios or list(SCENARIOS)
+
+    print(f"\n⏱  Generator benchmark: {len(names)} scenarios, concurrency {args.concurrency}, "
+          f"client timeout {args.timeout:g}s\n")
+    print(f"  {'scenario':<24} {'ok':>4} {'fail':>4} {'img/s':>7} {'p50':>6} {'p95':>6} "
+          f"{'retries':>7} {'reqs':>5} {'peak RSS':>9}")
+    results = {}
+    for name in names:
+        result = run_scenario(name, SCENARIOS[name], args.concurrency, args.timeout, args.seed)
+        results[name] = result
+        print(f"  {name:<24} {result['ok']:>4} {result['failed']:>4} {result['images_per_sec']:>7.2f} "
+              f"{result['p50']:>5.2f}s {result['p95']:>5.2f}s {result['retries']:>7} {result['requests']:>5} "
+              f"{result['peak_rss_mb']:>7.1f}MB")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📝 Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        print()
+        if found:
+            print(f"❌ Regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for line in found:
+                print(f"   • {line}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare}")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Startup-time guard for scripts/generate.py
+Times --list and --dry-run for every backend and fails (exit 1) if any adds more
+than the budget on top of a bare interpreter start, or pulls in a heavy dependency
+
+Usage:
+    python3 scripts/bench_startup.py [--budget-ms 200] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+GENERATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate.py')
+BACKENDS = ['pollinations', 'hf-api', 'hedged', 'diffusers', 'quick']
+MODES = ['--list', '--dry-run']
+
+# Any of these showing up means a heavy import leaked back to module level
+HEAVY_MODULES = ('torch', 'diffusers', 'transformers', 'PIL', 'numpy', 'requests')
+
+
+def run_once(args):
+    started = time.perf_counter()
+    subprocess.run([sys.executable] + args, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def median_ms(args, runs):
+    return statistics.median(run_once(args) for _ in range(runs))
+
+
+def import_profile(args):
+    """(module, cumulative microseconds) for every import, via python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        imports.append((name, int(cumulative)))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=200.0)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    # Interpreter start-up (site-packages .pth files etc.) is outside our control, so it is
+    # measured once and the budget applies to what generate.py adds on top
+    baseline = median_ms(['-c', 'pass'], args.runs)
+    startup_modules = {name for name, _ in import_profile(['-c', 'pass'])}
+
+    failures = []
+    print(f"\n⏱  generate.py startup (median of {args.runs} runs, budget {args.budget_ms:.0f}ms "
+          f"over a {baseline:.0f}ms bare interpreter)\n")
+    for backend in BACKENDS:
+        for mode in MODES:
+            command = [backend, mode]
+            median = median_ms([GENERATE] + command, args.runs) - baseline
+
+            imports = [(name, us) for name, us in import_profile([GENERATE] + command)
+                       if name not in startup_modules]
+            heavy = sorted({name.split('.')[0] for name, _ in imports if name.split('.')[0] in HEAVY_MODULES})
+            slowest = sorted(imports, key=lambda item: item[1], reverse=True)[:3]
+
+            ok = median <= args.budget_ms and not heavy
+            print(f"  {'✓' if ok else '✗'} {backend:<13} {mode:<10} +{median:5.1f}ms   "
+                  f"slowest imports: {', '.join(f'{n} {us / 1000:.0f}ms' for n, us in slowest)}")
+            if heavy:
+                print(f"      heavy modules imported: {', '.join(heavy)}")
+            if not ok:
+                failures.append(f"{backend} {mode}")
+
+    print()
+    if failures:
+        print(f"❌ Over budget: {', '.join(failures)}\n")
+        sys.exit(1)
+    print("✅ All backends start within budget\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Cross-section views derived from the normal view instead of generated from scratch
+The normal view is generated with a fixed seed and its final latents are kept;
+the cross-section is an img2img pass over those latents with the cross prompt
+that runs only `strength` of the steps. The two views share composition and
+lighting, and a pair costs about 1 + strength generations instead of 2
+
+Seeds come from the prompts. Latents and the settings of every derived view are
+stored under .cache/latents, so either view can be regenerated on its own. Paired
+views are never re-rolled on their own (a new seed would break that link); a
+near-duplicate is reported and kept
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+from gen_cache import atomic_write, cache_key
+from prompt_embeds import prompt_args
+from telemetry import timed_pipe
+
+LATENT_DIR = os.path.join(os.path.dirname(__file__), '../.cache/latents')
+
+# Fraction of the denoising schedule the cross-section re-runs: lower keeps more
+# of the normal view, higher lets the cross prompt change more
+DEFAULT_STRENGTH = 0.55
+
+
+def view_seed(prompt):
+    """Deterministic seed for a prompt, so a view comes out the same on every run"""
+    return int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def find_pairs(jobs):
+    """[(normal, cross)] for jobs tagged with the same 'pair' id and a 'view'"""
+    views = {}
+    for job in jobs:
+        if job.get('pair'):
+            views.setdefault(job['pair'], {})[job['view']] = job
+    return [(v['normal'], v['cross']) for v in views.values() if 'normal' in v and 'cross' in v]
+
+
+def derive_keys(jobs, key, strength=DEFAULT_STRENGTH):
+    """
+    Seed every paired view and re-key it by how it is now made
+    key(job, seed) is the script's own cache key function. A cross-section's key
+    also covers its source's key and the strength, so changing either regenerates it
+    """
+    for normal, cross in find_pairs(jobs):
+        normal['seed'] = view_seed(normal['prompt'])
+        normal['key'] = key(normal, normal['seed'])
+        cross['seed'] = view_seed(cross['prompt'])
+        cross['key'] = cache_key(key(cross, cross['seed']), 'img2img', {'from': normal['key'], 'strength': strength})
+        # The two views are meant to resemble each other; the dedupe check allows it either way
+        cross['derived_from'] = [normal['path']]
+        normal['derived_from'] = [cross['path']]
+
+
+def plan_pairs(all_jobs, pending):
+    """
+    Split pending jobs into pair work and the rest
+    Returns ([{'normal', 'cross', 'normal_pending', 'cross_pending'}], other pending jobs)
+    """
+    pending_ids = {id(job) for job in pending}
+    pairs, paired = [], set()
+    for normal, cross in find_pairs(all_jobs):
+        if id(normal) in pending_ids or id(cross) in pending_ids:
+            pairs.append({'normal': normal, 'cross': cross,
+                          'normal_pending': id(normal) in pending_ids, 'cross_pending': id(cross) in pending_ids})
+            paired.update((id(normal), id(cross)))
+    return pairs, [job for job in pending if id(job) not in paired]
+
+
+def img2img_for(pipe):
+    """An img2img pipeline sharing pipe's loaded modules (no extra weights in memory)"""
+    from diffusers import StableDiffusionImg2ImgPipeline
+
+    components = dict(pipe.components, safety_checker=None, requires_safety_checker=False)
+    img2img = StableDiffusionImg2ImgPipeline(**components)
+    img2img.set_progress_bar_config(disable=True)
+    return img2img
+
+
+class LatentStore:
+    """Final latents of seeded normal views, plus a JSON record of how each view was made"""
+
+    def __init__(self, root=LATENT_DIR):
+        self.root = root
+
+    def path(self, key, ext):
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def record(self, key, meta):
+        atomic_write(self.path(key, '.json'), (json.dumps(meta, indent=1, sort_keys=True) + '\n').encode('utf-8'))
+
+    def save(self, key, latents, meta):
+        import numpy as np
+
+        buffer = io.BytesIO()
+        np.save(buffer, latents.detach().float().cpu().numpy())
+        atomic_write(self.path(key, '.npy'), buffer.getvalue())
+        self.record(key, meta)
+
+    def load(self, key, device, dtype):
+        """[1, 4, h/8, w/8] latents for key, or None"""
+        import numpy as np
+        import torch
+
+        try:
+            array = np.load(self.path(key, '.npy'))
+        except (FileNotFoundError, ValueError):
+            return None
+        return torch.from_numpy(array).to(device, dtype)
+
+
+def _generators(seeds):
+    import torch
+
+    return [torch.Generator('cpu').manual_seed(int(seed)) for seed in seeds]
+
+
+def decode_latents(pipe, latents):
+    import torch
+
+    with torch.no_grad():
+        images = pipe.vae.decode(latents / pipe.vae.config.scaling_factor, return_dict=False)[0]
+    return pipe.image_processor.postprocess(images, output_type='pil')
+
+
+def generate_pairs(pipe, img2img, pairs, params, strength, store, embeddings=None, trace_for=None):
+    """
+    Generate the pending views of a chunk of pairs; returns [(job, image)]
+    Normal views run as one seeded txt2img batch (also when only the cross-section
+    is pending but its source latents were never stored); cross-sections then run
+    as one img2img batch over those latents
+    """
+    import torch
+
+    trace_for = trace_for or (lambda job: None)
+    device, dtype = pipe.unet.device, pipe.unet.dtype
+    latents = {}
+    for pair in pairs:
+        if not pair['normal_pending']:
+            stored = store.load(pair['normal']['key'], device, dtype)
+            if stored is not None:
+                latents[pair['normal']['key']] = stored
+
+    results = []
+    sources = [pair for pair in pairs if pair['normal']['key'] not in latents]
+    if sources:
+        normals = [pair['normal'] for pair in sources]
+        traces = [trace_for(job) for job in normals]
+        batch = timed_pipe(pipe, traces, **prompt_args(embeddings, [job['prompt'] for job in normals]),
+                           generator=_generators(job['seed'] for job in normals), output_type='latent', **params).images
+        started = time.perf_counter()
+        images = decode_latents(pipe, batch)
+        for trace in traces:
+            if trace is not None:
+                trace.add('decode', (time.perf_counter() - started) / len(traces))
+        for pair, job, image, job_latents in zip(sources, normals, images, batch):
+            latents[job['key']] = job_latents[None]
+            store.save(job['key'], job_latents[None], {'prompt': job['prompt'], 'seed': job['seed'], 'params': params})
+            if pair['normal_pending']:
+                results.append((job, image))
+
+    crosses = [pair for pair in pairs if pair['cross_pending']]
+    if crosses:
+        jobs = [pair['cross'] for pair in crosses]
+        # img2img takes its size from the latents
+        cross_params = {k: v for k, v in params.items() if k not in ('height', 'width')}
+        images = timed_pipe(img2img, [trace_for(job) for job in jobs], **prompt_args(embeddings, [job['prompt'] for job in jobs]),
+                            image=torch.cat([latents[pair['normal']['key']] for pair in crosses]), strength=strength,
+                            generator=_generators(job['seed'] for job in jobs), **cross_params).images
+        for pair, job, image in zip(crosses, jobs, images):
+            store.record(job['key'], {'prompt': job['prompt'], 'seed': job['seed'], 'params': cross_params,
+                                      'strength': strength, 'from': pair['normal']['key']})
+            results.append((job, image))
+    return results
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP plumbing for the API-based generators
+One keep-alive connection pool per process, and downloads that stream to a
+temp file and are renamed into place only once complete and fsynced, so a
+failed download never replaces an image the site is serving
+"""
+
+import os
+import tempfile
+import threading
+
+from gen_cache import FILE_MODE
+
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=16):
+    """Process-wide requests.Session; pool_size is fixed by the first call"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # Retries are the caller's business; the adapter only pools connections
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def fsync_dir(directory):
+    """Persist a rename: fsync the directory entry (no-op where unsupported)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def stream_to_file(response, dest, chunk_size=CHUNK_SIZE):
+    """
+    Stream a requests response body to dest atomically
+    Memory use is one chunk regardless of image size; returns the bytes written
+    Raises IOError on an empty or truncated body, leaving dest untouched
+    """
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.part')
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                written += len(chunk)
+
+            # Content-Length counts encoded bytes, so it only checks identity bodies
+            expected = response.headers.get('Content-Length')
+            if expected is not None and 'Content-Encoding' not in response.headers and int(expected) != written:
+                raise IOError(f"truncated download: {written} of {expected} bytes")
+            if written == 0:
+                raise IOError("empty response body")
+
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, dest)
+        fsync_dir(directory)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return written
+
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Local stand-in servers for the image generation endpoints
+Lets the generators be exercised and benchmarked offline, without hitting the real services
+
+Usage:
+    python3 scripts/fake_servers.py pollinations --port 8765 --latency 0.5
+    POLLINATIONS_URL=http://127.0.0.1:8765 python3 scripts/generate-pollinations-images.py
+
+    python3 scripts/fake_servers.py hf --port 8766 --latency lognormal:1.5,0.4 --loading 0-20 --hang-rate 0.05
+    HF_API_BASE=http://127.0.0.1:8766 python3 scripts/generate_hf_api.py
+
+Latency specs: 0.5 (fixed), uniform:LO,HI, normal:MEAN,SD, lognormal:MEDIAN,SIGMA, exp:MEAN
+--loading 0-20,60-70 answers 503 "model loading" (with estimated_time) during
+those windows, in seconds since the first request; --hang-rate makes that
+fraction of requests stall for --hang seconds without answering, to trip client timeouts;
+--bad-rate answers that fraction with a 200 whose body is an HTML error page
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Any real JPEG from the site works as the canned response body
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), '../public/images/burgers/classic.jpg')
+# What a misbehaving CDN or proxy sends with a 200 and an image content type
+BAD_PAYLOAD = b'<!DOCTYPE html><html><body><h1>502 Bad Gateway</h1></body></html>'
+
+
+class Latency:
+    """A response-time distribution parsed from a spec like 'lognormal:1.5,0.4'"""
+
+    KINDS = {
+        'fixed': lambda rng, value: value,
+        'uniform': lambda rng, lo, hi: rng.uniform(lo, hi),
+        'normal': lambda rng, mean, sd: rng.gauss(mean, sd),
+        'lognormal': lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma),
+        'exp': lambda rng, mean: rng.expovariate(1 / mean),
+    }
+
+    def __init__(self, spec=0.0, seed=None):
+        self.spec = str(spec)
+        kind, _, args = self.spec.partition(':')
+        if not args:
+            kind, args = 'fixed', kind
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown latency distribution {kind!r} (use {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.args = [float(a) for a in args.split(',')]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        with self.lock:
+            return max(0.0, self.KINDS[self.kind](self.rng, *self.args))
+
+
+def parse_phases(spec):
+    """'0-20,60-70' -> [(0.0, 20.0), (60.0, 70.0)]"""
+    phases = []
+    for part in filter(None, (spec or '').split(',')):
+        start, _, end = part.partition('-')
+        phases.append((float(start), float(end)))
+    return phases
+
+
+def make_payload(path=SAMPLE_IMAGE, size=None):
+    """
+    The sample image, padded after its end marker to `size` bytes when given
+    Decoders ignore trailing bytes, so any size still reads as a valid image
+    """
+    with open(path, 'rb') as f:
+        body = f.read()
+    if size and size > len(body):
+        body += b'\0' * (size - len(body))
+    return body
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Shared behaviour: latency, hangs, loading phases and the image response"""
+
+    def respond(self):
+        server = self.server
+        elapsed = server.record_request()
+
+        if server.should_hang():
+            # Say nothing until the client gives up, then drop the connection
+            time.sleep(server.hang)
+            self.close_connection = True
+            return
+
+        remaining = server.loading_remaining(elapsed)
+        if remaining is not None:
+            self.send_loading(remaining)
+            return
+
+        time.sleep(server.latency.sample())
+        body = BAD_PAYLOAD if server.should_send_bad() else server.payload
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_loading(self, remaining):
+        self.send_error(503)
+
+    def log_message(self, format, *args):
+        # Keep the generator output readable
+        pass
+
+
+class PollinationsHandler(FakeHandler):
+    """Mimics GET image.pollinations.ai/prompt/<prompt>?width=..&height=..&model=.."""
+
+    def do_GET(self):
+        if not self.path.startswith('/prompt/'):
+            self.send_error(404)
+            return
+        self.respond()
+
+
+class HFHandler(FakeHandler):
+    """Mimics POST api-inference.huggingface.co/models/<model> with a JSON {"inputs": prompt} body"""
+
+    def do_POST(self):
+        if not self.path.startswith('/models/'):
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            json.loads(self.rfile.read(length) or b'{}')['inputs']
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {'error': 'expected a JSON body with "inputs"'})
+            return
+        self.respond()
+
+    def send_loading(self, remaining):
+        model = self.path[len('/models/'):]
+        self.send_json(503, {'error': f'Model {model} is currently loading', 'estimated_time': round(remaining, 1)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeServer(ThreadingHTTPServer):
+    """Threaded HTTP server that serves a canned image with configurable latency and faults"""
+
+    daemon_threads = True
+
+    def __init__(self, handler, port=0, latency=0.0, payload_path=SAMPLE_IMAGE, payload_bytes=None,
+                 loading=None, hang_rate=0.0, hang=120.0, bad_rate=0.0, seed=None):
+        super().__init__(('127.0.0.1', port), handler)
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency, seed)
+        self.payload = make_payload(payload_path, payload_bytes)
+        self.loading = parse_phases(loading) if isinstance(loading, str) else list(loading or [])
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.bad_rate = bad_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.first_request = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record_request(self):
+        """Count a request; returns seconds since the first one (phases are timed from there)"""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.first_request is None:
+                self.first_request = now
+            return now - self.first_request
+
+    def should_hang(self):
+        with self._lock:
+            return self.hang_rate > 0 and self.rng.random() < self.hang_rate
+
+    def should_send_bad(self):
+        with self._lock:
+            return self.bad_rate > 0 and self.rng.random() < self.bad_rate
+
+    def loading_remaining(self, elapsed):
+        """Seconds left in the loading phase covering `elapsed`, or None when the model is up"""
+        for start, end in self.loading:
+            if start <= elapsed < end:
+                return end - elapsed
+        return None
+
+    def handle_error(self, request, client_address):
+        # A client that timed out mid-response is expected here, not a server fault
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        """Serve from a background thread and return self"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+HANDLERS = {
+    'pollinations': PollinationsHandler,
+    'hf': HFHandler,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('service', choices=sorted(HANDLERS))
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='0', help='seconds before answering, fixed or a distribution spec')
+    parser.add_argument('--payload', default=SAMPLE_IMAGE, help='file served as the generated image')
+    parser.add_argument('--payload-kb', type=int, default=None, help='pad the image to this many KB')
+    parser.add_argument('--loading', default='', help='503 "model loading" windows, e.g. 0-20,60-70 (seconds)')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fraction of requests that never answer')
+    parser.add_argument('--hang', type=float, default=120.0, help='how long a hung request stalls (seconds)')
+    parser.add_argument('--bad-rate', type=float, default=0.0, help='fraction of 200s that carry an HTML page, not an image')
+    parser.add_argument('--seed', type=int, default=None, help='seed for latency sampling and hangs')
+    args = parser.parse_args()
+
+    server = FakeServer(HANDLERS[args.service], args.port, args.latency, args.payload,
+                        args.payload_kb and args.payload_kb * 1024, args.loading, args.hang_rate, args.hang, args.bad_rate, args.seed)
+    print(f"🧪 Fake {args.service} endpoint listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for generated images
+Keyed by a hash of (prompt, model, params, seed) so unchanged menu items are never regenerated
+Entries live under .cache/generated and are evicted least-recently-used past a size limit
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+CACHE_DIR = os.environ.get('GEN_CACHE_DIR', os.path.join(os.path.dirname(__file__), '../.cache/generated'))
+DEFAULT_MAX_MB = 1024
+
+
+def _file_mode():
+    # mkstemp creates 0600 files; published images must stay readable by the web server
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = _file_mode()
+
+
+def cache_key(prompt, model, params=None, seed=None):
+    """Stable hash of everything that determines the generated image"""
+    blob = json.dumps(
+        {'prompt': prompt, 'model': model, 'params': params or {}, 'seed': seed},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def atomic_write(dest, data):
+    """Write bytes to dest via a fsynced temp file + rename, never through an existing hard link"""
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def link_or_copy(src, dest):
+    """Point dest at src's bytes: hard link when possible, copy otherwise (atomic either way)"""
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        return
+    tmp = os.path.join(directory, f".tmp-{os.getpid()}-{os.path.basename(dest)}")
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        # Cross-device or a filesystem without hard links
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+class GenerationCache:
+    """On-disk image cache with size-bounded LRU eviction (recency tracked via mtime)"""
+
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def lookup(self, key):
+        """Path of the cached image for key, or None; a hit refreshes its LRU position"""
+        path = self.entry_path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def restore(self, key, dest):
+        """Materialise a cached image at dest; returns False on a miss"""
+        path = self.lookup(key)
+        if path is None:
+            return False
+        link_or_copy(path, dest)
+        return True
+
+    def store(self, key, data):
+        """Add image bytes to the cache and return the entry path"""
+        path = self.entry_path(key)
+        atomic_write(path, data)
+        return path
+
+    def publish(self, key, dest):
+        """Materialise a freshly written entry at dest, then trim the cache around it"""
+        path = self.entry_path(key)
+        link_or_copy(path, dest)
+        self.evict(keep=path)
+
+    def adopt(self, key, path):
+        """Make the image now at path the entry for key (e.g. a re-roll accepted in its place)"""
+        link_or_copy(path, self.entry_path(key))
+
+    def put(self, key, data, dest):
+        """Store image bytes and materialise them at dest"""
+        self.store(key, data)
+        self.publish(key, dest)
+
+    def entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    st = entry.stat()
+                    found.append((st.st_mtime, st.st_size, entry.path))
+        return found
+
+    def evict(self, keep=None):
+        """Drop least-recently-used entries (except keep) until the cache fits in max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def add_cache_args(parser):
+    """Command-line flags shared by every generator"""
+    parser.add_argument('--force', action='store_true', help='regenerate even when a cached image exists')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='generation cache directory (default: .cache/generated)')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_MB, help=f'cache size limit in MB (default: {DEFAULT_MAX_MB})')
+
+
+def cache_from_args(args):
+    return GenerationCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+
+def restore_cached(jobs, cache, force=False):
+    """
+    Materialise every cached job at its output path
+    Jobs need 'key' and 'path'; returns the jobs that still have to be generated
+    Jobs marked 'stale' (see menu_plan.py) are never restored
+    """
+    if force:
+        return list(jobs)
+    pending = []
+    for job in jobs:
+        if not job.get('stale') and cache.restore(job['key'], job['path']):
+            print(f"  ♻️  Cached: {os.path.basename(job['path'])}")
+        else:
+            pending.append(job)
+    return pending
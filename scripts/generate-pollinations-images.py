@@ -5,12 +5,32 @@ Uses the same method that worked perfectly for AhkiCafe
 Free, no API key required, generates high-quality food photography
 """
 
-import requests
+import argparse
 import os
-import time
 from urllib.parse import quote
 from pathlib import Path
 
+from downloads import get_session, stream_to_file
+from gen_cache import add_cache_args, cache_from_args, cache_key, restore_cached
+from image_finish import ImageRejected, finish_download, staging_path
+from menu_data import load_menu_items
+from menu_plan import add_menu_args, plan_from_args
+from phash_index import add_dedupe_args, ensure_unique, index_from_args
+from telemetry import add_telemetry_args, telemetry_from_args, timed
+
+# Point at a local stand-in (scripts/fake_servers.py) to test without the real service
+POLLINATIONS_URL = os.environ.get('POLLINATIONS_URL', 'https://image.pollinations.ai')
+
+MODEL = "flux"
+REQUEST_TIMEOUT = 60  # Seconds; generation takes a while on the real service
+IMAGE_PARAMS = {
+    "width": 1024,
+    "height": 1024,
+    "model": MODEL,
+    "enhance": "true",
+    "nologo": "true"
+}
+
 # Create image directories
 dirs = {
     'burgers': './public/images/burgers',
@@ -18,78 +38,9 @@ dirs = {
     'drinks': './public/images/drinks',
 }
 
-for dir_path in dirs.values():
-    Path(dir_path).mkdir(parents=True, exist_ok=True)
-
-# Menu items with descriptions
-burgers = [
-    {
-        'id': 'classic',
-        'name': 'The Ahkii Classic',
-        'description': 'Angus beef patty, cheese, Ahkii sauce, lettuce, tomato, onions',
-    },
-    {
-        'id': 'double-trouble',
-        'name': 'The Double Trouble',
-        'description': 'Double patty, double cheese, caramelised onions',
-    },
-    {
-        'id': 'heatwave',
-        'name': 'The Heatwave',
-        'description': 'Jalapeños, spicy Ahkii sauce, pepperjack cheese, crispy onions',
-    },
-    {
-        'id': 'bbq-stack',
-        'name': 'The BBQ Stack',
-        'description': 'Angus patty, smoky BBQ sauce, crispy onions, cheddar cheese',
-    },
-    {
-        'id': 'melt',
-        'name': 'The Melt',
-        'description': 'Angus patty smothered in cheese sauce, pickles, Ahkii sauce',
-    },
-    {
-        'id': 'veggie',
-        'name': 'The Veggie Way',
-        'description': 'Grilled plant-based patty, vegan cheese, lettuce, tomato, Ahkii sauce',
-    },
-    {
-        'id': 'special',
-        'name': 'The Ahkii Special',
-        'description': 'Signature sauce, crispy fried onions, melted cheese blend',
-    },
-    {
-        'id': 'truffle',
-        'name': 'The Truffle Boss',
-        'description': 'Angus patty, truffle mayo, caramelised onions, Swiss cheese',
-    },
-    {
-        'id': 'sweet-spicy',
-        'name': 'The Sweet & Spicy',
-        'description': 'Hot honey glaze, jalapeños, cheddar, Ahkii sauce',
-    },
-    {
-        'id': 'blue-smoke',
-        'name': 'The Blue Smoke',
-        'description': 'Blue cheese, crispy onions, BBQ glaze',
-    },
-]
-
-sides = [
-    {'id': 'fries', 'name': 'Regular Fries', 'description': 'Crispy golden fries seasoned to perfection'},
-    {'id': 'loaded-fries', 'name': 'Loaded Fries', 'description': 'Fries topped with melted cheese and Ahkii sauce'},
-    {'id': 'sweet-potato-fries', 'name': 'Sweet Potato Fries', 'description': 'Sweet potato fries with a crispy exterior'},
-    {'id': 'onion-rings', 'name': 'Onion Rings', 'description': 'Golden fried onion rings, crispy and delicious'},
-    {'id': 'mozz-sticks', 'name': 'Mozz Sticks', 'description': 'Deep-fried mozzarella sticks with a crispy coating'},
-]
-
-drinks = [
-    {'id': 'coca-cola', 'name': 'Coca-Cola', 'description': 'Ice-cold Coca-Cola, 330ml'},
-    {'id': 'sprite', 'name': 'Sprite', 'description': 'Refreshing Sprite, 330ml'},
-    {'id': 'fanta', 'name': 'Fanta', 'description': 'Fanta assorted flavours, 330ml'},
-    {'id': 'water-still', 'name': 'Still Water', 'description': 'Pure still water, 500ml'},
-    {'id': 'water-sparkling', 'name': 'Sparkling Water', 'description': 'Refreshing sparkling water, 500ml'},
-]
+def make_dirs():
+    for dir_path in dirs.values():
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
 
 def create_prompt(item_name, description, is_cross_section=False):
     """Create optimized prompt for realistic food photography"""
@@ -99,110 +50,167 @@ def create_prompt(item_name, description, is_cross_section=False):
         prompt = f"{item_name}, {description}, professional food photography, studio lighting, high quality, ultra realistic, appetizing, commercial photography, 4k, centered composition, clean background"
     return prompt
 
-def generate_image(item_name, description, filepath, is_cross_section=False):
-    """Generate and download image using Pollinations AI"""
+def generate_image(item_name, description, filepath, is_cross_section=False, base_url=POLLINATIONS_URL, cache=None, seed=None,
+                   timeout=REQUEST_TIMEOUT, trace=None, finish=True):
+    """
+    Generate and download image using Pollinations AI (seed picks a specific variation)
+    The download is staged next to filepath, then decoded, validated and re-encoded
+    within budget (image_finish.py); finish=False leaves it staged for the caller
+    trace (telemetry.JobTrace) collects request/download timings, bytes and errors
+    """
+    import requests
+
     prompt = create_prompt(item_name, description, is_cross_section)
 
     # Create URL with encoded prompt
-    url = f"https://image.pollinations.ai/prompt/{quote(prompt)}"
-    params = {
-        "width": 1024,
-        "height": 1024,
-        "model": "flux",
-        "enhance": "true",
-        "nologo": "true"
-    }
+    url = f"{base_url}/prompt/{quote(prompt)}"
+    params = IMAGE_PARAMS if seed is None else dict(IMAGE_PARAMS, seed=seed)
+    name = os.path.basename(filepath)
 
     try:
-        print(f"  Generating: {os.path.basename(filepath)}...")
-
-        # Download image
-        response = requests.get(url, params=params, timeout=60)
-        response.raise_for_status()
-
-        # Save image
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-
-        print(f"  ✅ Saved")
+        print(f"  Generating: {name}...")
+
+        # Stream the image over the shared keep-alive pool; the live file is only
+        # replaced once the finished image is ready (through the cache when enabled)
+        with timed(trace, 'request'):
+            response = get_session().get(url, params=params, timeout=timeout, stream=True)
+        with response:
+            response.raise_for_status()
+            with timed(trace, 'download'):
+                written = stream_to_file(response, staging_path(filepath))
+        if trace is not None:
+            trace.add_bytes(written)
+
+        if finish:
+            finish_download(staging_path(filepath), filepath, cache, cache_key(prompt, MODEL, IMAGE_PARAMS, seed), trace)
         return True
 
+    except ImageRejected as e:
+        print(f"  ❌ {name}: Rejected, {e}")
+        if trace is not None:
+            trace.error = f"rejected: {e}"
+        return False
     except requests.exceptions.Timeout:
-        print(f"  ❌ Timeout (generation takes a moment, try again)")
+        print(f"  ❌ {name}: Timeout (generation takes a moment, try again)")
+        if trace is not None:
+            trace.count('timeouts')
+            trace.error = 'timeout'
         return False
     except Exception as e:
-        print(f"  ❌ Error: {str(e)[:80]}")
+        print(f"  ❌ {name}: Error: {str(e)[:80]}")
+        if trace is not None:
+            trace.error = str(e)[:200]
         return False
 
+def build_jobs():
+    """
+    Every image data/menu.ts references: burgers (normal + cross-section), sides, drinks
+    Prompts are built from the menu's own names and descriptions, so a menu edit changes the prompt
+    """
+    jobs = []
+    for item in load_menu_items():
+        for field, is_cross_section in (('image', False), ('crossSectionImage', True)):
+            if not item.get(field):
+                continue
+            jobs.append({
+                'label': os.path.basename(item[field]),
+                'name': item['name'],
+                'description': item['description'],
+                'path': os.path.join('./public', item[field].lstrip('/')),
+                'is_cross_section': is_cross_section,
+            })
+    for job in jobs:
+        job['key'] = cache_key(create_prompt(job['name'], job['description'], job['is_cross_section']), MODEL, IMAGE_PARAMS)
+    return jobs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate menu images with Pollinations AI")
+    parser.add_argument('--concurrency', type=int, default=4, help='requests in flight at once (default: 4)')
+    parser.add_argument('--rate', type=float, default=1.0, help='average requests per second, 0 = unlimited (default: 1.0)')
+    parser.add_argument('--burst', type=int, default=2, help='requests allowed back-to-back before rate limiting (default: 2)')
+    parser.add_argument('--base-url', default=POLLINATIONS_URL, help='Pollinations endpoint (default: $POLLINATIONS_URL or the public service)')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help=f'seconds per request (default: {REQUEST_TIMEOUT})')
+    add_cache_args(parser)
+    add_menu_args(parser)
+    add_dedupe_args(parser)
+    add_telemetry_args(parser)
+    return parser.parse_args()
+
 def main():
+    # asyncio is only worth importing once we actually generate
+    import asyncio
+    from job_pool import TokenBucket, dump_stats, print_throughput, run_jobs
+
+    args = parse_args()
+    cache = cache_from_args(args)
+    telemetry = telemetry_from_args(args, 'generate-pollinations-images', 'pollinations')
+    make_dirs()
+    plan, all_jobs = plan_from_args(args, build_jobs())
+
     print("\n🍔 AHKII BURGER AI IMAGE GENERATION")
     print("=" * 60)
     print("📡 Using Pollinations AI (Free, no API key required)")
     print("🤖 Model: Flux (Ultra-realistic food photography)")
-    print(f"🖼️  Generating {len(burgers) * 2 + len(sides) + len(drinks)} images")
+    print(f"🖼️  {len(all_jobs)} images on the menu")
+    print(f"⚙️  {args.concurrency} workers, {args.rate:g} req/s (burst {args.burst})")
     print("=" * 60)
     print()
 
-    success_count = 0
-    fail_count = 0
-
-    # Generate burger images (normal + cross-section)
-    print("📸 BURGER IMAGES\n")
-    for i, burger in enumerate(burgers, 1):
-        print(f"[{i}/{len(burgers)}] {burger['name']}")
-
-        # Normal view
-        normal_path = os.path.join(dirs['burgers'], f"{burger['id']}.jpg")
-        if generate_image(burger['name'], burger['description'], normal_path):
-            success_count += 1
-        else:
-            fail_count += 1
-
-        # Cross-section view
-        cross_path = os.path.join(dirs['burgers'], f"{burger['id']}-cross.jpg")
-        if generate_image(burger['name'], burger['description'], cross_path, is_cross_section=True):
-            success_count += 1
-        else:
-            fail_count += 1
-
-        # Rate limiting - 2 seconds between requests
-        time.sleep(2)
-        print()
-
-    # Generate side images
-    print("🍟 SIDE DISH IMAGES\n")
-    for i, side in enumerate(sides, 1):
-        print(f"[{i}/{len(sides)}] {side['name']}")
-
-        side_path = os.path.join(dirs['sides'], f"{side['id']}.jpg")
-        if generate_image(side['name'], side['description'], side_path):
-            success_count += 1
-        else:
-            fail_count += 1
-
-        time.sleep(2)
-        print()
-
-    # Generate drink images
-    print("🥤 DRINK IMAGES\n")
-    for i, drink in enumerate(drinks, 1):
-        print(f"[{i}/{len(drinks)}] {drink['name']}")
-
-        drink_path = os.path.join(dirs['drinks'], f"{drink['id']}.jpg")
-        if generate_image(drink['name'], drink['description'], drink_path):
-            success_count += 1
-        else:
-            fail_count += 1
-
-        time.sleep(2)
-        print()
+    # Unchanged items come straight from the cache; only the rest hit the network
+    jobs = restore_cached(all_jobs, cache, force=args.force)
+    cached_count = len(all_jobs) - len(jobs)
+    print(f"\n♻️  {cached_count} cached, {len(jobs)} to generate\n")
+    index = index_from_args(args, jobs)
+
+    def generate(job, seed=None, finish=True):
+        trace = telemetry.trace(job)
+        if seed is not None:
+            trace.count('rerolls')
+        return generate_image(job['name'], job['description'], job['path'], is_cross_section=job['is_cross_section'],
+                              base_url=args.base_url, cache=cache, seed=seed, timeout=args.timeout, trace=trace,
+                              finish=finish)
+
+    def worker(job):
+        # Download only; the worker moves on to the next request while finish_job runs
+        return generate(job, finish=False)
+
+    def finish_job(job):
+        trace = telemetry.trace(job)
+        try:
+            finish_download(staging_path(job['path']), job['path'], cache, job['key'], trace)
+        except ImageRejected as e:
+            print(f"  ❌ {job['label']}: Rejected, {e}")
+            trace.error = f"rejected: {e}"
+            return False
+        # A near-duplicate of another menu image is re-rolled straight away
+        return ensure_unique(index, job, lambda seed: generate(job, seed), cache, args.max_rerolls)
+
+    # One pooled connection per worker
+    get_session(pool_size=args.concurrency)
+
+    # Token bucket replaces the fixed 2 second sleep between items
+    bucket = TokenBucket(args.rate, args.burst)
+    telemetry.start()
+    stats = asyncio.run(run_jobs(jobs, worker, concurrency=args.concurrency, bucket=bucket,
+                                 on_finish=telemetry.job_done, post=finish_job))
+    telemetry.close()
+    plan.save()
+    success_count = stats['ok']
+    fail_count = stats['failed']
 
     # Summary
+    print()
     print("=" * 60)
     print("✨ IMAGE GENERATION COMPLETE!")
     print(f"✅ Success: {success_count} images")
+    if cached_count > 0:
+        print(f"♻️  Cached: {cached_count} images")
     if fail_count > 0:
         print(f"❌ Failed: {fail_count} images")
+    print_throughput(stats)
+    dump_stats(stats)
+    if index is not None:
+        index.save()
     print("=" * 60)
     print()
     print("📁 Images saved to:")
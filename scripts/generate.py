@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the menu image generators
+Listing and planning never import torch, diffusers or requests, so they start instantly
+
+Usage:
+    python3 scripts/generate.py pollinations --list
+    python3 scripts/generate.py diffusers --dry-run
+    python3 scripts/generate.py diffusers --changed --dry-run   # only what the menu edits need
+    python3 scripts/generate.py quick --profile cpu-fast      # runs quick_generate.py
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+# backend name -> (script file, function that runs it)
+BACKENDS = {
+    'pollinations': ('generate-pollinations-images.py', 'main'),
+    'hf-api': ('generate_hf_api.py', 'generate_images'),
+    'hedged': ('generate_hedged.py', 'main'),
+    'diffusers': ('generate_hf_images.py', 'generate_images'),
+    'quick': ('quick_generate.py', 'main'),
+}
+
+# Backends whose command line takes --profile
+PROFILE_BACKENDS = {'quick', 'hedged'}
+# ...and of those, the ones whose build_jobs() depends on it (image sizes)
+PROFILE_JOBS = {'quick'}
+
+
+def load_backend(name):
+    """Import a generator script as a module (some have dashes in their file names)"""
+    filename, _ = BACKENDS[name]
+    module_name = os.path.splitext(filename)[0].replace('-', '_')
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def backend_jobs(name, module, profile=None):
+    if profile is not None and name in PROFILE_JOBS:
+        return module.build_jobs(profile)
+    return module.build_jobs()
+
+
+def job_status(job, cache):
+    """'unchanged' (output already is the cached image), 'restore' (cache hit) or 'generate'"""
+    entry = cache.entry_path(job['key'])
+    if job.get('stale') or not os.path.exists(entry):
+        return 'generate'
+    if os.path.exists(job['path']) and os.path.samefile(entry, job['path']):
+        return 'unchanged'
+    return 'restore'
+
+
+def print_jobs(jobs):
+    for job in jobs:
+        print(f"  {job['path']:<45} {job.get('label', '')}")
+    print(f"\n{len(jobs)} images")
+
+
+def print_plan(jobs, cache):
+    """What a real run would do, without doing it"""
+    counts = {'unchanged': 0, 'restore': 0, 'generate': 0}
+    symbols = {'unchanged': '=', 'restore': '♻️', 'generate': '+'}
+    for job in jobs:
+        status = job_status(job, cache)
+        counts[status] += 1
+        if status != 'unchanged':
+            print(f"  {symbols[status]} {status:<8} {job['path']}")
+    print(f"\n{counts['generate']} to generate, {counts['restore']} to restore from cache, "
+          f"{counts['unchanged']} unchanged")
+
+
+def main(argv=None):
+    from gen_cache import CACHE_DIR, GenerationCache
+    from menu_plan import STATE_FILE, MenuPlan
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='Any other options are passed through to the backend script.',
+    )
+    parser.add_argument('backend', choices=sorted(BACKENDS))
+    parser.add_argument('--list', action='store_true', help='list the images this backend produces and exit')
+    parser.add_argument('--dry-run', '--plan', dest='dry_run', action='store_true',
+                        help='show what would be generated, restored or left alone, and exit')
+    parser.add_argument('--changed', action='store_true',
+                        help='only the images data/menu.ts edits need (new items, changed descriptions, missing files)')
+    parser.add_argument('--menu-state', default=STATE_FILE)
+    parser.add_argument('--profile', default=None, help='speed profile (quick and hedged backends)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args, rest = parser.parse_known_args(argv)
+    if args.profile is not None and args.backend not in PROFILE_BACKENDS:
+        parser.error(f"--profile is not supported by the {args.backend} backend "
+                     f"(only {', '.join(sorted(PROFILE_BACKENDS))})")
+
+    module = load_backend(args.backend)
+
+    if args.list or args.dry_run:
+        jobs = backend_jobs(args.backend, module, args.profile)
+        if args.changed:
+            plan = MenuPlan(state_path=args.menu_state)
+            jobs = plan.select(jobs)
+            plan.print()
+            print()
+        if args.list:
+            print_jobs(jobs)
+        else:
+            print_plan(jobs, GenerationCache(args.cache_dir))
+        return
+
+    # Hand over to the backend with its own command line
+    passthrough = list(rest) + ['--menu-state', args.menu_state]
+    if args.changed:
+        passthrough.append('--changed')
+    if args.profile is not None:
+        passthrough += ['--profile', args.profile]
+    passthrough += ['--cache-dir', args.cache_dir]
+    sys.argv = [BACKENDS[args.backend][0]] + passthrough
+    getattr(module, BACKENDS[args.backend][1])()
+
+
+if __name__ == '__main__':
+    main()
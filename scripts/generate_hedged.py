@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Generate menu images from whichever provider answers first
+Each image goes to the fastest healthy provider (Pollinations, the HF Inference
+API, optionally the local diffusers pipeline) and a slow one is hedged with the
+next, see providers.py. Prompts and output paths are generate_hf_api.py's
+
+Usage:
+    python3 scripts/generate_hedged.py
+    python3 scripts/generate_hedged.py --providers hf-api,pollinations,diffusers
+    python3 scripts/generate_hedged.py --pollinations-url http://127.0.0.1:8765 --hf-url http://127.0.0.1:8766
+"""
+
+import argparse
+
+from downloads import get_session
+from gen_cache import add_cache_args, cache_from_args, cache_key, restore_cached
+from menu_plan import add_menu_args, plan_from_args
+from phash_index import add_dedupe_args, ensure_unique, index_from_args
+from providers import ProviderError, add_provider_args, router_from_args
+from telemetry import add_telemetry_args, telemetry_from_args
+
+# Which provider wins varies, so cache entries are keyed by the prompt alone
+MODEL = 'hedged'
+
+
+def build_jobs():
+    """generate_hf_api.py's menu, keyed for this backend"""
+    from generate_hf_api import build_jobs as hf_jobs
+
+    jobs = hf_jobs()
+    for job in jobs:
+        job['key'] = cache_key(job['prompt'], MODEL)
+    return jobs
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=4, help='jobs in flight at once (default: 4)')
+    parser.add_argument('--rate', type=float, default=1.0, help='average jobs started per second, 0 = unlimited (default: 1.0)')
+    parser.add_argument('--max-attempts', type=int, default=4, help='tries per image once every provider has failed it (default: 4)')
+    parser.add_argument('--deadline', type=float, default=900, help='no retries are scheduled after this many seconds (default: 900)')
+    add_provider_args(parser)
+    add_cache_args(parser)
+    add_menu_args(parser)
+    add_dedupe_args(parser)
+    add_telemetry_args(parser)
+    return parser.parse_args()
+
+
+def main():
+    import asyncio
+    from generate_hf_api import make_dirs
+    from job_pool import RetryLater, TokenBucket, dump_stats, print_throughput, run_jobs
+
+    args = parse_args()
+    cache = cache_from_args(args)
+    router = router_from_args(args)
+    telemetry = telemetry_from_args(args, 'generate_hedged', 'hedged')
+
+    print("\n🍔 HEDGED AI IMAGE GENERATION\n")
+    print(f"📡 Providers: {', '.join(p.name for p in router.ranked())} (fastest first)\n")
+    make_dirs()
+
+    plan, all_jobs = plan_from_args(args, build_jobs())
+    jobs = restore_cached(all_jobs, cache, force=args.force)
+    cached = len(all_jobs) - len(jobs)
+    print(f"\n♻️  {cached} cached, {len(jobs)} to generate\n")
+    index = index_from_args(args, jobs)
+
+    def generate(job, seed=None):
+        key = job['key'] if seed is None else cache_key(job['prompt'], MODEL, seed=seed)
+        return router.generate(job['prompt'], job['path'], seed, cache, key, telemetry.trace(job), job['label'])
+
+    def worker(job):
+        print(f"Generating {job['label']}...")
+        try:
+            return generate(job)
+        except ProviderError as e:
+            print(f"   ✗ {job['label']}: {e.reason}")
+            return False
+
+    def reroll(job, seed):
+        telemetry.trace(job).count('rerolls')
+        try:
+            return bool(generate(job, seed))
+        except (RetryLater, ProviderError) as e:
+            print(f"   ✗ Re-roll failed: {e.reason}")
+            return False
+
+    def finish_job(job):
+        # The winning image is already validated and published; only the duplicate check is left
+        return ensure_unique(index, job, lambda seed: reroll(job, seed), cache, args.max_rerolls)
+
+    # Room for every job's hedge to hold a connection alongside its primary
+    get_session(pool_size=args.concurrency * (1 + args.max_hedges))
+    bucket = TokenBucket(args.rate, 2)
+    telemetry.start()
+    try:
+        stats = asyncio.run(run_jobs(jobs, worker, concurrency=args.concurrency, bucket=bucket,
+                                     max_attempts=args.max_attempts, deadline=args.deadline,
+                                     on_finish=telemetry.job_done, post=finish_job))
+    finally:
+        telemetry.close()
+        router.save()
+        plan.save()
+
+    print("\n" + "=" * 60)
+    print("✅ Hedged generation complete!")
+    print(f"   Generated: {stats['ok']} images")
+    if cached > 0:
+        print(f"   Cached: {cached} images")
+    if stats['failed'] > 0:
+        print(f"   Failed: {stats['failed']} images")
+    print_throughput(stats)
+    dump_stats(stats)
+    print(router.summary())
+    if index is not None:
+        index.save()
+    print("=" * 60 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,19 @@ Generate AI Burger Images using Hugging Face Inference API
 Uses free API with queuing - no authentication needed
 """
 
-import requests
+import argparse
 import os
 from pathlib import Path
-import time
 import json
 
+from downloads import get_session, stream_to_file
+from gen_cache import add_cache_args, cache_from_args, cache_key, restore_cached
+from image_finish import ImageRejected, finish_download, staging_path
+from menu_data import item_subject, menu_views, view_label
+from menu_plan import add_menu_args, plan_from_args
+from phash_index import add_dedupe_args, ensure_unique, index_from_args
+from telemetry import add_telemetry_args, telemetry_from_args, timed
+
 # Create directories
 dirs = {
     'burgers': './public/images/burgers',
@@ -17,212 +24,197 @@ dirs = {
     'drinks': './public/images/drinks',
 }
 
-for dir_path in dirs.values():
-    Path(dir_path).mkdir(parents=True, exist_ok=True)
+def make_dirs():
+    for dir_path in dirs.values():
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
 
 # Hugging Face API endpoint for image generation
-HF_API_URL = "https://api-inference.huggingface.co/models/runwayml/stable-diffusion-v1-5"
-
-# Image generation prompts
-burgers = [
-    {
-        'id': 'classic',
-        'name': 'The Ahkii Classic',
-        'prompt': 'professional food photography of a classic cheeseburger with angus beef patty, melted cheese, fresh lettuce, ripe tomato, onions, on a soft bun, studio lighting, appetizing, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section of a cheeseburger showing layers of beef patty, cheese, lettuce, tomato, onions clearly visible, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'double-trouble',
-        'name': 'The Double Trouble',
-        'prompt': 'professional food photography of a double cheeseburger with two beef patties, double melted cheese, caramelized onions, on a toasted bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section of double cheeseburger showing two beef patties stacked with melted cheese and caramelized onions between layers, high quality, 8k',
-    },
-    {
-        'id': 'heatwave',
-        'name': 'The Heatwave',
-        'prompt': 'professional food photography of a spicy burger with jalapeños, pepperjack cheese, crispy fried onions, on a bun, hot sauce dripping, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section spicy burger showing jalapeños, pepperjack cheese, crispy onions layers clearly visible, hot sauce, high quality, 8k',
-    },
-    {
-        'id': 'bbq-stack',
-        'name': 'The BBQ Stack',
-        'prompt': 'professional food photography of a BBQ burger with angus beef patty, smoky BBQ sauce, crispy fried onions, melted cheddar cheese, on a brioche bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section BBQ burger showing beef patty, BBQ sauce, crispy onions, cheddar cheese layers, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'melt',
-        'name': 'The Melt',
-        'prompt': 'professional food photography of a melted cheese burger with beef patty smothered in creamy cheese sauce, pickles, on a bun, cheese stretching, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section cheese burger showing beef patty drowning in melted cheese sauce with pickles visible, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'veggie',
-        'name': 'The Veggie Way',
-        'prompt': 'professional food photography of a vegan burger with plant-based patty, vegan cheese, fresh lettuce, ripe tomato, on a bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section vegan burger showing plant-based patty, vegan cheese, lettuce, tomato layers, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'special',
-        'name': 'The Ahkii Special',
-        'prompt': 'professional food photography of premium burger with signature sauce, crispy fried onions, melted cheese blend, on artisan bun, studio lighting, gourmet presentation, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section premium burger showing beef patty, crispy fried onions, melted cheese blend layers, signature sauce dripping, high quality, 8k',
-    },
-    {
-        'id': 'truffle',
-        'name': 'The Truffle Boss',
-        'prompt': 'professional food photography of luxury truffle burger with beef patty, truffle mayo, caramelized onions, melted Swiss cheese, on premium bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section luxury truffle burger showing beef patty, truffle mayo, caramelized onions, Swiss cheese layers, high quality, 8k',
-    },
-    {
-        'id': 'sweet-spicy',
-        'name': 'The Sweet & Spicy',
-        'prompt': 'professional food photography of sweet and spicy burger with hot honey glaze dripping, jalapeños, melted cheddar cheese, on toasted bun, steam rising, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section sweet spicy burger showing beef patty, hot honey glaze, jalapeños, cheddar cheese layers clearly visible, high quality, 8k',
-    },
-    {
-        'id': 'blue-smoke',
-        'name': 'The Blue Smoke',
-        'prompt': 'professional food photography of blue cheese burger with beef patty, creamy blue cheese, crispy fried onions, BBQ glaze, on bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section blue cheese burger showing beef patty, blue cheese crumbles, crispy onions, BBQ glaze layers, high quality, 8k',
-    },
-]
-
-sides = [
-    {'id': 'fries', 'name': 'Regular Fries', 'prompt': 'professional food photography of golden crispy french fries, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'loaded-fries', 'name': 'Loaded Fries', 'prompt': 'professional food photography of loaded fries with melted cheese sauce and toppings, steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'sweet-potato-fries', 'name': 'Sweet Potato Fries', 'prompt': 'professional food photography of golden crispy sweet potato fries, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'onion-rings', 'name': 'Onion Rings', 'prompt': 'professional food photography of golden crispy onion rings, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'mozz-sticks', 'name': 'Mozz Sticks', 'prompt': 'professional food photography of melted mozzarella sticks with golden crispy exterior, cheese stretching, studio lighting, high quality, 8k'},
-]
-
-drinks = [
-    {'id': 'coca-cola', 'name': 'Coca-Cola', 'prompt': 'professional food photography of cold Coca-Cola in a glass with ice cubes, condensation on glass, vibrant red color, studio lighting, high quality, 8k'},
-    {'id': 'sprite', 'name': 'Sprite', 'prompt': 'professional food photography of cold Sprite lemon-lime soda in a glass with ice cubes, refreshing, clear bubbles visible, studio lighting, high quality, 8k'},
-    {'id': 'fanta', 'name': 'Fanta', 'prompt': 'professional food photography of colorful Fanta soda in a glass with ice cubes, vibrant colors, refreshing, studio lighting, high quality, 8k'},
-    {'id': 'still-water', 'name': 'Still Water', 'prompt': 'professional food photography of cold clear water in a glass, ice cubes, crystal clear, condensation on glass, studio lighting, high quality, 8k'},
-    {'id': 'sparkling-water', 'name': 'Sparkling Water', 'prompt': 'professional food photography of sparkling water in a glass with bubbles visible, ice cubes, refreshing, studio lighting, high quality, 8k'},
-]
-
-def query_hf_api(prompt, max_retries=3):
+# HF_API_BASE can point at a local stand-in (scripts/fake_servers.py) for offline runs
+HF_MODEL = "runwayml/stable-diffusion-v1-5"
+HF_API_BASE = os.environ.get('HF_API_BASE', 'https://api-inference.huggingface.co')
+HF_API_URL = f"{HF_API_BASE}/models/{HF_MODEL}"
+REQUEST_TIMEOUT = 30  # Seconds; a timed-out request is parked and retried
+
+# Prompt wording around the menu item; the subject comes from data/menu.ts
+PROMPT_STYLE = 'studio lighting, appetizing, high quality, 8k'
+
+def create_prompt(item, cross_section=False):
+    """Prompt for a MenuItem's photo, so a name or description edit changes the image"""
+    return f"professional food photography of {item_subject(item, cross_section)}, {PROMPT_STYLE}"
+
+def retry_hint(response):
+    """Seconds the server asked us to wait: Retry-After header or the 503 body's estimated_time"""
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass  # HTTP-date form; fall back to the body / our own backoff
+    try:
+        return float(response.json()['estimated_time'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def query_hf_api(prompt, dest, cache=None, key=None, api_url=HF_API_URL, seed=None, timeout=REQUEST_TIMEOUT, trace=None,
+                 finish=True):
     """
-    Query Hugging Face Inference API for image generation
-    Returns image bytes or None if failed
+    Query Hugging Face Inference API for image generation (one attempt)
+    Streams the image to a staging file, then decodes, validates and re-encodes it
+    within budget into dest (through the cache entry for key when given, see
+    image_finish.py); finish=False leaves it staged for the caller.
+    A seed asks for a specific variation and bypasses the API's response cache
+    Returns True on success, False on a permanent failure, and raises
+    RetryLater on a cold model, timeout or rejected image so the scheduler can park the job
+    trace (telemetry.JobTrace) collects request/download timings, bytes and error counts
     """
+    import requests
+    from job_pool import RetryLater
+
     headers = {"Authorization": f"Bearer hf_token"}
     payload = {"inputs": prompt}
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(HF_API_URL, headers=headers, json=payload, timeout=30)
-
+    if seed is not None:
+        payload["parameters"] = {"seed": seed}
+        payload["options"] = {"use_cache": False}
+
+    def note(counter, error):
+        if trace is not None:
+            trace.count(counter)
+            trace.error = error
+
+    try:
+        with timed(trace, 'request'):
+            response = get_session().post(api_url, headers=headers, json=payload, timeout=timeout, stream=True)
+        with response:
             if response.status_code == 200:
-                return response.content
-            elif response.status_code == 503:
-                # Model is loading, wait and retry
-                wait_time = (attempt + 1) * 10
-                print(f"   ⏳ Model loading, waiting {wait_time}s...")
-                time.sleep(wait_time)
+                with timed(trace, 'download'):
+                    written = stream_to_file(response, staging_path(dest))
+                if trace is not None:
+                    trace.add_bytes(written)
+                if finish:
+                    finish_staged(dest, cache, key, trace)
+                return True
+            elif response.status_code in (429, 503):
+                # Model is loading (or we're throttled): park and retry without holding a worker
+                note(f"http_{response.status_code}", f"HTTP {response.status_code}")
+                raise RetryLater(f"HTTP {response.status_code} model loading", retry_hint(response))
             else:
                 print(f"   ⚠ API Error {response.status_code}: {response.text[:100]}")
-                return None
-        except requests.exceptions.Timeout:
-            print(f"   ⏱ Timeout on attempt {attempt + 1}")
-            continue
-        except Exception as e:
-            print(f"   ❌ Request failed: {str(e)[:50]}")
-            return None
-
-    return None
+                note(f"http_{response.status_code}", f"HTTP {response.status_code}: {response.text[:100]}")
+                return False
+    except requests.exceptions.Timeout:
+        note('timeouts', 'timeout')
+        raise RetryLater("timeout")
+    except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+        note('connection_errors', str(e)[:200])
+        raise RetryLater(f"connection error: {str(e)[:50]}")
+
+def finish_staged(dest, cache=None, key=None, trace=None):
+    """Finish the staged download for dest; a corrupt or blank image is retried like a 503"""
+    from job_pool import RetryLater
+
+    try:
+        finish_download(staging_path(dest), dest, cache, key, trace)
+    except ImageRejected as e:
+        if trace is not None:
+            trace.error = f"rejected: {e}"
+        raise RetryLater(f"rejected, {e}")
+
+def build_jobs():
+    """Every image data/menu.ts references: burgers (normal + cross-section), sides, drinks"""
+    jobs = []
+    for item, view, url in menu_views():
+        jobs.append({'label': view_label(item, view), 'prompt': create_prompt(item, view == 'cross'),
+                     'path': os.path.join('./public', url.lstrip('/'))})
+    for job in jobs:
+        job['key'] = cache_key(job['prompt'], HF_MODEL)
+    return jobs
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate menu images with the Hugging Face Inference API")
+    parser.add_argument('--concurrency', type=int, default=4, help='requests in flight at once (default: 4)')
+    parser.add_argument('--rate', type=float, default=0.5, help='average requests per second, 0 = unlimited (default: 0.5)')
+    parser.add_argument('--max-attempts', type=int, default=6, help='tries per image before giving up (default: 6)')
+    parser.add_argument('--deadline', type=float, default=900, help='no retries are scheduled after this many seconds (default: 900)')
+    parser.add_argument('--base-url', default=HF_API_BASE, help='Inference API host (default: $HF_API_BASE or the public API)')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help=f'seconds per request (default: {REQUEST_TIMEOUT})')
+    add_cache_args(parser)
+    add_menu_args(parser)
+    add_dedupe_args(parser)
+    add_telemetry_args(parser)
+    return parser.parse_args()
 
 def generate_images():
+    import asyncio
+    from job_pool import RetryLater, TokenBucket, dump_stats, print_throughput, run_jobs
+
+    args = parse_args()
+    cache = cache_from_args(args)
+    telemetry = telemetry_from_args(args, 'generate_hf_api', 'hf-api')
+
     print("\n🍔 HUGGING FACE AI IMAGE GENERATION (API Method)\n")
     print("Generating professional AI burger images...")
     print("(Using Hugging Face Free Inference API)\n")
-
-    successful = 0
-    failed = 0
-
-    # Generate burger images
-    print("📸 Generating BURGER images...\n")
-    for burger in burgers:
+    make_dirs()
+
+    plan, all_jobs = plan_from_args(args, build_jobs())
+    jobs = restore_cached(all_jobs, cache, force=args.force)
+    cached = len(all_jobs) - len(jobs)
+    print(f"\n♻️  {cached} cached, {len(jobs)} to generate\n")
+    index = index_from_args(args, jobs)
+    api_url = f"{args.base_url}/models/{HF_MODEL}"
+
+    def generate(job, seed=None, finish=True):
+        trace = telemetry.trace(job)
+        key = job['key'] if seed is None else cache_key(job['prompt'], HF_MODEL, seed=seed)
+        if seed is not None:
+            trace.count('rerolls')
+        return query_hf_api(job['prompt'], job['path'], cache, key, api_url=api_url, seed=seed,
+                            timeout=args.timeout, trace=trace, finish=finish)
+
+    def worker(job):
+        # Download only; the worker moves on to the next request while finish_job runs
+        print(f"Generating {job['label']}...")
+        if generate(job, finish=False):
+            return True
+        print(f"   ✗ Failed to generate {job['label']}")
+        return False
+
+    def reroll(job, seed):
         try:
-            # Normal view
-            print(f"Generating {burger['name']} (normal view)...")
-            image_data = query_hf_api(burger['prompt'])
-            if image_data:
-                normal_path = os.path.join(dirs['burgers'], f"{burger['id']}.jpg")
-                with open(normal_path, 'wb') as f:
-                    f.write(image_data)
-                print(f"   ✓ Saved to {normal_path}")
-                successful += 1
-            else:
-                print(f"   ✗ Failed to generate")
-                failed += 1
-
-            # Cross-section view
-            print(f"Generating {burger['name']} (cross-section view)...")
-            image_data = query_hf_api(burger['cross_prompt'])
-            if image_data:
-                cross_path = os.path.join(dirs['burgers'], f"{burger['id']}-cross.jpg")
-                with open(cross_path, 'wb') as f:
-                    f.write(image_data)
-                print(f"   ✓ Saved to {cross_path}\n")
-                successful += 1
-            else:
-                print(f"   ✗ Failed to generate\n")
-                failed += 1
-
-            time.sleep(2)  # Rate limiting
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)[:50]}\n")
-            failed += 2
-
-    # Generate side images
-    print("\n🍟 Generating SIDE DISH images...\n")
-    for side in sides:
-        try:
-            print(f"Generating {side['name']}...")
-            image_data = query_hf_api(side['prompt'])
-            if image_data:
-                path = os.path.join(dirs['sides'], f"{side['id']}.jpg")
-                with open(path, 'wb') as f:
-                    f.write(image_data)
-                print(f"   ✓ Saved to {path}\n")
-                successful += 1
-            else:
-                print(f"   ✗ Failed to generate\n")
-                failed += 1
-            time.sleep(2)
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)[:50]}\n")
-            failed += 1
-
-    # Generate drink images
-    print("\n🥤 Generating DRINK images...\n")
-    for drink in drinks:
-        try:
-            print(f"Generating {drink['name']}...")
-            image_data = query_hf_api(drink['prompt'])
-            if image_data:
-                path = os.path.join(dirs['drinks'], f"{drink['id']}.jpg")
-                with open(path, 'wb') as f:
-                    f.write(image_data)
-                print(f"   ✓ Saved to {path}\n")
-                successful += 1
-            else:
-                print(f"   ✗ Failed to generate\n")
-                failed += 1
-            time.sleep(2)
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)[:50]}\n")
-            failed += 1
+            return generate(job, seed)
+        except RetryLater as e:
+            print(f"   ✗ Re-roll failed: {e.reason}")
+            return False
+
+    def finish_job(job):
+        finish_staged(job['path'], cache, job['key'], telemetry.trace(job))
+        # A near-duplicate of another menu image is re-rolled straight away
+        return ensure_unique(index, job, lambda seed: reroll(job, seed), cache, args.max_rerolls)
+
+    # Cold-model 503s park the job with backoff; the other jobs keep flowing meanwhile
+    get_session(pool_size=args.concurrency)
+    bucket = TokenBucket(args.rate, 1)
+    telemetry.start()
+    stats = asyncio.run(run_jobs(jobs, worker, concurrency=args.concurrency, bucket=bucket,
+                                 max_attempts=args.max_attempts, deadline=args.deadline,
+                                 on_finish=telemetry.job_done, post=finish_job))
+    telemetry.close()
+    successful = stats['ok']
+    failed = stats['failed']
 
     # Summary
     print("\n" + "="*60)
     print("✅ AI Image generation attempt complete!")
     print(f"   Generated: {successful} images")
+    if cached > 0:
+        print(f"   Cached: {cached} images")
     if failed > 0:
         print(f"   Failed: {failed} images")
+    print_throughput(stats)
+    dump_stats(stats)
+    plan.save()
+    if index is not None:
+        index.save()
     print("="*60)
     print("\n🎨 AI-generated images are being created!")
     print("📁 Images saved to:")
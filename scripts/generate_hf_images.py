@@ -4,13 +4,30 @@ Generate AI Burger Images using Hugging Face Diffusers
 Uses Stable Diffusion v1.5 (free, no API key needed)
 """
 
+import argparse
 import os
-import torch
+import time
 from pathlib import Path
-from diffusers import StableDiffusionPipeline
-from PIL import Image
 import json
 
+from derive_views import DEFAULT_STRENGTH, LatentStore, derive_keys, generate_pairs, img2img_for, plan_pairs
+from gen_cache import add_cache_args, cache_from_args, cache_key, restore_cached
+from generate_hf_api import create_prompt
+from image_finish import ImageRejected, save_generated
+from menu_data import CATEGORY_DIRS, menu_views, view_label
+from menu_plan import add_menu_args, plan_from_args
+from phash_index import add_dedupe_args, ensure_unique, index_from_args, near_duplicate, reroll_seed
+from prompt_embeds import add_embedding_args, embeddings_from_args, prompt_args
+from sd_int8 import Int8Modules, add_int8_args, by_mode, int8_categories_from_args, int8_model_id, mark_int8
+from sd_workers import add_worker_args
+from telemetry import add_telemetry_args, telemetry_from_args, timed_pipe
+
+# sd_daemon, torch and diffusers are imported inside the functions that need them, so
+# listing or planning jobs (scripts/generate.py --list) starts instantly
+
+MODEL_ID = "runwayml/stable-diffusion-v1-5"
+NUM_INFERENCE_STEPS = 30
+
 # Create directories
 dirs = {
     'burgers': './public/images/burgers',
@@ -18,175 +35,498 @@ dirs = {
     'drinks': './public/images/drinks',
 }
 
-for dir_path in dirs.values():
-    Path(dir_path).mkdir(parents=True, exist_ok=True)
-
-# Image generation prompts
-burgers = [
-    {
-        'id': 'classic',
-        'name': 'The Ahkii Classic',
-        'prompt': 'professional food photography of a classic cheeseburger with angus beef patty, melted cheese, fresh lettuce, ripe tomato, onions, on a soft bun, studio lighting, appetizing, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section of a cheeseburger showing layers of beef patty, cheese, lettuce, tomato, onions clearly visible, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'double-trouble',
-        'name': 'The Double Trouble',
-        'prompt': 'professional food photography of a double cheeseburger with two beef patties, double melted cheese, caramelized onions, on a toasted bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section of double cheeseburger showing two beef patties stacked with melted cheese and caramelized onions between layers, high quality, 8k',
-    },
-    {
-        'id': 'heatwave',
-        'name': 'The Heatwave',
-        'prompt': 'professional food photography of a spicy burger with jalapeños, pepperjack cheese, crispy fried onions, on a bun, hot sauce dripping, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section spicy burger showing jalapeños, pepperjack cheese, crispy onions layers clearly visible, hot sauce, high quality, 8k',
-    },
-    {
-        'id': 'bbq-stack',
-        'name': 'The BBQ Stack',
-        'prompt': 'professional food photography of a BBQ burger with angus beef patty, smoky BBQ sauce, crispy fried onions, melted cheddar cheese, on a brioche bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section BBQ burger showing beef patty, BBQ sauce, crispy onions, cheddar cheese layers, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'melt',
-        'name': 'The Melt',
-        'prompt': 'professional food photography of a melted cheese burger with beef patty smothered in creamy cheese sauce, pickles, on a bun, cheese stretching, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section cheese burger showing beef patty drowning in melted cheese sauce with pickles visible, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'veggie',
-        'name': 'The Veggie Way',
-        'prompt': 'professional food photography of a vegan burger with plant-based patty, vegan cheese, fresh lettuce, ripe tomato, on a bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section vegan burger showing plant-based patty, vegan cheese, lettuce, tomato layers, studio lighting, high quality, 8k',
-    },
-    {
-        'id': 'special',
-        'name': 'The Ahkii Special',
-        'prompt': 'professional food photography of premium burger with signature sauce, crispy fried onions, melted cheese blend, on artisan bun, studio lighting, gourmet presentation, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section premium burger showing beef patty, crispy fried onions, melted cheese blend layers, signature sauce dripping, high quality, 8k',
-    },
-    {
-        'id': 'truffle',
-        'name': 'The Truffle Boss',
-        'prompt': 'professional food photography of luxury truffle burger with beef patty, truffle mayo, caramelized onions, melted Swiss cheese, on premium bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section luxury truffle burger showing beef patty, truffle mayo, caramelized onions, Swiss cheese layers, high quality, 8k',
-    },
-    {
-        'id': 'sweet-spicy',
-        'name': 'The Sweet & Spicy',
-        'prompt': 'professional food photography of sweet and spicy burger with hot honey glaze dripping, jalapeños, melted cheddar cheese, on toasted bun, steam rising, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section sweet spicy burger showing beef patty, hot honey glaze, jalapeños, cheddar cheese layers clearly visible, high quality, 8k',
-    },
-    {
-        'id': 'blue-smoke',
-        'name': 'The Blue Smoke',
-        'prompt': 'professional food photography of blue cheese burger with beef patty, creamy blue cheese, crispy fried onions, BBQ glaze, on bun, studio lighting, high quality, 8k',
-        'cross_prompt': 'professional food photography cross-section blue cheese burger showing beef patty, blue cheese crumbles, crispy onions, BBQ glaze layers, high quality, 8k',
-    },
-]
-
-sides = [
-    {'id': 'fries', 'name': 'Regular Fries', 'prompt': 'professional food photography of golden crispy french fries, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'loaded-fries', 'name': 'Loaded Fries', 'prompt': 'professional food photography of loaded fries with melted cheese sauce and toppings, steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'sweet-potato-fries', 'name': 'Sweet Potato Fries', 'prompt': 'professional food photography of golden crispy sweet potato fries, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'onion-rings', 'name': 'Onion Rings', 'prompt': 'professional food photography of golden crispy onion rings, perfectly fried, hot steam rising, appetizing, studio lighting, high quality, 8k'},
-    {'id': 'mozz-sticks', 'name': 'Mozz Sticks', 'prompt': 'professional food photography of melted mozzarella sticks with golden crispy exterior, cheese stretching, studio lighting, high quality, 8k'},
-]
-
-drinks = [
-    {'id': 'coca-cola', 'name': 'Coca-Cola', 'prompt': 'professional food photography of cold Coca-Cola in a glass with ice cubes, condensation on glass, vibrant red color, studio lighting, high quality, 8k'},
-    {'id': 'sprite', 'name': 'Sprite', 'prompt': 'professional food photography of cold Sprite lemon-lime soda in a glass with ice cubes, refreshing, clear bubbles visible, studio lighting, high quality, 8k'},
-    {'id': 'fanta', 'name': 'Fanta', 'prompt': 'professional food photography of colorful Fanta soda in a glass with ice cubes, vibrant colors, refreshing, studio lighting, high quality, 8k'},
-    {'id': 'still-water', 'name': 'Still Water', 'prompt': 'professional food photography of cold clear water in a glass, ice cubes, crystal clear, condensation on glass, studio lighting, high quality, 8k'},
-    {'id': 'sparkling-water', 'name': 'Sparkling Water', 'prompt': 'professional food photography of sparkling water in a glass with bubbles visible, ice cubes, refreshing, studio lighting, high quality, 8k'},
-]
+def make_dirs():
+    for dir_path in dirs.values():
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
 
-def generate_images():
-    print("\n🍔 HUGGING FACE AI IMAGE GENERATION\n")
-    print("Loading Stable Diffusion v1.5 model...")
-    print("(This may take 1-2 minutes on first run as it downloads the model)\n")
+# Output size per category: burgers and sides landscape, drinks portrait
+SIZES = {'burgers': (800, 600), 'sides': (800, 600), 'drinks': (600, 800)}
 
-    # Check if GPU is available
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Using device: {device.upper()}\n")
+def build_jobs():
+    """
+    Every image data/menu.ts references: burgers (normal + cross-section) and sides at
+    800x600, drinks at 600x800, prompted as in generate_hf_api.py
+    """
+    jobs = []
+    for item, view, url in menu_views():
+        category = CATEGORY_DIRS[item['category']]
+        width, height = SIZES[category]
+        job = {'label': view_label(item, view), 'prompt': create_prompt(item, view == 'cross'),
+               'path': os.path.join('./public', url.lstrip('/')), 'width': width, 'height': height,
+               'category': category}
+        if item.get('crossSectionImage'):
+            job.update(pair=item['id'], view=view)
+        jobs.append(job)
+    for job in jobs:
+        job['key'] = job_key(job)
+    return jobs
+
+def job_key(job, seed=None):
+    params = {'height': job['height'], 'width': job['width'], 'num_inference_steps': NUM_INFERENCE_STEPS}
+    if job.get('quantization'):
+        # An int8 image is a different image
+        params['quantization'] = job['quantization']
+    return cache_key(job['prompt'], MODEL_ID, params, seed)
+
+def save_image(cache, job, image, key=None, trace=None):
+    """Validate and encode a generated image within its byte budget, stored through the cache"""
+    save_generated(image, job['path'], cache, key or job['key'], trace)
+
+def reroller(pipe, cache, job, trace=None, embeddings=None):
+    """Regenerate one job with a fixed seed, for ensure_unique()"""
+    from sd_daemon import seed_params
 
-    # Load the pipeline
+    def reroll(seed):
+        if trace is not None:
+            trace.count('rerolls')
+        try:
+            image = timed_pipe(pipe, [trace], **prompt_args(embeddings, job['prompt']), height=job['height'],
+                               width=job['width'], num_inference_steps=NUM_INFERENCE_STEPS,
+                               **seed_params(pipe, seed)).images[0]
+            save_image(cache, job, image, job_key(job, seed), trace)
+        except Exception as e:
+            print(f"   ✗ Re-roll failed: {str(e)[:80]}")
+            return False
+        return True
+    return reroll
+
+def group_by_resolution(jobs):
+    """Jobs bucketed by (width, height), since a pipe() batch must share one output size"""
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job['width'], job['height']), []).append(job)
+    return groups
+
+def estimate_image_bytes(width, height, dtype_bytes):
+    """
+    Rough peak working memory of one image in a UNet batch
+    Dominated by the self-attention scores at the highest-resolution block,
+    doubled because classifier-free guidance runs a conditional and unconditional pass
+    """
+    tokens = (width // 8) * (height // 8)
+    attention = 8 * tokens * tokens * dtype_bytes   # 8 heads of tokens x tokens scores
+    activations = 320 * 32 * tokens * dtype_bytes   # live feature maps at the widest level
+    return 2 * (attention + activations)
+
+def memory_budget_bytes(device, budget_gb=None):
+    """Memory available for batches: explicit budget, else most of what is free right now"""
+    import torch
+
+    if budget_gb:
+        return int(budget_gb * 1024 ** 3)
+    if device == "cuda":
+        free, _ = torch.cuda.mem_get_info()
+        return int(free * 0.8)
     try:
-        pipe = StableDiffusionPipeline.from_pretrained(
-            "runwayml/stable-diffusion-v1-5",
-            torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-            safety_checker=None,  # Disable safety checker for food images
-        )
-        pipe = pipe.to(device)
-
-        # Enable memory optimizations for faster generation
-        if device == "cuda":
-            pipe.enable_attention_slicing()
+        return int(os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') * 0.5)
+    except (ValueError, OSError):
+        return 4 * 1024 ** 3
+
+def pick_batch_size(width, height, budget, max_batch, dtype_bytes):
+    """Largest batch up to max_batch whose estimated footprint fits in the budget"""
+    fits = budget // estimate_image_bytes(width, height, dtype_bytes)
+    return int(max(1, min(max_batch, fits)))
+
+def is_out_of_memory(error):
+    return isinstance(error, MemoryError) or 'out of memory' in str(error).lower()
+
+def run_batch(pipe, cache, batch, index=None, max_rerolls=0, telemetry=None, embeddings=None):
+    """
+    Generate one same-resolution batch, halving it on out-of-memory; returns (ok, failed)
+    With an index, each image that near-duplicates another is re-rolled on its own
+    With telemetry, each image's stage timings are logged once it is done
+    With embeddings (prompt_embeds.PromptEmbeddingCache), the text encoder only runs for new prompts
+    """
+    import torch
+
+    job = batch[0]
+    traces = [telemetry.trace(item) if telemetry else None for item in batch]
+    if telemetry:
+        # Time since the run started that this batch waited behind the others
+        for trace in traces:
+            if 'queue' not in trace.stages:
+                trace.add('queue', telemetry.elapsed())
+    try:
+        for item in batch:
+            print(f"Generating {item['label']}...")
+        images = timed_pipe(pipe, traces, **prompt_args(embeddings, [item['prompt'] for item in batch]),
+                            height=job['height'], width=job['width'], num_inference_steps=NUM_INFERENCE_STEPS).images
     except Exception as e:
-        print(f"Error loading model: {e}")
-        print("Make sure you have enough disk space (5GB+) for the model")
-        return
+        if len(batch) > 1 and is_out_of_memory(e):
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            half = len(batch) // 2
+            print(f"   ⚠ Out of memory at batch {len(batch)}, retrying as {half} + {len(batch) - half}")
+            for trace in traces:
+                if trace is not None:
+                    trace.count('oom_splits')
+            first = run_batch(pipe, cache, batch[:half], index, max_rerolls, telemetry, embeddings)
+            second = run_batch(pipe, cache, batch[half:], index, max_rerolls, telemetry, embeddings)
+            return first[0] + second[0], first[1] + second[1]
+        print(f"   ✗ Error: {str(e)}\n")
+        if telemetry:
+            for item, trace in zip(batch, traces):
+                trace.error = str(e)[:200]
+                telemetry.record(item, False)
+        return 0, len(batch)
 
-    successful = 0
-    failed = 0
+    ok = 0
+    for item, image, trace in zip(batch, images, traces):
+        try:
+            save_image(cache, item, image, trace=trace)
+            saved = ensure_unique(index, item, reroller(pipe, cache, item, trace, embeddings), cache, max_rerolls)
+        except ImageRejected as e:
+            print(f"   ✗ Rejected {item['label']}: {e}")
+            saved = False
+            if trace is not None:
+                trace.error = f"rejected: {e}"
+        if saved:
+            print(f"   ✓ Saved to {item['path']}")
+            ok += 1
+        if telemetry:
+            trace.counters['batch_size'] = len(batch)
+            telemetry.record(item, saved)
+    print()
+    return ok, len(batch) - ok
+
+def run_pairs(pipe, img2img, cache, pairs, strength, store, index=None, max_rerolls=0, telemetry=None, embeddings=None):
+    """
+    Generate a chunk of burgers' normal views and derive their cross-sections from
+    them (derive_views.py), halving the chunk on out-of-memory; returns (ok, failed)
+    """
+    import torch
+
+    normal = pairs[0]['normal']
+    params = {'height': normal['height'], 'width': normal['width'], 'num_inference_steps': NUM_INFERENCE_STEPS}
+    jobs = [pair[view] for pair in pairs for view in ('normal', 'cross') if pair[f'{view}_pending']]
+    if telemetry:
+        for job in jobs:
+            trace = telemetry.trace(job)
+            if 'queue' not in trace.stages:
+                trace.add('queue', telemetry.elapsed())
+    try:
+        for job in jobs:
+            print(f"Generating {job['label']}...")
+        results = generate_pairs(pipe, img2img, pairs, params, strength, store, embeddings,
+                                 telemetry.trace if telemetry else None)
+    except Exception as e:
+        if len(pairs) > 1 and is_out_of_memory(e):
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            half = len(pairs) // 2
+            print(f"   ⚠ Out of memory at {len(pairs)} pairs, retrying as {half} + {len(pairs) - half}")
+            first = run_pairs(pipe, img2img, cache, pairs[:half], strength, store, index, max_rerolls, telemetry, embeddings)
+            second = run_pairs(pipe, img2img, cache, pairs[half:], strength, store, index, max_rerolls, telemetry, embeddings)
+            return first[0] + second[0], first[1] + second[1]
+        print(f"   ✗ Error: {str(e)}\n")
+        if telemetry:
+            for job in jobs:
+                telemetry.trace(job).error = str(e)[:200]
+                telemetry.record(job, False)
+        return 0, len(jobs)
 
-    # Generate burger images
-    print("📸 Generating BURGER images with Stable Diffusion...\n")
-    for burger in burgers:
+    ok = 0
+    for job, image in results:
+        trace = telemetry.trace(job) if telemetry else None
         try:
-            # Normal view
-            print(f"Generating {burger['name']} (normal view)...")
-            image = pipe(burger['prompt'], height=600, width=800, num_inference_steps=30).images[0]
-            normal_path = os.path.join(dirs['burgers'], f"{burger['id']}.jpg")
-            image.save(normal_path)
-            print(f"   ✓ Saved to {normal_path}")
-            successful += 1
-
-            # Cross-section view
-            print(f"Generating {burger['name']} (cross-section view)...")
-            image = pipe(burger['cross_prompt'], height=600, width=800, num_inference_steps=30).images[0]
-            cross_path = os.path.join(dirs['burgers'], f"{burger['id']}-cross.jpg")
-            image.save(cross_path)
-            print(f"   ✓ Saved to {cross_path}\n")
-            successful += 1
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)}\n")
-            failed += 2
+            save_image(cache, job, image, trace=trace)
+            # A txt2img re-roll would break the pair's shared latents (derive_views.py)
+            saved = ensure_unique(index, job, None, cache, max_rerolls)
+        except ImageRejected as e:
+            print(f"   ✗ Rejected {job['label']}: {e}")
+            saved = False
+            if trace is not None:
+                trace.error = f"rejected: {e}"
+        if saved:
+            print(f"   ✓ Saved to {job['path']}")
+            ok += 1
+        if telemetry:
+            telemetry.record(job, saved)
+    print()
+    return ok, len(jobs) - ok
+
+def run_pool(pool, cache, jobs, index=None, max_rerolls=0, telemetry=None):
+    """
+    Generate jobs on an sd_workers.WorkerPool; returns (ok, failed)
+    Images come back to this process to be saved, so the cache and the perceptual
+    index keep a single writer. A near-duplicate is re-submitted with the seed
+    ensure_unique() would use, and checked again when it comes back
+    """
+    def submit(job, seed=None, attempt=0):
+        params = {'height': job['height'], 'width': job['width'], 'num_inference_steps': NUM_INFERENCE_STEPS}
+        pool.submit(job['prompt'], params, seed, (job, seed, attempt))
 
-    # Generate side images
-    print("\n🍟 Generating SIDE DISH images with Stable Diffusion...\n")
-    for side in sides:
+    for job in jobs:
+        print(f"Queued {job['label']}")
+        submit(job)
+    print()
+
+    ok = failed = 0
+    for result in pool.results():
+        job, seed, attempt = result['tag']
+        trace = telemetry.trace(job) if telemetry else None
+        if trace is not None:
+            for stage, seconds in result['stages'].items():
+                trace.add(stage, seconds)
+            trace.count('stolen', int(result['stolen']))
         try:
-            print(f"Generating {side['name']}...")
-            image = pipe(side['prompt'], height=600, width=800, num_inference_steps=30).images[0]
-            path = os.path.join(dirs['sides'], f"{side['id']}.jpg")
-            image.save(path)
-            print(f"   ✓ Saved to {path}\n")
-            successful += 1
+            if result['error']:
+                raise RuntimeError(result['error'])
+            save_image(cache, job, result['image'], job_key(job, seed), trace)
         except Exception as e:
-            print(f"   ✗ Error: {str(e)}\n")
+            print(f"   ✗ {job['label']}: {str(e)[:200]}")
+            if trace is not None:
+                trace.error = str(e)[:200]
             failed += 1
+            if telemetry:
+                telemetry.record(job, False, attempt + 1)
+            continue
+
+        match = near_duplicate(index, job) if index is not None else None
+        if match and attempt < max_rerolls:
+            seed = reroll_seed(job, attempt + 1)
+            print(f"  🔁 {os.path.basename(job['path'])} is {match[0]} bits from {match[1]}, re-rolling with seed {seed} "
+                  f"({attempt + 1}/{max_rerolls})")
+            if trace is not None:
+                trace.count('rerolls')
+            submit(job, seed, attempt + 1)
+            continue
+        if match:
+            print(f"  ⚠ {os.path.basename(job['path'])} still resembles {match[1]} after {max_rerolls} re-rolls, keeping it")
+        elif attempt and cache is not None:
+            cache.adopt(job['key'], job['path'])
+        print(f"   ✓ Saved to {job['path']} (worker {result['worker']})")
+        ok += 1
+        if telemetry:
+            telemetry.record(job, True, attempt + 1)
+    print()
+    return ok, failed
+
+def load_pipeline(device):
+    import torch
+    from diffusers import StableDiffusionPipeline
+
+    pipe = StableDiffusionPipeline.from_pretrained(
+        MODEL_ID,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        safety_checker=None,  # Disable safety checker for food images
+    )
+    pipe = pipe.to(device)
+
+    # Enable memory optimizations for faster generation
+    if device == "cuda":
+        pipe.enable_attention_slicing()
+    return pipe
+
+def benchmark(pipe, jobs, batch_size):
+    """Compare images/sec of the one-at-a-time loop with batched pipe() calls (nothing is saved)"""
+    width, height = jobs[0]['width'], jobs[0]['height']
+    prompts = [job['prompt'] for job in jobs if (job['width'], job['height']) == (width, height)][:batch_size]
+    print(f"⏱  Benchmarking {len(prompts)} images at {width}x{height}, {NUM_INFERENCE_STEPS} steps\n")
 
-    # Generate drink images
-    print("\n🥤 Generating DRINK images with Stable Diffusion...\n")
-    for drink in drinks:
+    # Warm-up so kernel selection and allocator growth don't count against either mode
+    pipe(prompts[0], height=height, width=width, num_inference_steps=1)
+
+    started = time.perf_counter()
+    for prompt in prompts:
+        pipe(prompt, height=height, width=width, num_inference_steps=NUM_INFERENCE_STEPS)
+    sequential = len(prompts) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    pipe(prompts, height=height, width=width, num_inference_steps=NUM_INFERENCE_STEPS)
+    batched = len(prompts) / (time.perf_counter() - started)
+
+    print(f"   One at a time: {sequential:.3f} images/sec")
+    print(f"   Batch of {len(prompts)}:    {batched:.3f} images/sec ({batched / sequential:.2f}x)\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate menu images locally with Stable Diffusion")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='images per pipe() call, capped by the memory budget (default: 1, one at a time)')
+    parser.add_argument('--memory-budget-gb', type=float, default=None,
+                        help='memory batches may use (default: 80%% of free GPU memory or 50%% of free RAM)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='time one-at-a-time vs batched generation and exit')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='load the model in this process even if sd_daemon.py is running')
+    parser.add_argument('--derive-cross', action='store_true',
+                        help='make each cross-section by img2img from its seeded normal view (implies --no-daemon)')
+    parser.add_argument('--cross-strength', type=float, default=DEFAULT_STRENGTH,
+                        help=f'fraction of the steps the derived cross-section re-runs (default: {DEFAULT_STRENGTH})')
+    add_worker_args(parser)
+    add_cache_args(parser)
+    add_menu_args(parser)
+    add_dedupe_args(parser)
+    add_telemetry_args(parser)
+    add_embedding_args(parser)
+    add_int8_args(parser)
+    args = parser.parse_args()
+    if args.workers > 1 and (args.derive_cross or args.benchmark or args.int8):
+        parser.error('--workers runs plain generation only (not --derive-cross, --benchmark or --int8)')
+    if args.workers > 1:
+        import torch
+        if torch.cuda.is_available():
+            parser.error('--workers is for CPU hosts; on a GPU use --batch-size instead')
+    return args
+
+def run_worker_pool(args, cache, jobs, cached, telemetry):
+    """generate_images() on a CPU host with --workers: N pinned processes sharing one set of weights"""
+    from sd_workers import WorkerPool
+
+    print(f"Starting {args.workers} Stable Diffusion workers...\n")
+    pool = WorkerPool(args.workers, MODEL_ID, embed_cache=not args.no_embed_cache)
+    try:
+        telemetry.backend = 'diffusers-pool'
+        telemetry.load(pool.start())
+        index = index_from_args(args, jobs)
+        print("📸 Generating images with Stable Diffusion...\n")
+        started = time.perf_counter()
+        telemetry.start()
+        successful, failed = run_pool(pool, cache, jobs, index, args.max_rerolls, telemetry)
+        elapsed = time.perf_counter() - started
+        telemetry.close()
+    finally:
+        pool.close()
+
+    print("\n" + "="*60)
+    print("✅ AI Image generation complete!")
+    print(f"   Generated: {successful} images")
+    if cached > 0:
+        print(f"   Cached: {cached} images")
+    if failed > 0:
+        print(f"   Failed: {failed} images")
+    print(f"   Throughput: {successful / elapsed:.3f} images/sec ({elapsed:.0f}s)")
+    print(pool.summary())
+    if index is not None:
+        index.save()
+    print("="*60 + "\n")
+
+def generate_images():
+    args = parse_args()
+    cache = cache_from_args(args)
+
+    print("\n🍔 HUGGING FACE AI IMAGE GENERATION\n")
+
+    # Check the cache first so an unchanged menu never pays for a model load
+    all_jobs = build_jobs()
+    int8_categories = int8_categories_from_args(args, MODEL_ID)
+    for job in mark_int8(all_jobs, int8_categories):
+        job['key'] = job_key(job)
+    if args.derive_cross:
+        # Seeded, derived views are different images, so they have their own cache keys
+        derive_keys(all_jobs, job_key, args.cross_strength)
+    # --changed narrows the run to the menu plan; pairing below still sees every view
+    plan, planned = plan_from_args(args, all_jobs)
+    jobs = planned if args.benchmark else restore_cached(planned, cache, force=args.force)
+    cached = len(planned) - len(jobs)
+    print(f"\n♻️  {cached} cached, {len(jobs)} to generate\n")
+    if not jobs:
+        plan.save()
+        print("✅ Everything is up to date, nothing to generate\n")
+        return
+
+    import torch
+    from sd_daemon import connect
+
+    telemetry = telemetry_from_args(args, 'generate_hf_images', 'diffusers')
+    make_dirs()
+
+    # Check if GPU is available
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    if args.workers > 1 and device == "cpu":
+        run_worker_pool(args, cache, jobs, cached, telemetry)
+        plan.save()
+        return
+
+    # A running sd_daemon.py already holds a warm pipeline; otherwise load one here
+    # Deriving needs the pipeline's modules in this process
+    # int8 modules are swapped into a pipeline in this process
+    pipe = connect(use_daemon=not (args.no_daemon or args.derive_cross or int8_categories))
+    if pipe is not None:
+        telemetry.backend = 'sd-daemon'
+    else:
+        print("Loading Stable Diffusion v1.5 model...")
+        print("(This may take 1-2 minutes on first run as it downloads the model)\n")
+        print(f"Using device: {device.upper()}\n")
+
+        # Load the pipeline
         try:
-            print(f"Generating {drink['name']}...")
-            image = pipe(drink['prompt'], height=800, width=600, num_inference_steps=30).images[0]
-            path = os.path.join(dirs['drinks'], f"{drink['id']}.jpg")
-            image.save(path)
-            print(f"   ✓ Saved to {path}\n")
-            successful += 1
+            load_started = time.perf_counter()
+            pipe = load_pipeline(device)
+            telemetry.load(time.perf_counter() - load_started)
         except Exception as e:
-            print(f"   ✗ Error: {str(e)}\n")
-            failed += 1
+            print(f"Error loading model: {e}")
+            print("Make sure you have enough disk space (5GB+) for the model")
+            return
+
+    if args.benchmark:
+        benchmark(pipe, jobs, max(2, args.batch_size))
+        return
+
+    budget = memory_budget_bytes(device, args.memory_budget_gb)
+    index = index_from_args(args, jobs)
+    embeddings = embeddings_from_args(args, pipe, MODEL_ID)
+    int8 = None
+    if int8_categories:
+        int8 = Int8Modules(pipe, MODEL_ID, keep_fp32=any(not job.get('quantization') for job in jobs))
+        int8_embeddings = embeddings_from_args(args, pipe, int8_model_id(MODEL_ID))
+    dtype_bytes = 2 if device == "cuda" else 4
+
+    successful = 0
+    failed = 0
+    started = time.perf_counter()
+    telemetry.start()
+
+    print("📸 Generating images with Stable Diffusion...\n")
+    pairs, jobs = plan_pairs(all_jobs, jobs) if args.derive_cross else ([], jobs)
+    if pairs:
+        pair_embeddings = embeddings
+        if int8 is not None:
+            # Burgers are all int8 or all fp32; img2img shares whichever modules are in
+            int8.use(bool(pairs[0]['normal'].get('quantization')))
+            pair_embeddings = int8_embeddings if pairs[0]['normal'].get('quantization') else embeddings
+        img2img = img2img_for(pipe)
+        store = LatentStore()
+        normal = pairs[0]['normal']
+        size = pick_batch_size(normal['width'], normal['height'], budget, args.batch_size, dtype_bytes)
+        print(f"🔀 {len(pairs)} burgers: cross-sections derived at strength {args.cross_strength:g}, {size} per batch\n")
+        for i in range(0, len(pairs), size):
+            ok, bad = run_pairs(pipe, img2img, cache, pairs[i:i + size], args.cross_strength, store, index,
+                                args.max_rerolls, telemetry, pair_embeddings)
+            successful += ok
+            failed += bad
+    for quantized, mode_jobs in by_mode(jobs):
+        if int8 is not None:
+            int8.use(quantized)
+        mode_embeddings = int8_embeddings if quantized else embeddings
+        for (width, height), group in group_by_resolution(mode_jobs).items():
+            size = pick_batch_size(width, height, budget, args.batch_size, dtype_bytes)
+            mode = ' (int8)' if quantized else ''
+            print(f"📐 {width}x{height}{mode}: {len(group)} images in batches of {size}\n")
+            for i in range(0, len(group), size):
+                ok, bad = run_batch(pipe, cache, group[i:i + size], index, args.max_rerolls, telemetry, mode_embeddings)
+                successful += ok
+                failed += bad
+    elapsed = time.perf_counter() - started
+    telemetry.close()
 
     # Summary
     print("\n" + "="*60)
     print("✅ AI Image generation complete!")
     print(f"   Generated: {successful} images")
+    if cached > 0:
+        print(f"   Cached: {cached} images")
     if failed > 0:
         print(f"   Failed: {failed} images")
+    print(f"   Throughput: {successful / elapsed:.3f} images/sec ({elapsed:.0f}s)")
+    if embeddings is not None:
+        print(f"   {embeddings.summary()}")
+    if int8 is not None and int8_embeddings is not None:
+        print(f"   {int8_embeddings.summary()} (int8)")
+    plan.save()
+    if index is not None:
+        index.save()
     print("="*60)
     print("\n🎨 All images are AI-generated using Stable Diffusion v1.5!")
     print("📁 Images saved to:")
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Static image payload report: what every route downloads from public/images
+Follows each page under app/ (with its layouts) through its @/ and relative
+imports, collects the /images/... paths in string literals along the way and,
+where data/menu.ts is reached, the MenuItem image fields those files read. Every
+file is then measured on disk: bytes, dimensions and decode cost (the RGBA
+bitmap the browser holds once it is decoded). The site uses plain <img>, so the
+bytes on disk are the bytes sent
+
+Files under public/images that nothing references are reported as orphans, as
+are files only referenced by components no page renders
+
+Exits 1 on a regression against the baseline (data/image-budget.json): a page
+heavier or with more requests than recorded, a new file over the budget, or a
+new reference to a missing file. Known problems stay warnings until fixed, so
+the check can gate CI from day one
+
+Usage:
+    python3 scripts/image-budget.py                      # report, compare with the baseline
+    python3 scripts/image-budget.py --update-baseline    # accept the current payload
+    python3 scripts/image-budget.py --time-decode --file-kb 200
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from gen_cache import atomic_write
+from menu_data import IMAGE_FIELDS, MENU_TS, load_menu_items, public_file
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+APP_DIR = os.path.join(ROOT, 'app')
+IMAGES_DIR = os.path.join(ROOT, 'public/images')
+BASELINE = os.path.join(ROOT, 'data/image-budget.json')
+
+# Per file: a full-width hero at 2x DPR encodes well under 300KB, and 2048x2048 is
+# more pixels than any slot on the site draws
+DEFAULT_FILE_KB = 300
+DEFAULT_DECODE_MP = 4.2
+
+# Per page, counting only what loads without interaction
+DEFAULT_PAGE_KB = 1500
+DEFAULT_PAGE_REQUESTS = 25
+
+# Growth allowed over the baseline before a page counts as regressed
+DEFAULT_TOLERANCE = 0.05
+
+# Menu fields that only load after an interaction (the cross-section toggle in MenuItem.tsx)
+DEFERRED_FIELDS = ('crossSectionImage',)
+
+# app/products/[id]/page.tsx shows the item plus up to 3 others from its category
+RELATED_ITEMS = 3
+
+# Files that wrap every page in their directory and below
+LAYOUT_FILES = ('layout.tsx', 'template.tsx')
+
+SOURCE_EXTENSIONS = ('.tsx', '.ts', '.jsx', '.js')
+
+# Generated output, referenced through the JSON maps in data/ rather than from code
+GENERATED_DIRS = ('_responsive',)
+
+_IMPORT_RE = re.compile(r"""(?:\bfrom|^\s*import)\s+['"]([^'"]+)['"]""", re.M)
+_STRING_RE = re.compile(r"""'([^'\n]*)'|"([^"\n]*)"|`([^`]*)`""")
+_IMAGE_URL_RE = re.compile(r'/images/[^\'"`$]+\.[A-Za-z0-9]+')
+_FIELD_RE = re.compile(r'\.(' + '|'.join(IMAGE_FIELDS) + r')\b')
+_SVG_RE = re.compile(r'<svg\b[^>]*>', re.S)
+_SVG_LENGTH_RE = r'\b{}\s*=\s*["\']\s*([\d.]+)\s*(?:px)?\s*["\']'
+
+
+def public_url(path):
+    return '/' + os.path.relpath(os.path.abspath(path), os.path.abspath(os.path.join(ROOT, 'public'))).replace(os.sep, '/')
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def resolve_import(spec, importer):
+    """Source file an import specifier points at, or None for packages and non-source files"""
+    if spec.startswith('@/'):
+        base = os.path.join(ROOT, spec[2:])
+    elif spec.startswith('.'):
+        base = os.path.join(os.path.dirname(importer), spec)
+    else:
+        return None
+    candidates = [base + ext for ext in SOURCE_EXTENSIONS] + [os.path.join(base, 'index' + ext) for ext in SOURCE_EXTENSIONS]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.normpath(candidate)
+    return None
+
+
+def image_refs(source):
+    """/images/... URLs in the string literals of a source file, including comma-separated lists"""
+    refs = []
+    for match in _STRING_RE.finditer(source):
+        for part in next(group for group in match.groups() if group is not None).split(','):
+            if _IMAGE_URL_RE.fullmatch(part.strip()):
+                refs.append(part.strip())
+    return refs
+
+
+def module_closure(entries):
+    """Every source file reachable from entries through relative and @/ imports, in discovery order"""
+    seen = {}
+    pending = list(entries)
+    while pending:
+        path = os.path.normpath(pending.pop(0))
+        if path in seen:
+            continue
+        seen[path] = source = _read(path)
+        pending += [target for target in (resolve_import(spec, path) for spec in _IMPORT_RE.findall(source)) if target]
+    return seen
+
+
+def find_pages(app_dir=APP_DIR):
+    """[(route, [page file and the layouts around it])], routes sorted"""
+    pages = []
+    for directory, subdirs, files in os.walk(app_dir):
+        subdirs[:] = sorted(d for d in subdirs if d != 'api')
+        if 'page.tsx' not in files:
+            continue
+        relative = os.path.relpath(directory, app_dir)
+        # Route groups like (shop) don't appear in the URL
+        segments = [s for s in relative.split(os.sep) if s != '.' and not (s.startswith('(') and s.endswith(')'))]
+        entries = [os.path.join(directory, 'page.tsx')]
+        parent = directory
+        while True:
+            entries += [os.path.join(parent, name) for name in LAYOUT_FILES if os.path.isfile(os.path.join(parent, name))]
+            if os.path.samefile(parent, app_dir):
+                break
+            parent = os.path.dirname(parent)
+        pages.append(('/' + '/'.join(segments), entries))
+    return sorted(pages)
+
+
+def page_instances(route, entries, items):
+    """
+    [(url path, {image url: deferred?})] for a route; one instance per menu item
+    when a dynamic route reads the menu, otherwise just the route
+    """
+    sources = module_closure(entries)
+    menu = os.path.normpath(MENU_TS)
+    # The menu's own paths only count through the fields the page reads
+    code = {path: source for path, source in sources.items() if path != menu}
+    literal = {}
+    for source in code.values():
+        for url in image_refs(source):
+            literal.setdefault(url, False)
+
+    read = {field for source in code.values() for field in _FIELD_RE.findall(source)}
+    fields = [field for field in IMAGE_FIELDS if field in read] if menu in sources else []
+
+    def with_items(shown):
+        refs = dict(literal)
+        for item in shown:
+            for field in fields:
+                if item.get(field):
+                    # An image that also loads up front isn't deferred
+                    refs[item[field]] = refs.get(item[field], True) and field in DEFERRED_FIELDS
+        return refs
+
+    if not fields:
+        return [(route, literal)]
+    if '[' not in route:
+        return [(route, with_items(items))]
+    instances = []
+    for item in items:
+        related = [other for other in items if other.get('category') == item.get('category') and other['id'] != item['id']]
+        path = re.sub(r'\[[^\]]+\]', item['id'], route, count=1)
+        instances.append((path, with_items([item] + related[:RELATED_ITEMS])))
+    return instances
+
+
+def svg_size(path):
+    """Intrinsic (width, height) of an SVG from its width/height or viewBox, or None"""
+    match = _SVG_RE.search(_read(path))
+    if not match:
+        return None
+    tag = match.group(0)
+    width, height = (re.search(_SVG_LENGTH_RE.format(name), tag) for name in ('width', 'height'))
+    if width and height:
+        return round(float(width.group(1))), round(float(height.group(1)))
+    view_box = re.search(r'viewBox\s*=\s*["\']\s*[-\d.]+[\s,]+[-\d.]+[\s,]+([\d.]+)[\s,]+([\d.]+)', tag)
+    if view_box:
+        return round(float(view_box.group(1))), round(float(view_box.group(2)))
+    return None
+
+
+def measure(url, time_decode=False):
+    """{bytes, width, height, decoded_mb[, decode_ms]} of the file behind a URL, or None if it is missing"""
+    path = public_file(url)
+    if not os.path.isfile(path):
+        return None
+    info = {'bytes': os.path.getsize(path), 'width': None, 'height': None}
+    vector = path.lower().endswith('.svg')
+    if vector:
+        size = svg_size(path)
+    else:
+        from PIL import Image, UnidentifiedImageError
+
+        try:
+            with Image.open(path) as img:
+                size = img.size
+                if time_decode:
+                    started = time.perf_counter()
+                    img.load()
+                    info['decode_ms'] = (time.perf_counter() - started) * 1000
+        except UnidentifiedImageError:
+            size = None
+    if size:
+        info['width'], info['height'] = size
+    # SVGs are rasterised at the size they are drawn, so only bitmaps have a fixed decode cost
+    info['decoded_mb'] = size[0] * size[1] * 4 / 2**20 if size and not vector else 0.0
+    return info
+
+
+def image_files(images_dir=IMAGES_DIR):
+    """URL of every file under public/images, skipping dotfiles and generated output"""
+    urls = []
+    for directory, subdirs, files in os.walk(images_dir):
+        subdirs[:] = sorted(d for d in subdirs if d not in GENERATED_DIRS)
+        urls += [public_url(os.path.join(directory, name)) for name in sorted(files) if not name.startswith('.')]
+    return urls
+
+
+def source_refs():
+    """Every /images/ URL named anywhere in app/, components/ or data/ (the menu, manifests, atlas maps)"""
+    refs = set()
+    for top in ('app', 'components', 'data'):
+        for directory, subdirs, files in os.walk(os.path.join(ROOT, top)):
+            for name in files:
+                if name.endswith(SOURCE_EXTENSIONS + ('.json',)):
+                    refs.update(image_refs(_read(os.path.join(directory, name))))
+    return refs
+
+
+def analyze(time_decode=False):
+    """The payload report: pages, files, orphans and missing references"""
+    items = load_menu_items()
+    files = {}
+    pages = {}
+    for route, entries in find_pages():
+        worst = None
+        for path, refs in page_instances(route, entries, items):
+            for url in refs:
+                if url not in files:
+                    files[url] = measure(url, time_decode)
+            loaded = [url for url, deferred in refs.items() if not deferred and files[url]]
+            page = {
+                'bytes': sum(files[url]['bytes'] for url in loaded),
+                'requests': len(loaded),
+                'decoded_mb': round(sum(files[url]['decoded_mb'] for url in loaded), 1),
+                'deferred_bytes': sum(files[url]['bytes'] for url, deferred in refs.items() if deferred and files[url]),
+                'missing': sorted(url for url in refs if files[url] is None),
+                'images': list(refs),
+            }
+            if path != route:
+                page['worst'] = path
+            if worst is None or page['bytes'] > worst['bytes']:
+                worst = page
+        pages[route] = worst
+
+    rendered = {url for page in pages.values() for url in page['images']}
+    named = source_refs()
+    orphans = {}
+    for url in image_files():
+        if url not in rendered:
+            orphans[url] = 'not rendered by any page' if url in named else 'unreferenced'
+    return {'pages': pages, 'files': files, 'orphans': orphans}
+
+
+def over_budget(files, file_kb, decode_mp):
+    """{url: reason} for files past the per-file byte or decoded-pixel budget"""
+    flagged = {}
+    for url, info in files.items():
+        if info is None:
+            continue
+        reasons = []
+        if info['bytes'] > file_kb * 1024:
+            reasons.append(f"{info['bytes'] / 1024:.0f}KB > {file_kb}KB")
+        if info['decoded_mb'] and info['width'] * info['height'] > decode_mp * 1e6:
+            reasons.append(f"{info['width']}x{info['height']} > {decode_mp}MP")
+        if reasons:
+            flagged[url] = ', '.join(reasons)
+    return flagged
+
+
+def baseline_entry(report, flagged):
+    """The part of a report kept as the baseline"""
+    return {
+        'pages': {route: {key: page[key] for key in ('bytes', 'requests', 'decoded_mb')}
+                  for route, page in report['pages'].items()},
+        'over_budget': sorted(flagged),
+        'missing': sorted({url for page in report['pages'].values() for url in page['missing']}),
+    }
+
+
+def load_baseline(path=BASELINE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def regressions(report, flagged, baseline, args):
+    """Problems that are new since the baseline; without one, every page over the page budget"""
+    problems = []
+    known = baseline or {'pages': {}, 'over_budget': [], 'missing': []}
+    for route, page in report['pages'].items():
+        before = known['pages'].get(route)
+        if before is None:
+            if page['bytes'] > args.page_kb * 1024:
+                problems.append(f"{route}: {page['bytes'] / 2**20:.1f}MB is over the {args.page_kb}KB page budget")
+            if page['requests'] > args.page_requests:
+                problems.append(f"{route}: {page['requests']} requests is over the budget of {args.page_requests}")
+            continue
+        if page['bytes'] > before['bytes'] * (1 + args.tolerance):
+            problems.append(f"{route}: {before['bytes'] / 2**20:.1f}MB -> {page['bytes'] / 2**20:.1f}MB")
+        if page['requests'] > before['requests']:
+            problems.append(f"{route}: {before['requests']} -> {page['requests']} requests")
+    problems += [f"{url}: over budget ({reason})" for url, reason in flagged.items()
+                 if url not in known['over_budget'] and any(url in page['images'] for page in report['pages'].values())]
+    missing = {url for page in report['pages'].values() for url in page['missing']}
+    problems += [f"{url}: referenced but missing" for url in sorted(missing - set(known['missing']))]
+    return problems
+
+
+def _size(info):
+    return f"{info['width']}x{info['height']}" if info['width'] else '?'
+
+
+def print_report(report, flagged, show_files):
+    print(f"\n{'route':<36} {'requests':>8} {'bytes':>9} {'decoded':>9} {'deferred':>9}")
+    for route, page in report['pages'].items():
+        label = f"{route} ({page['worst']})" if 'worst' in page else route
+        print(f"{label:<36} {page['requests']:>8} {page['bytes'] / 2**20:>7.1f}MB {page['decoded_mb']:>7.1f}MB "
+              f"{page['deferred_bytes'] / 2**20:>7.1f}MB")
+        if show_files:
+            for url in page['images']:
+                info = report['files'][url]
+                if info is None:
+                    print(f"    ✗ missing                      {url}")
+                    continue
+                decode = f" {info['decode_ms']:6.0f}ms" if 'decode_ms' in info else ''
+                print(f"    {info['bytes'] / 1024:7.0f}KB {_size(info):>11} {info['decoded_mb']:6.1f}MB{decode}  {url}")
+
+    files = report['files']
+    if flagged:
+        print(f"\n⚠️  {len(flagged)} files over budget:")
+        for url, reason in sorted(flagged.items(), key=lambda entry: -files[entry[0]]['bytes']):
+            print(f"  {url:<52} {reason}")
+    missing = sorted(url for url, info in files.items() if info is None)
+    if missing:
+        print(f"\n✗ {len(missing)} referenced files missing from public/:")
+        for url in missing:
+            print(f"  {url}")
+    if report['orphans']:
+        orphan_bytes = sum(os.path.getsize(public_file(url)) for url in report['orphans'])
+        print(f"\n🗑  {len(report['orphans'])} orphaned files ({orphan_bytes / 2**20:.1f}MB):")
+        for url, reason in report['orphans'].items():
+            print(f"  {url:<52} {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-kb', type=int, default=DEFAULT_FILE_KB, help=f'per-file byte budget (default: {DEFAULT_FILE_KB})')
+    parser.add_argument('--decode-mp', type=float, default=DEFAULT_DECODE_MP,
+                        help=f'per-file decoded megapixel budget (default: {DEFAULT_DECODE_MP})')
+    parser.add_argument('--page-kb', type=int, default=DEFAULT_PAGE_KB,
+                        help=f'page budget for routes not in the baseline (default: {DEFAULT_PAGE_KB})')
+    parser.add_argument('--page-requests', type=int, default=DEFAULT_PAGE_REQUESTS,
+                        help=f'request budget for routes not in the baseline (default: {DEFAULT_PAGE_REQUESTS})')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'page growth over the baseline allowed, as a fraction (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline to compare with (default: data/image-budget.json)')
+    parser.add_argument('--update-baseline', action='store_true', help='record the current payload as the baseline')
+    parser.add_argument('--time-decode', action='store_true', help='decode every image once and report the time')
+    parser.add_argument('--files', action='store_true', help='list each page\'s images')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = analyze(args.time_decode)
+    flagged = over_budget(report['files'], args.file_kb, args.decode_mp)
+    if args.json:
+        print(json.dumps(dict(report, over_budget=flagged), indent=2))
+    else:
+        print_report(report, flagged, args.files)
+
+    if args.update_baseline:
+        entry = baseline_entry(report, flagged)
+        atomic_write(args.baseline, (json.dumps(entry, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+        print(f"\n📝 Baseline written to {os.path.relpath(args.baseline)}\n")
+        return
+
+    baseline = load_baseline(args.baseline)
+    problems = regressions(report, flagged, baseline, args)
+    out = sys.stderr if args.json else sys.stdout
+    if baseline is None:
+        print(f"\n🗒  No baseline at {os.path.relpath(args.baseline)}: checking pages against the absolute budgets",
+              file=out)
+    if problems:
+        print(f"\n❌ {len(problems)} image payload regressions:", file=out)
+        for problem in problems:
+            print(f"  {problem}", file=out)
+        print(file=out)
+        sys.exit(1)
+    print("\n✅ No image payload regressions\n", file=out)
+
+
+if __name__ == '__main__':
+    main()
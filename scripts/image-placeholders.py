@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Precompute placeholders for every image referenced by MENU_ITEMS in data/menu.ts
+For each path: a BlurHash, a tiny base64 WebP usable directly as a blurred
+background / next/image blurDataURL, and a dominant colour, written to
+data/placeholders.ts so cards can paint something before the real image loads
+
+Usage:
+    python3 scripts/image-placeholders.py
+    python3 scripts/image-placeholders.py --components 5 4 --micro-size 24
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import time
+
+from gen_cache import atomic_write
+from menu_data import image_paths, load_menu_items, public_file
+
+OUTPUT = os.path.join(os.path.dirname(__file__), '../data/placeholders.ts')
+
+# Transparent images are flattened onto the page background (body in app/globals.css)
+PAGE_BACKGROUND = (0xE4, 0xE3, 0xD9)
+
+# Everything is computed from a downscaled copy; 64px keeps the maths tiny
+# and is still far more detail than a 4x3 BlurHash or a 16px preview can show
+WORKING_SIZE = 64
+DEFAULT_COMPONENTS = (4, 3)
+DEFAULT_MICRO_SIZE = 16
+
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def encode83(value, length):
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def srgb_to_linear(values):
+    """uint8 sRGB array -> float linear light, elementwise"""
+    import numpy as np
+
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(value):
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return abs(value) ** exponent * (1 if value >= 0 else -1)
+
+
+def blurhash(rgb, components=DEFAULT_COMPONENTS):
+    """
+    BlurHash of an (H, W, 3) uint8 array
+    All x_components * y_components DCT factors come from one einsum over the
+    separable cosine bases instead of the reference per-pixel loops
+    """
+    import numpy as np
+
+    cx, cy = components
+    height, width = rgb.shape[:2]
+    linear = srgb_to_linear(rgb.astype(np.float64))
+
+    basis_x = np.cos(np.pi * np.outer(np.arange(cx), np.arange(width)) / width)    # (cx, W)
+    basis_y = np.cos(np.pi * np.outer(np.arange(cy), np.arange(height)) / height)  # (cy, H)
+    normalisation = np.full((cy, cx, 1), 2.0)
+    normalisation[0, 0] = 1.0  # DC term is not doubled
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) * normalisation / (width * height)
+    factors = factors.reshape(cx * cy, 3)  # row-major: j outer, i inner, as the spec orders them
+
+    dc, ac = factors[0], factors[1:]
+    result = encode83((cx - 1) + (cy - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += encode83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += encode83(0, 1)
+
+    result += encode83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+    for r, g, b in ac:
+        quant = [int(max(0, min(18, np.floor(sign_pow(c / maximum, 0.5) * 9 + 9.5)))) for c in (r, g, b)]
+        result += encode83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+    return result
+
+
+def dominant_colour(rgba, bits=4):
+    """
+    Most common colour among the opaque pixels, as #rrggbb
+    Pixels are bucketed to `bits` per channel and counted with one bincount; the
+    answer is the mean of the winning bucket, so it is a real colour from the image
+    """
+    import numpy as np
+
+    pixels = rgba.reshape(-1, 4)
+    opaque = pixels[pixels[:, 3] >= 128, :3]
+    if not len(opaque):
+        return '#%02x%02x%02x' % PAGE_BACKGROUND
+    shift = 8 - bits
+    q = (opaque >> shift).astype(np.int32)
+    buckets = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    winner = np.bincount(buckets).argmax()
+    r, g, b = opaque[buckets == winner].mean(axis=0).round().astype(int)
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def micro_data_url(image, size=DEFAULT_MICRO_SIZE):
+    """A size-px-long WebP (alpha kept) as a data: URL; browsers upscale it blurry for free"""
+    from PIL import Image
+
+    micro = image.copy()
+    micro.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    micro.save(buffer, format='WEBP', quality=40, method=6)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def placeholder(path, components=DEFAULT_COMPONENTS, micro_size=DEFAULT_MICRO_SIZE):
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as img:
+        width, height = img.size
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        small = img.copy()
+        small.thumbnail((WORKING_SIZE, WORKING_SIZE), Image.BOX)
+
+    rgba = np.asarray(small.convert('RGBA'))
+    # BlurHash has no alpha channel: flatten onto the page colour the image sits on
+    alpha = rgba[:, :, 3:4] / 255.0
+    flat = (rgba[:, :, :3] * alpha + np.array(PAGE_BACKGROUND) * (1 - alpha)).round().astype(np.uint8)
+
+    return {
+        'width': width,
+        'height': height,
+        'color': dominant_colour(rgba),
+        'blurhash': blurhash(flat, components),
+        'blurDataURL': micro_data_url(img, micro_size),
+    }
+
+
+def ts_literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+    return json.dumps(value)
+
+
+def render_ts(placeholders):
+    lines = [
+        '// Generated by scripts/image-placeholders.py from data/menu.ts. Do not edit by hand.',
+        '',
+        'export interface ImagePlaceholder {',
+        '  width: number',
+        '  height: number',
+        '  color: string',
+        '  blurhash: string',
+        '  blurDataURL: string',
+        '}',
+        '',
+        'export const IMAGE_PLACEHOLDERS: Record<string, ImagePlaceholder> = {',
+    ]
+    for path, entry in placeholders.items():
+        lines.append(f"  {ts_literal(path)}: {{")
+        for key, value in entry.items():
+            lines.append(f"    {key}: {ts_literal(value)},")
+        lines.append('  },')
+    lines += [
+        '}',
+        '',
+        'export function getPlaceholder(path: string): ImagePlaceholder | undefined {',
+        '  return IMAGE_PLACEHOLDERS[path]',
+        '}',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', type=int, nargs=2, default=DEFAULT_COMPONENTS, metavar=('X', 'Y'),
+                        help='BlurHash components, 1-9 each (default: 4 3)')
+    parser.add_argument('--micro-size', type=int, default=DEFAULT_MICRO_SIZE, help='longest side of the inline preview in px')
+    parser.add_argument('--output', default=OUTPUT, help='generated TypeScript file (default: data/placeholders.ts)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not all(1 <= c <= 9 for c in args.components):
+        raise SystemExit("BlurHash components must be between 1 and 9")
+
+    paths = image_paths(load_menu_items())
+    print(f"\n🎨 Placeholders for {len(paths)} menu images\n")
+
+    placeholders = {}
+    missing = 0
+    started = time.perf_counter()
+    for path in paths:
+        filepath = public_file(path)
+        if not os.path.exists(filepath):
+            print(f"⚠ Missing: {path}")
+            missing += 1
+            continue
+        entry = placeholder(filepath, tuple(args.components), args.micro_size)
+        placeholders[path] = entry
+        print(f"✓ {path}  {entry['color']}  {entry['blurhash']}  ({len(entry['blurDataURL'])} chars inline)")
+    elapsed = time.perf_counter() - started
+
+    data = render_ts(placeholders)
+    try:
+        with open(args.output, encoding='utf-8') as f:
+            unchanged = f.read() == data
+    except FileNotFoundError:
+        unchanged = False
+    if not unchanged:
+        atomic_write(args.output, data.encode('utf-8'))
+
+    inline = sum(len(e['blurDataURL']) for e in placeholders.values())
+    print(f"\n⏱  {len(placeholders)} images in {elapsed:.2f}s, {inline / 1024:.1f}KB of inline previews")
+    print(f"{'✓ Unchanged' if unchanged else '📝 Wrote'}: {os.path.relpath(args.output)}")
+    if missing:
+        print(f"⚠ {missing} referenced images are missing")
+
+
+if __name__ == '__main__':
+    main()
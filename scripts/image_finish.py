@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Decode, validate and re-encode generated images before they are published
+Whatever a server sends back (an error page, a PNG, a 1024px JPEG with EXIF)
+is decoded, rejected if it is corrupt, tiny or blank, and re-encoded as a
+progressive, optimized JPEG without metadata, inside its category's byte budget
+
+The API generators download to a staging file and run finish_download() in
+job_pool's post stage, so encoding one image overlaps the next download
+
+Usage:
+    python3 scripts/image_finish.py                 # report menu images over budget
+    python3 scripts/image_finish.py --write         # re-encode those in place
+    python3 scripts/image_finish.py public/images/burgers/classic.jpg --write
+"""
+
+import argparse
+import glob
+import io
+import os
+
+from gen_cache import atomic_write
+from telemetry import timed
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+MENU_GLOBS = [os.path.join(ROOT, 'public/images', category, '*.jpg') for category in ('burgers', 'sides', 'drinks')]
+
+# Bytes per image, keyed by the directory it lands in
+BUDGETS = {
+    'burgers': 100 * 1024,
+    'sides': 80 * 1024,
+    'drinks': 80 * 1024,
+}
+DEFAULT_BUDGET = 120 * 1024
+
+MAX_SIDE = 768  # The menu library's size; responsive-images.py derives the smaller widths
+MIN_SIDE = 256  # Anything smaller is a thumbnail or an error image, not a generation
+QUALITY_RANGE = (50, 85)  # Above 85 the bytes grow fast for no visible gain
+DOWNSCALE_STEP = 0.85  # When even the lowest quality misses the budget
+BLANK_STDDEV = 4.0  # Luma spread below this is a flat frame (e.g. a safety-filter black image)
+BACKGROUND = (255, 255, 255)  # Transparent pixels are flattened onto this
+
+
+class ImageRejected(Exception):
+    """The bytes are not a usable image; the published file is left alone"""
+
+
+def budget_for(path):
+    return BUDGETS.get(os.path.basename(os.path.dirname(os.path.abspath(path))), DEFAULT_BUDGET)
+
+
+def staging_path(dest):
+    """Where a download waits to be finished; the .tmp- prefix keeps it out of every index"""
+    directory, name = os.path.split(dest)
+    return os.path.join(directory, f'.tmp-{name}.download')
+
+
+def decode(data):
+    """Fully decode image bytes; raises ImageRejected for anything Pillow can't read"""
+    from PIL import Image, UnidentifiedImageError
+
+    if not data:
+        raise ImageRejected("empty file")
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError) as e:
+        head = data[:64].lstrip().lower()
+        kind = 'an HTML/JSON error page' if head[:1] in (b'<', b'{') else f'not a readable image ({e})'
+        raise ImageRejected(kind) from None
+    return img
+
+
+def check(img):
+    """Reject images that decoded fine but can't be what we asked for"""
+    import numpy as np
+
+    if min(img.size) < MIN_SIDE:
+        raise ImageRejected(f"too small ({img.width}x{img.height})")
+    probe = img.convert('L')
+    probe.thumbnail((64, 64))
+    spread = float(np.asarray(probe, dtype=np.float32).std())
+    if spread < BLANK_STDDEV:
+        raise ImageRejected(f"blank (luma stddev {spread:.1f})")
+
+
+def flatten(img):
+    from PIL import Image
+
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, BACKGROUND)
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def encode_jpeg(img, quality):
+    # No exif= or icc_profile= arguments: Pillow writes neither unless asked
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def fit_budget(img, budget):
+    """
+    (jpeg bytes, quality, size) for the highest quality that fits the budget
+    Downscales in steps when even the lowest quality is too big; past MIN_SIDE it
+    gives up and returns the lowest-quality encode
+    """
+    from PIL import Image
+
+    if max(img.size) > MAX_SIDE:
+        img = img.copy()
+        img.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    while True:
+        lo, hi = QUALITY_RANGE
+        best = None
+        while lo <= hi:
+            quality = (lo + hi) // 2
+            data = encode_jpeg(img, quality)
+            if len(data) <= budget:
+                best = (data, quality)
+                lo = quality + 1
+            else:
+                hi = quality - 1
+        if best:
+            return best[0], best[1], img.size
+        smaller = (round(img.width * DOWNSCALE_STEP), round(img.height * DOWNSCALE_STEP))
+        if min(smaller) < MIN_SIDE:
+            return encode_jpeg(img, QUALITY_RANGE[0]), QUALITY_RANGE[0], img.size
+        img = img.resize(smaller, Image.LANCZOS)
+
+
+def finish_bytes(data, budget):
+    """Raw download -> (jpeg bytes, info); raises ImageRejected"""
+    img = decode(data)
+    source = {'format': img.format, 'size': img.size, 'bytes': len(data)}
+    check(img)
+    jpeg, quality, size = fit_budget(flatten(img), budget)
+    return jpeg, {'source': source, 'bytes': len(jpeg), 'quality': quality, 'size': size}
+
+
+def finish_download(raw, dest, cache=None, key=None, trace=None):
+    """
+    Finish the staged download at raw and publish it at dest (through the cache
+    entry for key when a cache is given). The staging file is always removed;
+    raises ImageRejected, leaving dest untouched
+    """
+    name = os.path.basename(dest)
+    try:
+        with timed(trace, 'finish'):
+            with open(raw, 'rb') as f:
+                data = f.read()
+            jpeg, info = finish_bytes(data, budget_for(dest))
+            if cache is not None:
+                cache.put(key, jpeg, dest)
+            else:
+                atomic_write(dest, jpeg)
+    except ImageRejected:
+        if trace is not None:
+            trace.count('rejected')
+        raise
+    finally:
+        if os.path.exists(raw):
+            os.unlink(raw)
+
+    if trace is not None:
+        trace.count('output_bytes', info['bytes'])
+    source = info['source']
+    print(f"  ✅ Saved {name}: {source['bytes'] // 1024}KB {source['format']} {source['size'][0]}x{source['size'][1]}"
+          f" -> {info['bytes'] // 1024}KB JPEG q{info['quality']} {info['size'][0]}x{info['size'][1]}")
+    return info
+
+
+def save_generated(image, dest, cache=None, key=None, trace=None):
+    """Finish an in-memory PIL image (local pipelines) and publish it like finish_download"""
+    with timed(trace, 'save'):
+        check(image)
+        jpeg, quality, _ = fit_budget(flatten(image), budget_for(dest))
+        if cache is not None:
+            cache.put(key, jpeg, dest)
+        else:
+            atomic_write(dest, jpeg)
+    if trace is not None:
+        trace.add_bytes(len(jpeg))
+    return len(jpeg), quality
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='JPEGs to check (default: public/images/{burgers,sides,drinks}/*.jpg)')
+    parser.add_argument('--write', action='store_true', help='re-encode images that are over budget or not progressive')
+    args = parser.parse_args()
+
+    from PIL import Image
+
+    paths = args.paths or sorted(p for pattern in MENU_GLOBS for p in glob.glob(pattern))
+    over = fixed = 0
+    for path in paths:
+        name = os.path.relpath(path, ROOT) if not args.paths else path
+        size = os.path.getsize(path)
+        budget = budget_for(path)
+        with Image.open(path) as img:
+            clean = (img.format == 'JPEG' and img.info.get('progressive') and 'exif' not in img.info
+                     and max(img.size) <= MAX_SIDE)
+        if size <= budget and clean:
+            continue
+        over += 1
+        reason = f"{size // 1024}KB > {budget // 1024}KB" if size > budget else 'not a progressive, metadata-free JPEG'
+        if not args.write:
+            print(f"  ⚠ {name}: {reason}")
+            continue
+        try:
+            with open(path, 'rb') as f:
+                jpeg, info = finish_bytes(f.read(), budget)
+        except ImageRejected as e:
+            print(f"  ❌ {name}: {e}")
+            continue
+        atomic_write(path, jpeg)
+        fixed += 1
+        print(f"  ✓ {name}: {reason} -> {info['bytes'] // 1024}KB q{info['quality']}")
+
+    print(f"\n{'✓' if not over else '⚠'} {len(paths)} images checked, {over} needed work"
+          + (f", {fixed} re-encoded" if args.write else ' (run with --write to fix)' if over else '') + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Async job pool shared by the image generators
+Bounded-concurrency workers with a token-bucket rate limiter and a retry
+scheduler that parks failing jobs with backoff instead of blocking a worker
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import time
+
+# bench_generators.py sets this to collect each run's numbers without parsing output
+STATS_FILE_ENV = 'JOB_STATS_FILE'
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        """Wait until a token is available, then take it"""
+        if not self.rate or self.rate <= 0:
+            return
+
+        # Created lazily so the bucket can be built outside a running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryLater(Exception):
+    """
+    Raised by a worker when its job should be tried again later (503, timeout...)
+    `retry_after` is the server's own estimate in seconds, if it gave one
+    """
+
+    def __init__(self, reason='', retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt, base=2.0, cap=60.0, hint=None):
+    """
+    Seconds to park a job before attempt number `attempt` + 1
+    Full-jitter exponential backoff; a server hint (Retry-After / estimated_time)
+    becomes the floor, with up to 20% jitter so parked jobs don't wake in lockstep
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if hint is not None:
+        delay = max(delay, hint * random.uniform(1.0, 1.2))
+    return delay
+
+
+async def _call(worker, job):
+    if asyncio.iscoroutinefunction(worker):
+        return await worker(job)
+    # Blocking workers (requests, diffusers) run on the default thread pool
+    return await asyncio.to_thread(worker, job)
+
+
+async def run_jobs(jobs, worker, concurrency=4, bucket=None, max_attempts=1, deadline=None, on_finish=None,
+                   post=None, post_workers=None):
+    """
+    Run `worker(job)` for every job with at most `concurrency` jobs in flight
+    `worker` may be a plain function (run in a thread) or a coroutine function
+    and should return something truthy on success
+
+    A worker that raises RetryLater gets its job parked with backoff while the
+    other jobs keep flowing, up to `max_attempts` tries in total; no attempt is
+    scheduled past `deadline` seconds from the start of the run
+    on_finish(result) is called as each job completes (see telemetry.Telemetry.job_done)
+
+    post(job), if given, runs after a successful worker call on its own pool of
+    `post_workers` threads (default: one per core) and decides the outcome; the
+    worker slot is freed meanwhile, so CPU work overlaps the next download.
+    post may raise RetryLater too
+    Returns a stats dict (see summarize)
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    run_started = time.monotonic()
+    for job in jobs:
+        # `ready` is when the entry last became runnable; queue/backoff accumulate across attempts
+        queue.put_nowait({'job': job, 'attempts': 0, 'first_started': None,
+                          'ready': run_started, 'queue': 0.0, 'backoff': 0.0})
+
+    results = []
+    workers = max(1, min(concurrency, len(jobs)))
+    outstanding = len(jobs)
+    post_pool = None
+    post_tasks = set()
+    if post is not None:
+        from concurrent.futures import ThreadPoolExecutor
+        post_pool = ThreadPoolExecutor(max_workers=post_workers or os.cpu_count() or 1, thread_name_prefix='post')
+
+    def finish(entry, ok):
+        nonlocal outstanding
+        result = {
+            'job': entry['job'],
+            'ok': ok,
+            'attempts': entry['attempts'],
+            'seconds': time.monotonic() - (entry['first_started'] or run_started),
+            'queue': entry['queue'],
+            'backoff': entry['backoff'],
+        }
+        results.append(result)
+        if on_finish is not None:
+            on_finish(result)
+        outstanding -= 1
+        if outstanding == 0:
+            # Wake every idle worker so it can exit
+            for _ in range(workers):
+                queue.put_nowait(None)
+
+    def park(entry, error):
+        label = entry['job'].get('label', 'job')
+        delay = backoff_delay(entry['attempts'] - 1, hint=error.retry_after)
+        if entry['attempts'] >= max_attempts:
+            print(f"  ❌ {label}: {error.reason}, giving up after {entry['attempts']} attempts")
+            finish(entry, False)
+        elif deadline is not None and time.monotonic() + delay - run_started > deadline:
+            print(f"  ❌ {label}: {error.reason}, retry would miss the {deadline:.0f}s deadline")
+            finish(entry, False)
+        else:
+            print(f"  ⏳ {label}: {error.reason}, retrying in {delay:.1f}s "
+                  f"(attempt {entry['attempts'] + 1}/{max_attempts})")
+            entry['parked'] = time.monotonic()
+            loop.call_later(delay, wake, entry)
+
+    def wake(entry):
+        entry['ready'] = time.monotonic()
+        entry['backoff'] += entry['ready'] - entry['parked']
+        queue.put_nowait(entry)
+
+    async def run_post(entry):
+        try:
+            ok = bool(await loop.run_in_executor(post_pool, post, entry['job']))
+        except RetryLater as e:
+            park(entry, e)
+            return
+        except Exception as e:
+            print(f"  ❌ {entry['job'].get('label', 'job')}: {str(e)[:80]}")
+            ok = False
+        finish(entry, ok)
+
+    async def consume():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+
+            if bucket is not None:
+                await bucket.acquire()
+
+            entry['attempts'] += 1
+            now = time.monotonic()
+            entry['queue'] += now - entry['ready']
+            if entry['first_started'] is None:
+                entry['first_started'] = now
+            try:
+                ok = bool(await _call(worker, entry['job']))
+            except RetryLater as e:
+                park(entry, e)
+                continue
+            except Exception as e:
+                print(f"  ❌ {entry['job'].get('label', 'job')}: {str(e)[:80]}")
+                ok = False
+            if ok and post is not None:
+                task = loop.create_task(run_post(entry))
+                post_tasks.add(task)  # Keep a reference until it is done
+                task.add_done_callback(post_tasks.discard)
+                continue
+            finish(entry, ok)
+
+    if not jobs:
+        return summarize(results, 0.0)
+    try:
+        await asyncio.gather(*(consume() for _ in range(workers)))
+    finally:
+        if post_pool is not None:
+            post_pool.shutdown(wait=True)
+    return summarize(results, time.monotonic() - run_started)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(results, elapsed):
+    """Collapse per-job results into run-level throughput numbers"""
+    latencies = [r['seconds'] for r in results]
+    ok = sum(1 for r in results if r['ok'])
+    return {
+        'results': results,
+        'ok': ok,
+        'failed': len(results) - ok,
+        'elapsed': elapsed,
+        'images_per_sec': ok / elapsed if elapsed > 0 else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+    }
+
+
+def dump_stats(stats, path=None):
+    """Write run stats (minus the job dicts) as JSON to path, by default $JOB_STATS_FILE if it is set"""
+    path = path or os.environ.get(STATS_FILE_ENV)
+    if not path:
+        return
+    data = {k: v for k, v in stats.items() if k != 'results'}
+    data['jobs'] = [{'label': r['job'].get('label'), 'ok': r['ok'], 'attempts': r['attempts'], 'seconds': r['seconds']}
+                    for r in stats['results']]
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+
+def print_throughput(stats):
+    """Print the per-run throughput line used by every generator"""
+    print(f"⏱  {stats['ok']} images in {stats['elapsed']:.1f}s "
+          f"({stats['images_per_sec']:.2f} images/sec, "
+          f"p50 {stats['p50']:.1f}s, p95 {stats['p95']:.1f}s per job)")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Low-memory local generation for small build agents
+The pipeline's modules are exported once to .cache/low-memory, one at a time from
+the model's safetensors with low_cpu_mem_usage, and mmapped from there: weights
+are file-backed pages faulted in as they are used, never copies. Between phases
+of a pipe() call the idle modules are unmapped: the text encoder once prompts are
+encoded and the VAE while the UNet denoises. Decoding is VAE sliced and tiled.
+Peak RSS is checked against a ceiling at every step, and each image's peak is
+reported
+
+channels_last is skipped in this mode, because converting the layout copies the mapped weights
+
+Usage:
+    python3 scripts/quick_generate.py --low-memory --max-rss-mb 4096
+    python3 scripts/low_memory.py --export               # export ahead of time, print sizes
+"""
+
+import argparse
+import gc
+import hashlib
+import os
+
+from derive_views import decode_latents
+from sd_pipeline import MODEL_ID, PROFILES, tune_cpu_threads, use_profile_scheduler
+from telemetry import peak_rss_bytes, reset_peak_rss
+
+WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), '../.cache/low-memory')
+
+# SD 1.5's fp32 UNet (3.4GB) plus activations, leaving an 8GB agent room for the Next.js build
+DEFAULT_MAX_RSS_MB = 5120
+
+# Exported module -> (library, class) it is loaded with
+MODULES = {
+    'text_encoder': ('transformers', 'CLIPTextModel'),
+    'unet': ('diffusers', 'UNet2DConditionModel'),
+    'vae': ('diffusers', 'AutoencoderKL'),
+}
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """Peak RSS went over the --max-rss-mb ceiling"""
+
+    def __init__(self, phase, peak_mb, max_rss_mb):
+        super().__init__(f"peak RSS {peak_mb:.0f}MB while {phase} is over the {max_rss_mb}MB ceiling")
+        self.peak_mb = peak_mb
+        self.max_rss_mb = max_rss_mb
+
+
+def weights_dir(model_id=MODEL_ID):
+    digest = hashlib.sha256(f'{model_id}|float32'.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(WEIGHTS_DIR, digest)
+
+
+def export_modules(model_id=MODEL_ID):
+    """
+    Pickle each module of model_id on its own, for mmap loading; returns the directory
+    Modules are loaded one at a time, so exporting never holds more than the largest
+    """
+    import importlib
+
+    import torch
+
+    root = weights_dir(model_id)
+    for name, (library, class_name) in MODULES.items():
+        path = os.path.join(root, f'{name}.pt')
+        if os.path.exists(path):
+            continue
+        print(f"📦 Exporting the {name} of {model_id} for mapping...")
+        module_class = getattr(importlib.import_module(library), class_name)
+        module = module_class.from_pretrained(model_id, subfolder=name, use_safetensors=True, low_cpu_mem_usage=True)
+        os.makedirs(root, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        torch.save(module.float(), tmp)
+        os.replace(tmp, path)
+        del module
+        gc.collect()
+    return root
+
+
+class LowMemoryPipeline:
+    """
+    A StableDiffusionPipeline that maps each module only for the phases that use it
+    Stands in for the pipeline in quick_generate.py: pipe(...).images, encode_prompt()
+    and everything else (tokenizer, scheduler, ...) is passed through
+    last_peak_mb is the peak RSS from the end of the previous call to the end of the
+    last one, so it includes that image's prompt encoding
+    """
+
+    def __init__(self, pipe, root, max_rss_mb=DEFAULT_MAX_RSS_MB):
+        self.pipe = pipe
+        self.root = root
+        self.max_rss_mb = max_rss_mb
+        self.last_peak_mb = None
+        self.release('text_encoder', 'vae')
+        reset_peak_rss()
+
+    def __getattr__(self, name):
+        if name == 'pipe':
+            raise AttributeError(name)
+        if name in MODULES:
+            return self.map(name)
+        return getattr(self.pipe, name)
+
+    def map(self, name):
+        """The module, mapped from its export if it was released"""
+        import torch
+
+        module = getattr(self.pipe, name)
+        if module is None:
+            # Our own export; the pickled modules need weights_only=False
+            module = torch.load(os.path.join(self.root, f'{name}.pt'), mmap=True, weights_only=False)
+            if name == 'vae':
+                module.enable_slicing()
+                module.enable_tiling()
+            setattr(self.pipe, name, module)
+        return module
+
+    def release(self, *names):
+        """Drop the modules; their pages are unmapped once nothing references them"""
+        for name in names:
+            setattr(self.pipe, name, None)
+        gc.collect()
+
+    def check(self, phase):
+        peak_mb = peak_rss_bytes() / 2**20
+        if self.max_rss_mb and peak_mb > self.max_rss_mb:
+            raise MemoryBudgetExceeded(phase, peak_mb, self.max_rss_mb)
+        return peak_mb
+
+    def encode_prompt(self, *args, **kwargs):
+        self.map('text_encoder')
+        result = self.pipe.encode_prompt(*args, **kwargs)
+        self.check('encoding prompts')
+        return result
+
+    def __call__(self, prompt=None, callback_on_step_end=None, output_type='pil', **params):
+        """txt2img without the VAE mapped, then a sliced and tiled decode without the text encoder"""
+        from diffusers.pipelines.stable_diffusion import StableDiffusionPipelineOutput
+
+        # With prompt_embeds the text encoder is idle; pipe() encodes a text prompt itself
+        if prompt is None:
+            self.release('text_encoder', 'vae')
+        else:
+            self.map('text_encoder')
+            self.release('vae')
+
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            self.check('denoising')
+            if callback_on_step_end is not None:
+                return callback_on_step_end(pipe, step, timestep, callback_kwargs)
+            return callback_kwargs
+
+        images = self.pipe(prompt, output_type='latent', callback_on_step_end=on_step_end, **params).images
+        if output_type != 'latent':
+            self.release('text_encoder')
+            images = decode_latents(self, images)
+        self.last_peak_mb = self.check('decoding')
+        reset_peak_rss()
+        return StableDiffusionPipelineOutput(images=images, nsfw_content_detected=None)
+
+
+def load_low_memory_pipeline(model_id=MODEL_ID, profile='default', max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """A CPU LowMemoryPipeline for a speed profile, exporting the model's modules first if needed"""
+    import torch
+    from diffusers import StableDiffusionPipeline
+
+    root = export_modules(model_id)
+    if PROFILES[profile]['cpu_tuning']:
+        tune_cpu_threads()
+    # Mapping costs address space, not memory: pages are read in as the modules run
+    modules = {name: torch.load(os.path.join(root, f'{name}.pt'), mmap=True, weights_only=False) for name in MODULES}
+    pipe = StableDiffusionPipeline.from_pretrained(model_id, **modules, safety_checker=None, feature_extractor=None,
+                                                   requires_safety_checker=False)
+    use_profile_scheduler(pipe, profile)
+    pipe.enable_attention_slicing()
+    return LowMemoryPipeline(pipe, root, max_rss_mb)
+
+
+def add_low_memory_args(parser):
+    """Command-line flags for the local generators"""
+    parser.add_argument('--low-memory', action='store_true',
+                        help='CPU mode for small machines: mmapped weights, idle modules unmapped, VAE slicing/tiling')
+    parser.add_argument('--max-rss-mb', type=int, default=DEFAULT_MAX_RSS_MB,
+                        help=f'with --low-memory, stop once peak RSS passes this, 0 = no limit (default: {DEFAULT_MAX_RSS_MB})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--export', action='store_true', help='export the modules now instead of on the first run')
+    parser.add_argument('--model', default=MODEL_ID)
+    args = parser.parse_args()
+
+    root = export_modules(args.model) if args.export else weights_dir(args.model)
+    print(f"\n📁 {os.path.relpath(root)}")
+    for name in MODULES:
+        path = os.path.join(root, f'{name}.pt')
+        size = f"{os.path.getsize(path) / 2**20:8.0f}MB" if os.path.exists(path) else '  not exported'
+        print(f"   {name:<13} {size}")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Read MENU_ITEMS out of data/menu.ts so the Python tools share the site's menu
+A deliberately small parser: it understands the flat object literals menu.ts
+uses (quoted strings, numbers, booleans, // comments), not TypeScript in general
+"""
+
+import os
+import re
+
+MENU_TS = os.path.join(os.path.dirname(__file__), '../data/menu.ts')
+
+# MenuItem fields that hold image paths under public/
+IMAGE_FIELDS = ('image', 'crossSectionImage', 'transparentImage')
+
+# MenuItem.category -> the public/images directory, which is also the generators' category
+CATEGORY_DIRS = {'burger': 'burgers', 'sides': 'sides', 'drinks': 'drinks'}
+
+# What a category's items are: names like "The Heatwave" don't say
+CATEGORY_NOUNS = {'burger': 'burger', 'sides': 'side dish', 'drinks': 'drink in a glass with ice'}
+
+_ARRAY_RE = re.compile(r'export const MENU_ITEMS\s*:\s*[\w\[\]]+\s*=\s*\[(.*?)\n\]', re.S)
+_OBJECT_RE = re.compile(r'\{(.*?)\}', re.S)
+_FIELD_RE = re.compile(r"""(\w+)\s*:\s*('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?|true|false)""")
+
+
+def _value(token):
+    if token[0] in '\'"':
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
+    if token in ('true', 'false'):
+        return token == 'true'
+    return float(token) if '.' in token else int(token)
+
+
+def load_menu_items(path=MENU_TS):
+    """MENU_ITEMS as a list of dicts, in file order"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    match = _ARRAY_RE.search(source)
+    if not match:
+        raise ValueError(f"no MENU_ITEMS array in {path}")
+    body = re.sub(r'//[^\n]*', '', match.group(1))
+    return [{key: _value(token) for key, token in _FIELD_RE.findall(block)}
+            for block in _OBJECT_RE.findall(body)]
+
+
+def image_paths(items):
+    """Every image path the menu references, de-duplicated, in menu order"""
+    seen = {}
+    for item in items:
+        for field in IMAGE_FIELDS:
+            if item.get(field):
+                seen.setdefault(item[field], None)
+    return list(seen)
+
+
+def public_file(url, root=os.path.join(os.path.dirname(__file__), '..')):
+    """Filesystem path of a site URL like /images/burgers/classic.jpg"""
+    return os.path.normpath(os.path.join(root, 'public', url.lstrip('/')))
+
+
+def menu_views(items=None):
+    """(item, view, url) for every image ('normal') and crossSectionImage ('cross') on the menu, in menu order"""
+    items = load_menu_items() if items is None else items
+    return [(item, view, item[field]) for item in items
+            for field, view in (('image', 'normal'), ('crossSectionImage', 'cross')) if item.get(field)]
+
+
+def view_label(item, view):
+    if not item.get('crossSectionImage'):
+        return item['name']
+    return f"{item['name']} ({'cross-section' if view == 'cross' else 'normal'} view)"
+
+
+def item_subject(item, cross_section=False):
+    """What a photo of item shows, from its name, category and description, for the generators' prompts"""
+    noun = CATEGORY_NOUNS.get(item['category'], item['category'])
+    if cross_section:
+        return f"cross-section of {item['name']} {noun} showing the layers of {item['description']} clearly visible"
+    return f"{item['name']} {noun}, {item['description']}"
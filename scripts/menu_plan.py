@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Incremental regeneration planner driven by data/menu.ts
+Compares MENU_ITEMS with the menu as it stood after the last run
+(.cache/menu-state.json) and with the files on disk, and plans only the images
+that need work: those of new items, of items whose name or description changed,
+and image/crossSectionImage files that are missing. A menu edit then costs a
+few images instead of a full regeneration
+
+Without a saved state (first run) only missing files are planned; the current
+menu becomes the baseline once the run finishes
+
+Usage:
+    python3 scripts/menu_plan.py                       # print the plan
+    python3 scripts/generate.py diffusers --changed --dry-run
+    python3 scripts/generate.py pollinations --changed
+"""
+
+import argparse
+import json
+import os
+import time
+
+from gen_cache import atomic_write
+from menu_data import load_menu_items, public_file
+
+STATE_FILE = os.path.join(os.path.dirname(__file__), '../.cache/menu-state.json')
+
+# Image fields the generators produce (transparentImage cut-outs come from remove-bg)
+PLANNED_FIELDS = ('image', 'crossSectionImage')
+
+# Fields that feed the prompts; a change means the image no longer matches the item
+PROMPT_FIELDS = ('name', 'description')
+
+# Reasons whose images exist but are out of date, so a cached copy must not be restored
+STALE_REASONS = ('name changed', 'description changed', 'new item')
+
+
+def item_images(item):
+    return [item[field] for field in PLANNED_FIELDS if item.get(field)]
+
+
+def menu_state(items):
+    """{id: {name, description, images}}, what the state file records per item"""
+    return {item['id']: dict({field: item.get(field) for field in PROMPT_FIELDS}, images=item_images(item))
+            for item in items}
+
+
+def load_state(path=STATE_FILE):
+    """The menu after the last run, or None when there is no (readable) state yet"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def plan_images(items, previous, exists=os.path.exists):
+    """
+    {image url: reason} for every menu image that needs generating, in menu order
+    An item whose id is new but whose images were already on the menu is a rename
+    and only needs its missing files
+    """
+    known = {url for entry in (previous or {}).values() for url in entry.get('images', [])}
+    planned = {}
+    for item in items:
+        before = (previous or {}).get(item['id'])
+        for url in item_images(item):
+            if url in planned:
+                continue
+            if not exists(public_file(url)):
+                planned[url] = 'missing'
+            elif previous is None:
+                continue
+            elif before is None:
+                if url not in known:
+                    planned[url] = 'new item'
+            else:
+                changed = [field for field in PROMPT_FIELDS if before.get(field) != item.get(field)]
+                if changed:
+                    planned[url] = f"{changed[0]} changed"
+    return planned
+
+
+def _file(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class MenuPlan:
+    """
+    The plan for one run: which images to make and why, and the state to save after
+    select() narrows a generator's jobs to the plan; save() records every item
+    whose images are now all present and, if they were stale, rewritten this run
+    """
+
+    def __init__(self, items=None, state_path=STATE_FILE):
+        self.items = load_menu_items() if items is None else items
+        self.state_path = state_path
+        self.previous = load_state(state_path)
+        self.reasons = plan_images(self.items, self.previous)
+        self.uncovered = []
+        self.started = time.time()
+
+    def select(self, jobs):
+        """
+        The jobs that produce planned images, in job order
+        Jobs for out-of-date images are marked 'stale' so restore_cached() skips them;
+        planned images no job produces are kept in self.uncovered
+        """
+        by_file = {_file(job['path']): job for job in jobs}
+        selected = set()
+        self.uncovered = []
+        for url, reason in self.reasons.items():
+            job = by_file.get(_file(public_file(url)))
+            if job is None:
+                self.uncovered.append(url)
+                continue
+            job['menu_reason'] = reason
+            job['stale'] = reason in STALE_REASONS
+            selected.add(id(job))
+        return [job for job in jobs if id(job) in selected]
+
+    def print(self):
+        if self.previous is None:
+            print("🗒  No saved menu state yet: planning missing files only")
+        for url, reason in self.reasons.items():
+            print(f"  + {reason:<20} {url}")
+        for url in self.uncovered:
+            print(f"  ⚠ not produced by this generator: {url}")
+        print(f"\n📋 Menu plan: {len(self.reasons)} of {sum(len(item_images(item)) for item in self.items)} "
+              f"menu images need work")
+
+    def _done(self, item):
+        for url in item_images(item):
+            path = public_file(url)
+            if not os.path.exists(path):
+                return False
+            if self.reasons.get(url) in STALE_REASONS and os.path.getmtime(path) < self.started:
+                return False
+        return True
+
+    def save(self):
+        """Record finished items; the rest keep their previous entry, so they are planned again"""
+        current = menu_state(self.items)
+        state = {item_id: entry for item_id, entry in (self.previous or {}).items() if item_id in current}
+        for item in self.items:
+            if self._done(item):
+                state[item['id']] = current[item['id']]
+        atomic_write(self.state_path, (json.dumps(state, indent=1, sort_keys=True) + '\n').encode('utf-8'))
+
+
+def add_menu_args(parser):
+    """Command-line flags shared by every generator"""
+    parser.add_argument('--changed', action='store_true',
+                        help='only generate images the menu plan needs (new items, changed descriptions, missing files)')
+    parser.add_argument('--menu-state', default=STATE_FILE, help='menu as of the last run (default: .cache/menu-state.json)')
+
+
+def plan_from_args(args, jobs):
+    """(MenuPlan, jobs to run): every job, or with --changed only the planned ones"""
+    plan = MenuPlan(state_path=args.menu_state)
+    if not args.changed:
+        return plan, jobs
+    jobs = plan.select(jobs)
+    plan.print()
+    print()
+    return plan, jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--state', default=STATE_FILE, help='state file to compare with (default: .cache/menu-state.json)')
+    args = parser.parse_args()
+
+    print()
+    MenuPlan(state_path=args.state).print()
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Pack the brand stickers into sprite atlases
+Trims each sticker's transparent margin, scales it to the size it is actually
+drawn at, shelf-packs the results into as few atlases as fit, and writes each
+atlas as alpha WebP plus a PNG fallback, with a JSON map of sprite coordinates
+
+Usage:
+    python3 scripts/pack-stickers.py
+    python3 scripts/pack-stickers.py --sprite-size 400 --max-atlas 2048
+    python3 scripts/pack-stickers.py 'public/images/stickers/*.png' --out-dir public/images/stickers
+
+data/sticker-atlas.json, keyed by the original sticker URL:
+
+    "/images/stickers/1.png": {"atlas": 0, "x": 2, "y": 608, "w": 307, "h": 253,
+                               "sourceW": 320, "sourceH": 320, "offsetX": 6, "offsetY": 35}
+
+x/y/w/h locate the trimmed sprite in atlases[atlas]; sourceW/H and offsetX/Y
+place it back inside the original (scaled) canvas so layouts don't shift
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import time
+
+from gen_cache import atomic_write
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+STICKER_GLOB = os.path.join(ROOT, 'public/images/stickers/[0-9]*.png')
+OUT_DIR = os.path.join(ROOT, 'public/images/stickers')
+MAP_FILE = os.path.join(ROOT, 'data/sticker-atlas.json')
+
+# StickerDecoration draws stickers in a 120px box scaled up to 1.2x; at 2x DPR that
+# is ~288 device px, so anything past 320px on the long side is never seen
+DEFAULT_SPRITE_SIZE = 320
+DEFAULT_MAX_ATLAS = 2048
+PADDING = 2  # Transparent gutter so scaled/filtered sprites never bleed into neighbours
+ALPHA_CUTOFF = 0  # Pixels with alpha above this count as content when trimming
+
+
+def public_url(path):
+    return '/' + os.path.relpath(os.path.abspath(path), os.path.abspath(os.path.join(ROOT, 'public'))).replace(os.sep, '/')
+
+
+def trim_box(alpha, cutoff=ALPHA_CUTOFF):
+    """(left, top, right, bottom) of the pixels with alpha > cutoff, or None if fully transparent"""
+    import numpy as np
+
+    mask = alpha > cutoff
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if not len(rows):
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def load_sprite(path, sprite_size):
+    """Scaled, trimmed RGBA sprite plus where it sat in the scaled original"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img = img.convert('RGBA')
+    scale = min(1.0, sprite_size / max(img.size))
+    if scale < 1.0:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+
+    box = trim_box(np.asarray(img)[:, :, 3])
+    if box is None:
+        box = (0, 0, 1, 1)
+    return {
+        'path': path,
+        'image': img.crop(box),
+        'sourceW': img.width,
+        'sourceH': img.height,
+        'offsetX': box[0],
+        'offsetY': box[1],
+    }
+
+
+def shelf_pack(sizes, width, max_height, padding=PADDING):
+    """
+    Place (w, h) rectangles tallest-first on shelves `width` wide, opening a new
+    atlas whenever the next shelf would pass max_height
+    Returns ([(atlas, x, y)] in input order, [(atlas_w, atlas_h)])
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+    placements = [None] * len(sizes)
+    atlases = []
+    x = y = shelf_height = used_width = 0
+    for i in order:
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        if atlases and x + w > width:
+            # Next shelf
+            y += shelf_height
+            x = shelf_height = 0
+        if not atlases or y + h + padding > max_height:
+            if atlases:
+                atlases[-1] = (used_width + padding, y + shelf_height + padding)
+            atlases.append(None)
+            x = y = shelf_height = used_width = 0
+        placements[i] = (len(atlases) - 1, x + padding, y + padding)
+        x += w
+        shelf_height = max(shelf_height, h)
+        used_width = max(used_width, x)
+    if atlases:
+        atlases[-1] = (used_width + padding, y + shelf_height + padding)
+    return placements, atlases
+
+
+def best_packing(sizes, max_atlas, padding=PADDING):
+    """Try a range of shelf widths; keep the fewest atlases, then the least total area"""
+    widest = max(w for w, _ in sizes) + 2 * padding
+    best = None
+    for width in range(widest, max_atlas + 1, 16):
+        placements, atlases = shelf_pack(sizes, width, max_atlas, padding)
+        score = (len(atlases), sum(w * h for w, h in atlases))
+        if best is None or score < best[0]:
+            best = (score, placements, atlases)
+    return best[1], best[2]
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, format='WEBP', quality=85, alpha_quality=90, method=6)
+    else:
+        image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def decode_seconds(paths):
+    """Wall time to fully decode every file, i.e. the browser's decode work on first paint"""
+    from PIL import Image
+
+    started = time.perf_counter()
+    for path in paths:
+        with Image.open(path) as img:
+            img.load()
+    return time.perf_counter() - started
+
+
+def decoded_megapixels(paths):
+    from PIL import Image
+
+    total = 0
+    for path in paths:
+        with Image.open(path) as img:
+            total += img.width * img.height
+    return total / 1e6
+
+
+def print_benchmark(sources, atlas_files):
+    """Bytes, requests and decode cost for the loose stickers vs each atlas format"""
+    print(f"\n📊 {'':<16} {'requests':>9} {'bytes':>10} {'decoded MP':>11} {'decode':>9}")
+    rows = [('loose PNGs', sources)] + [(f'{fmt} atlas', files) for fmt, files in atlas_files.items()]
+    before = sum(os.path.getsize(p) for p in sources)
+    for label, files in rows:
+        size = sum(os.path.getsize(p) for p in files)
+        print(f"   {label:<16} {len(files):>9} {size / 1024:>8.0f}KB {decoded_megapixels(files):>11.2f} "
+              f"{decode_seconds(files) * 1000:>7.0f}ms" + ('' if files is sources else f"   ({100 * (1 - size / before):.0f}% fewer bytes)"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('patterns', nargs='*', help='sticker globs (default: public/images/stickers/<n>.png)')
+    parser.add_argument('--sprite-size', type=int, default=DEFAULT_SPRITE_SIZE, help=f'longest side per sticker before trimming (default: {DEFAULT_SPRITE_SIZE})')
+    parser.add_argument('--max-atlas', type=int, default=DEFAULT_MAX_ATLAS, help=f'largest atlas side; overflow opens another atlas (default: {DEFAULT_MAX_ATLAS})')
+    parser.add_argument('--out-dir', default=OUT_DIR, help='where atlas images go (default: public/images/stickers)')
+    parser.add_argument('--map', default=MAP_FILE, help='coordinate map JSON (default: data/sticker-atlas.json)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sources = sorted({os.path.normpath(p) for pattern in (args.patterns or [STICKER_GLOB]) for p in glob.glob(pattern)
+                      if not os.path.basename(p).startswith('atlas-')},  # never pack our own output
+                     key=lambda p: (len(os.path.basename(p)), p))  # 1..10, not 1, 10, 2
+    if not sources:
+        print("⚠ No stickers matched")
+        return
+
+    print(f"\n🧩 Packing {len(sources)} stickers (sprites ≤{args.sprite_size}px, atlases ≤{args.max_atlas}px)\n")
+    sprites = [load_sprite(path, args.sprite_size) for path in sources]
+    sizes = [sprite['image'].size for sprite in sprites]
+    if max(max(w, h) for w, h in sizes) + 2 * PADDING > args.max_atlas:
+        raise SystemExit("✗ A sprite is larger than --max-atlas")
+    placements, atlas_sizes = best_packing(sizes, args.max_atlas)
+
+    from PIL import Image
+
+    canvases = [Image.new('RGBA', size, (0, 0, 0, 0)) for size in atlas_sizes]
+    coordinates = {}
+    for sprite, (atlas, x, y) in zip(sprites, placements):
+        canvases[atlas].paste(sprite['image'], (x, y))
+        w, h = sprite['image'].size
+        coordinates[public_url(sprite['path'])] = {
+            'atlas': atlas, 'x': x, 'y': y, 'w': w, 'h': h,
+            'sourceW': sprite['sourceW'], 'sourceH': sprite['sourceH'],
+            'offsetX': sprite['offsetX'], 'offsetY': sprite['offsetY'],
+        }
+        print(f"  ✓ {os.path.basename(sprite['path'])}: {sprite['sourceW']}x{sprite['sourceH']} "
+              f"trimmed to {w}x{h} at atlas {atlas} ({x}, {y})")
+
+    atlases = []
+    atlas_files = {'webp': [], 'png': []}
+    for index, canvas in enumerate(canvases):
+        entry = {'width': canvas.width, 'height': canvas.height}
+        for fmt in atlas_files:
+            dest = os.path.join(args.out_dir, f'atlas-{index}.{fmt}')
+            atomic_write(dest, encode(canvas, fmt))
+            atlas_files[fmt].append(dest)
+            entry[fmt] = public_url(dest)
+        atlases.append(entry)
+
+    atomic_write(args.map, (json.dumps({'atlases': atlases, 'sprites': coordinates}, indent=2) + '\n').encode('utf-8'))
+    fill = sum(w * h for w, h in sizes) / sum(w * h for w, h in atlas_sizes)
+    dimensions = ', '.join(f"{w}x{h}" for w, h in atlas_sizes)
+    print(f"\n📝 {len(atlases)} atlas{'es' if len(atlases) != 1 else ''} ({dimensions}, {100 * fill:.0f}% filled), "
+          f"map in {os.path.relpath(args.map)}")
+
+    print_benchmark(sources, atlas_files)
+    print("\n✓ Sticker packing complete!")
+
+
+if __name__ == '__main__':
+    main()
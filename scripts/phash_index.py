@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash index of public/images for catching near-duplicate generations
+Every image gets a 64-bit pHash (DCT) and dHash (gradient); pHashes live in a
+BK-tree so "anything within N bits of this?" only visits a small part of the
+library. Hashes persist in .cache/phash-index.json and are refreshed by mtime
+
+The generators call ensure_unique() right after writing each image: if it is a
+near-duplicate of another image it is re-rolled with a new seed on the spot
+
+Usage:
+    python3 scripts/phash_index.py                  # refresh, then list near-duplicate pairs
+    python3 scripts/phash_index.py --threshold 12
+"""
+
+import argparse
+import json
+import os
+import threading
+
+from gen_cache import atomic_write
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+IMAGES_DIR = os.path.join(ROOT, 'public/images')
+INDEX_FILE = os.path.join(ROOT, '.cache/phash-index.json')
+
+# Bits (of 64) two images may differ by and still count as the same picture.
+# Both hashes must agree: pHash finds candidates, dHash weeds out look-alikes
+DEFAULT_THRESHOLD = 8
+DHASH_THRESHOLD = 12
+DEFAULT_MAX_REROLLS = 3
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+# Derived copies of other images (responsive-images.py, pack-stickers.py) would match their originals
+SKIP_DIRS = {'_responsive'}
+SKIP_PREFIXES = ('atlas-', '.tmp-')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _bits(mask):
+    value = 0
+    for bit in mask.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def phash(image, hash_size=8, highfreq_factor=4):
+    """DCT hash: low-frequency 8x8 block of a 32x32 greyscale image, thresholded at its median"""
+    import numpy as np
+    from PIL import Image
+
+    size = hash_size * highfreq_factor
+    pixels = np.asarray(image.convert('L').resize((size, size), Image.LANCZOS), dtype=np.float64)
+    # Orthonormal DCT-II as a matrix, applied to rows and columns
+    n = np.arange(size)
+    dct = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    # The DC term is overall brightness, which says nothing about the picture
+    return _bits(low > np.median(low.ravel()[1:]))
+
+
+def dhash(image, hash_size=8):
+    """Gradient hash: is each pixel brighter than its right-hand neighbour"""
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16)
+    return _bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(path):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft('RGB', (128, 128))  # JPEG: decode at reduced size, plenty for a 32px hash
+        img = img.convert('RGB')
+        return phash(img), dhash(img)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes under Hamming distance
+    Children are keyed by their distance to the parent, so a radius-r search only
+    descends into children whose key lies within r of the query's distance
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, hash, item)] for every item within radius of value"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, node[0], item) for item in node[1])
+            for key, child in node[2].items():
+                if distance - radius <= key <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+class PerceptualIndex:
+    """pHash/dHash per image path (relative to ROOT), searchable through a BK-tree"""
+
+    def __init__(self, path=INDEX_FILE, threshold=DEFAULT_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.dhash_threshold = dhash_threshold
+        self.entries = {}
+        self.tree = BKTree()
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def key(path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(ROOT)).replace(os.sep, '/')
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stored = {}
+        for key, entry in stored.items():
+            self._put(key, int(entry['phash'], 16), int(entry['dhash'], 16), entry['fingerprint'])
+
+    def save(self):
+        with self.lock:
+            data = {key: {'phash': f'{p:016x}', 'dhash': f'{d:016x}', 'fingerprint': fp}
+                    for key, (p, d, fp) in sorted(self.entries.items())}
+        atomic_write(self.path, json.dumps(data, indent=1).encode('utf-8'))
+
+    def _put(self, key, p, d, fingerprint):
+        # BK-trees can't delete; a replaced entry's old node is skipped at search time
+        # because it no longer matches self.entries
+        self.entries[key] = (p, d, fingerprint)
+        self.tree.add(p, key)
+
+    def add(self, path):
+        """(Re)hash the image at path; returns its (phash, dhash)"""
+        st = os.stat(path)
+        p, d = image_hashes(path)
+        with self.lock:
+            self._put(self.key(path), p, d, [st.st_size, st.st_mtime_ns])
+        return p, d
+
+    def refresh(self, root=IMAGES_DIR, dirs=None):
+        """
+        Hash new or changed images under root and forget deleted ones; returns how many were hashed
+        With dirs, only those directories (and below) are walked; entries elsewhere are kept as they are
+        """
+        tops = [os.path.abspath(d) for d in dirs] if dirs is not None else [os.path.abspath(root)]
+        scope = [self.key(top) + '/' for top in tops]
+        seen = set()
+        hashed = 0
+        for directory, subdirs, files in (walked for top in tops for walked in os.walk(top)):
+            subdirs[:] = [d for d in subdirs if d not in SKIP_DIRS]
+            for name in files:
+                if not name.lower().endswith(IMAGE_EXTENSIONS) or name.startswith(SKIP_PREFIXES):
+                    continue
+                path = os.path.join(directory, name)
+                key = self.key(path)
+                seen.add(key)
+                st = os.stat(path)
+                entry = self.entries.get(key)
+                if entry is None or entry[2] != [st.st_size, st.st_mtime_ns]:
+                    try:
+                        self.add(path)
+                        hashed += 1
+                    except OSError as e:
+                        print(f"  ⚠ Can't hash {key}: {e}")
+        with self.lock:
+            for key in set(self.entries) - seen:
+                if any(key.startswith(prefix) for prefix in scope):
+                    del self.entries[key]
+        return hashed
+
+    def near(self, p, d, exclude=None):
+        """[(phash distance, path)] of indexed images matching both hashes, closest first"""
+        matches = []
+        with self.lock:
+            for distance, value, key in self.tree.search(p, self.threshold):
+                entry = self.entries.get(key)
+                if key == exclude or entry is None or entry[0] != value:
+                    continue
+                # Outside a partial refresh an entry can outlive its file
+                if not os.path.exists(os.path.join(ROOT, key)):
+                    continue
+                if hamming(d, entry[1]) <= self.dhash_threshold:
+                    matches.append((distance, key))
+        return sorted(set(matches))
+
+    def check(self, path):
+        """Index the image at path and return its near-duplicates among the other images"""
+        p, d = self.add(path)
+        return self.near(p, d, exclude=self.key(path))
+
+    def duplicate_pairs(self):
+        pairs = set()
+        for key, (p, d, _) in list(self.entries.items()):
+            for distance, other in self.near(p, d, exclude=key):
+                pairs.add((distance,) + tuple(sorted((key, other))))
+        return sorted(pairs)
+
+
+def near_duplicate(index, job):
+    """
+    (distance, path) of the closest other image job['path'] near-duplicates, or None
+    Images in job['derived_from'] (the other view of a derived pair, see
+    derive_views.py) are allowed to match
+    """
+    allowed = {index.key(path) for path in job.get('derived_from', ())}
+    matches = [match for match in index.check(job['path']) if match[1] not in allowed]
+    return matches[0] if matches else None
+
+
+def reroll_seed(job, attempt):
+    """Seed for a job's attempt-th re-roll, derived from its cache key so reruns are repeatable"""
+    return int(job['key'][:8], 16) + attempt
+
+
+def ensure_unique(index, job, reroll, cache=None, max_rerolls=DEFAULT_MAX_REROLLS):
+    """
+    Re-roll job['path'] while it is a near-duplicate of another image
+    reroll(seed) must regenerate the image at job['path'] and return True on
+    success. An accepted re-roll becomes the cache entry for job['key'], so the
+    next run restores it rather than the duplicate. Returns False only if a
+    re-roll failed. With reroll=None a duplicate is only reported
+    """
+    if index is None:
+        return True
+    name = os.path.basename(job['path'])
+    if reroll is None:
+        match = near_duplicate(index, job)
+        if match:
+            print(f"  ⚠ {name} is {match[0]} bits from {match[1]}, keeping it (it can't be re-rolled on its own)")
+        return True
+    for attempt in range(1, max_rerolls + 1):
+        match = near_duplicate(index, job)
+        if match is None:
+            if attempt > 1 and cache is not None:
+                cache.adopt(job['key'], job['path'])
+            return True
+        distance, other = match
+        seed = reroll_seed(job, attempt)
+        print(f"  🔁 {name} is {distance} bits from {other}, re-rolling with seed {seed} "
+              f"({attempt}/{max_rerolls})")
+        if not reroll(seed):
+            return False
+
+    match = near_duplicate(index, job)
+    if match:
+        print(f"  ⚠ {name} still resembles {match[1]} after {max_rerolls} re-rolls, keeping it")
+    elif cache is not None:
+        cache.adopt(job['key'], job['path'])
+    return True
+
+
+def add_dedupe_args(parser):
+    """Command-line flags shared by every generator"""
+    parser.add_argument('--no-dedupe', action='store_true', help='skip the near-duplicate check after each image')
+    parser.add_argument('--dedupe-threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f'pHash bits that still count as a duplicate (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--max-rerolls', type=int, default=DEFAULT_MAX_REROLLS,
+                        help=f're-rolls per duplicate before keeping it anyway (default: {DEFAULT_MAX_REROLLS})')
+    parser.add_argument('--dedupe-full-refresh', action='store_true',
+                        help='rehash all of public/images first, not just the directories this run writes to')
+
+
+def job_dirs(jobs):
+    """The directories jobs write to, each once"""
+    return sorted({os.path.dirname(os.path.abspath(job['path'])) for job in jobs})
+
+
+def index_from_args(args, jobs):
+    """
+    The index, refreshed for the directories jobs write to (all of public/images with
+    --dedupe-full-refresh), or None with --no-dedupe
+    """
+    if args.no_dedupe:
+        return None
+    index = PerceptualIndex(threshold=args.dedupe_threshold)
+    dirs = None if args.dedupe_full_refresh else [d for d in job_dirs(jobs) if os.path.isdir(d)]
+    hashed = index.refresh(dirs=dirs)
+    if hashed:
+        print(f"🔎 Perceptual index: hashed {hashed} new/changed images ({len(index.entries)} total)")
+        index.save()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help=f'pHash bits (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--dhash-threshold', type=int, default=DHASH_THRESHOLD, help=f'dHash bits (default: {DHASH_THRESHOLD})')
+    args = parser.parse_args()
+
+    index = PerceptualIndex(threshold=args.threshold, dhash_threshold=args.dhash_threshold)
+    hashed = index.refresh()
+    index.save()
+    print(f"\n🔎 {len(index.entries)} images indexed ({hashed} hashed this run)\n")
+
+    pairs = index.duplicate_pairs()
+    for distance, a, b in pairs:
+        print(f"  ≈ {a}  ~  {b}  ({distance} bits)")
+    print(f"\n{'⚠' if pairs else '✓'} {len(pairs)} near-duplicate pairs\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Row-band streaming PNG reader/writer
+Decodes and encodes 8-bit RGB/RGBA PNGs a fixed number of rows at a time, so
+peak memory depends on the band height and image width, never on the image height
+
+Reading inflates the IDAT stream incrementally and hands each band of filtered
+scanlines to Pillow as a small standalone PNG (with the previous band's last row
+prepended unfiltered, which is all the PNG filters ever look back at)
+Writing picks a filter per row with the usual minimum-sum-of-deltas heuristic,
+all vectorised with NumPy, and deflates band by band
+"""
+
+import io
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from gen_cache import FILE_MODE
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+READ_SIZE = 64 * 1024
+
+# Colour type -> channels, for the layouts we stream (8-bit, non-interlaced)
+CHANNELS = {2: 3, 6: 4}
+
+# Ancillary chunks that describe colour/density and stay valid for an RGBA copy
+PASSTHROUGH_CHUNKS = {b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'pHYs'}
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def _read_chunk_header(f):
+    header = f.read(8)
+    if len(header) < 8:
+        raise ValueError("truncated PNG")
+    length, kind = struct.unpack('>I4s', header)
+    return length, kind
+
+
+class PngInfo:
+    def __init__(self, width, height, bit_depth, color_type, interlace, extra_chunks):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.color_type = color_type
+        self.interlace = interlace
+        self.extra_chunks = extra_chunks
+
+    @property
+    def streamable(self):
+        return self.bit_depth == 8 and self.color_type in CHANNELS and self.interlace == 0
+
+    @property
+    def channels(self):
+        return CHANNELS[self.color_type]
+
+
+def read_info(path):
+    """Header fields plus the passthrough chunks that precede the image data"""
+    with open(path, 'rb') as f:
+        if f.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"{path} is not a PNG")
+        length, kind = _read_chunk_header(f)
+        if kind != b'IHDR':
+            raise ValueError("PNG does not start with IHDR")
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', f.read(length))
+        f.read(4)
+        extra = []
+        while True:
+            length, kind = _read_chunk_header(f)
+            if kind == b'IDAT':
+                break
+            data = f.read(length)
+            f.read(4)
+            if kind in PASSTHROUGH_CHUNKS:
+                extra.append((kind, data))
+            if kind == b'IEND':
+                break
+    return PngInfo(width, height, bit_depth, color_type, interlace, extra)
+
+
+def _idat_pieces(f):
+    """Compressed image data in READ_SIZE pieces, across however many IDAT chunks"""
+    if f.read(8) != PNG_SIGNATURE:
+        raise ValueError("not a PNG")
+    while True:
+        length, kind = _read_chunk_header(f)
+        if kind == b'IEND':
+            return
+        if kind != b'IDAT':
+            f.seek(length + 4, os.SEEK_CUR)
+            continue
+        remaining = length
+        while remaining:
+            piece = f.read(min(READ_SIZE, remaining))
+            if not piece:
+                raise ValueError("truncated IDAT chunk")
+            remaining -= len(piece)
+            yield piece
+        f.read(4)
+
+
+def _decode_band(info, scanlines, rows, previous_row):
+    """Unfilter a band of raw scanlines with Pillow's C decoder; returns (H, W, C) uint8"""
+    from PIL import Image
+
+    stride = info.width * info.channels
+    if previous_row is not None:
+        # Filter type 0 row carrying the real previous row, so Up/Average/Paeth see it
+        scanlines = b'\x00' + previous_row + scanlines
+        rows += 1
+    header = struct.pack('>IIBBBBB', info.width, rows, 8, info.color_type, 0, 0, 0)
+    png = (PNG_SIGNATURE + _chunk(b'IHDR', header)
+           + _chunk(b'IDAT', zlib.compress(scanlines, 0)) + _chunk(b'IEND', b''))
+    with Image.open(io.BytesIO(png)) as img:
+        band = np.asarray(img).reshape(rows, info.width, info.channels)
+    if previous_row is not None:
+        band = band[1:]
+    assert band.shape[1] * band.shape[2] == stride
+    return band
+
+
+def iter_bands(path, band_rows=64):
+    """Yield (H, W, 4) RGBA uint8 bands of at most band_rows rows, top to bottom"""
+    info = read_info(path)
+    if not info.streamable:
+        raise ValueError("only 8-bit, non-interlaced RGB/RGBA PNGs can be streamed")
+
+    stride = info.width * info.channels + 1  # +1 filter byte per scanline
+    band_bytes = stride * band_rows
+    inflater = zlib.decompressobj()
+    pending = bytearray()
+    previous_row = None
+    rows_left = info.height
+
+    def emit(count):
+        nonlocal pending, previous_row, rows_left
+        size = count * stride
+        raw = bytes(pending[:size])
+        del pending[:size]
+        band = _decode_band(info, raw, count, previous_row)
+        previous_row = band[-1].tobytes()
+        rows_left -= count
+        if info.channels == 3:
+            rgba = np.empty((count, info.width, 4), dtype=np.uint8)
+            rgba[:, :, :3] = band
+            rgba[:, :, 3] = 255
+            return rgba
+        return np.array(band)  # Writable copy; Pillow's buffer is read-only
+
+    with open(path, 'rb') as f:
+        for piece in _idat_pieces(f):
+            data = piece
+            while data:
+                # max_length keeps a highly compressible chunk from inflating all at once
+                pending += inflater.decompress(data, band_bytes)
+                data = inflater.unconsumed_tail
+                while rows_left and len(pending) >= min(band_bytes, rows_left * stride):
+                    yield emit(min(band_rows, rows_left))
+        pending += inflater.flush()
+        while rows_left and len(pending) >= min(band_bytes, rows_left * stride):
+            yield emit(min(band_rows, rows_left))
+
+    if rows_left:
+        raise ValueError(f"PNG image data ended {rows_left} rows early")
+
+
+def _filter_rows(band, above):
+    """
+    Filter a band (H, W, C) for PNG, choosing per row the filter with the smallest
+    sum of absolute deltas (libpng's heuristic); returns filter-byte-prefixed scanlines
+    Filters are byte arithmetic mod 256, so everything but Paeth's comparisons stays
+    uint8 and the working set is a handful of band-sized byte arrays
+    """
+    rows, width, channels = band.shape
+    x = band.reshape(rows, width * channels)
+    up = np.empty_like(x)
+    up[0] = above
+    up[1:] = x[:-1]
+    left = np.zeros_like(x)
+    left[:, channels:] = x[:, :-channels]
+    upleft = np.zeros_like(x)
+    upleft[:, channels:] = up[:, :-channels]
+
+    # Paeth: distances from p = left + up - upleft to each neighbour
+    pa = np.abs(up.astype(np.int16) - upleft)
+    pb = np.abs(left.astype(np.int16) - upleft)
+    pc = np.abs(left.astype(np.int16) + up - upleft - upleft)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+    del pa, pb, pc
+
+    average = (left >> 1) + (up >> 1) + (left & up & 1)  # floor((left + up) / 2) without overflow
+    candidates = [x, x - left, x - up, x - average, x - paeth]  # filter types 0-4
+    del average, paeth, upleft
+
+    # |delta| as a signed byte is min(d, 256 - d)
+    scores = np.stack([np.minimum(c, -c).sum(axis=1, dtype=np.uint32) for c in candidates])
+    choice = scores.argmin(axis=0)
+
+    out = np.empty((rows, width * channels + 1), dtype=np.uint8)
+    out[:, 0] = choice
+    for kind, candidate in enumerate(candidates):
+        picked = choice == kind
+        out[picked, 1:] = candidate[picked]
+    return out.tobytes()
+
+
+class BandWriter:
+    """Write an RGBA PNG band by band to a temp file, renamed over dest on close()"""
+
+    def __init__(self, dest, width, height, extra_chunks=(), level=6):
+        self.dest = dest
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.above = np.zeros(width * 4, dtype=np.uint8)
+        self.deflater = zlib.compressobj(level)
+        directory = os.path.dirname(os.path.abspath(dest))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.png')
+        self.f = os.fdopen(fd, 'wb')
+        self.f.write(PNG_SIGNATURE)
+        self.f.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        for kind, data in extra_chunks:
+            self.f.write(_chunk(kind, data))
+
+    def write(self, band):
+        scanlines = _filter_rows(band, self.above)
+        self.above = band[-1].reshape(-1).copy()
+        self.rows_written += band.shape[0]
+        compressed = self.deflater.compress(scanlines)
+        if compressed:
+            self.f.write(_chunk(b'IDAT', compressed))
+
+    def close(self):
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"wrote {self.rows_written} of {self.height} rows")
+            self.f.write(_chunk(b'IDAT', self.deflater.flush()))
+            self.f.write(_chunk(b'IEND', b''))
+            self.f.close()
+            os.chmod(self.tmp, FILE_MODE)
+            os.replace(self.tmp, self.dest)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        if not self.f.closed:
+            self.f.close()
+        if os.path.exists(self.tmp):
+            os.unlink(self.tmp)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Text-embedding cache for the local Stable Diffusion generators
+Every pipe() call re-runs the CLIP text encoder for the prompt and for the
+empty unconditional prompt. This keeps both per (model, prompt): in memory for
+the run and as .npy arrays under .cache/embeddings across runs, and hands
+pipe() prompt_embeds / negative_prompt_embeds instead of text
+
+Usage:
+    python3 scripts/prompt_embeds.py            # entries and size on disk
+    python3 scripts/prompt_embeds.py --clear
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+
+from gen_cache import atomic_write
+
+EMBED_DIR = os.path.join(os.path.dirname(__file__), '../.cache/embeddings')
+
+# The empty prompt classifier-free guidance pairs with every prompt
+UNCONDITIONAL = ''
+
+
+def embedding_key(model_id, prompt, max_length):
+    blob = json.dumps({'model': model_id, 'prompt': prompt, 'max_length': max_length}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class PromptEmbeddingCache:
+    """Prompt -> text-encoder output for one loaded pipeline"""
+
+    def __init__(self, pipe, model_id, root=EMBED_DIR):
+        self.pipe = pipe
+        self.model_id = model_id
+        self.root = root
+        self.max_length = pipe.tokenizer.model_max_length
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.loaded = 0
+        self.encoded = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key[:2], f'{key}.npy')
+
+    def _encode(self, prompts):
+        """Run the text encoder once for a list of prompts -> [1, tokens, dim] per prompt"""
+        import torch
+
+        device = self.pipe.text_encoder.device
+        with torch.no_grad():
+            if hasattr(self.pipe, 'encode_prompt'):
+                embeds = self.pipe.encode_prompt(prompts, device, 1, False)[0]
+            else:
+                # Older diffusers: the same tokenisation encode_prompt uses
+                tokens = self.pipe.tokenizer(prompts, padding='max_length', max_length=self.max_length,
+                                             truncation=True, return_tensors='pt')
+                embeds = self.pipe.text_encoder(tokens.input_ids.to(device))[0]
+        return [embeds[i:i + 1] for i in range(len(prompts))]
+
+    def _load(self, key):
+        import numpy as np
+        import torch
+
+        try:
+            array = np.load(self.entry_path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+        return torch.from_numpy(array).to(self.pipe.text_encoder.device, self.pipe.text_encoder.dtype)
+
+    def _store(self, key, embeds):
+        import numpy as np
+
+        buffer = io.BytesIO()
+        # float32 on disk: exact for both the fp32 (CPU) and fp16 (CUDA) encoders
+        np.save(buffer, embeds.detach().float().cpu().numpy())
+        atomic_write(self.entry_path(key), buffer.getvalue())
+
+    def get(self, prompts):
+        """Embeddings for each prompt, from memory, then disk, then one batched encoder call"""
+        keys = [embedding_key(self.model_id, prompt, self.max_length) for prompt in prompts]
+        with self.lock:
+            missing = {}
+            for prompt, key in zip(prompts, keys):
+                if key in self.memory:
+                    self.hits += 1
+                    continue
+                embeds = self._load(key)
+                if embeds is None:
+                    missing[key] = prompt
+                else:
+                    self.memory[key] = embeds
+                    self.loaded += 1
+            if missing:
+                for key, embeds in zip(missing, self._encode(list(missing.values()))):
+                    self.memory[key] = embeds
+                    self._store(key, embeds)
+                self.encoded += len(missing)
+            return [self.memory[key] for key in keys]
+
+    def prompt_args(self, prompt):
+        """pipe() keyword arguments standing in for prompt (a string or a list of them)"""
+        import torch
+
+        prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        *embeds, unconditional = self.get(prompts + [UNCONDITIONAL])
+        return {
+            'prompt_embeds': torch.cat(embeds),
+            'negative_prompt_embeds': unconditional.expand(len(prompts), -1, -1),
+        }
+
+    def summary(self):
+        return f"🔤 Prompt embeddings: {self.hits + self.loaded} reused ({self.loaded} from disk), {self.encoded} encoded"
+
+
+def prompt_args(embeddings, prompt):
+    """pipe() arguments for prompt: cached embeddings when there is a cache, else the text"""
+    if embeddings is None:
+        return {'prompt': prompt}
+    return embeddings.prompt_args(prompt)
+
+
+def add_embedding_args(parser):
+    """Command-line flags shared by the local generators"""
+    parser.add_argument('--no-embed-cache', action='store_true', help='run the text encoder on every pipe() call')
+
+
+def embeddings_from_args(args, pipe, model_id):
+    """A cache for a local pipeline; None with --no-embed-cache or for a daemon (it keeps its own)"""
+    from sd_daemon import RemotePipeline
+
+    if args.no_embed_cache or isinstance(pipe, RemotePipeline):
+        return None
+    return PromptEmbeddingCache(pipe, model_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clear', action='store_true', help='delete every cached embedding')
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(EMBED_DIR, ignore_errors=True)
+        print("🧹 Embedding cache cleared")
+        return
+    sizes = [os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(EMBED_DIR) for f in files if f.endswith('.npy')]
+    print(f"🔤 {len(sizes)} cached prompt embeddings, {sum(sizes) / 1e6:.1f}MB in {os.path.relpath(EMBED_DIR)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Image providers behind one interface, with hedged requests and online routing
+Pollinations, the HF Inference API and a local diffusers pipeline each turn a
+prompt (and optional seed) into an image file. HedgedRouter sends a job to the
+provider that is currently fastest; if it hasn't answered by that provider's p90
+latency, the next one gets the same job. The first result that passes
+image_finish's checks is published and the other attempt is cancelled
+
+Latency windows, success rates and circuit-breaker state are updated after every
+attempt and saved to .cache/providers.json, so the next run starts from them
+
+Cancelling: an HTTP attempt stops at its next body chunk; one still waiting for
+response headers is abandoned on its thread and its answer thrown away. A local
+pipeline stops at its next denoising step
+
+Usage:
+    python3 scripts/providers.py          # latency and health of each provider so far
+"""
+
+import abc
+import argparse
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from urllib.parse import quote
+
+from downloads import get_session, stream_to_file
+from gen_cache import atomic_write
+from image_finish import ImageRejected, finish_download, staging_path
+from telemetry import JobTrace, timed
+
+STATE_FILE = os.path.join(os.path.dirname(__file__), '../.cache/providers.json')
+
+WINDOW = 50  # Successful latencies kept per provider for its p90
+MIN_SAMPLES = 5  # Below this, a provider's p90 is its initial guess
+EWMA_ALPHA = 0.2  # Weight of the newest sample in the latency and success averages
+FAILURES_TO_TRIP = 3  # Consecutive failures that take a provider out of rotation
+COOLDOWN = (5.0, 300.0)  # Seconds out of rotation: base, doubling per further failure, up to the cap
+MIN_SUCCESS = 0.05  # Floor on the success rate when ranking, so a bad patch isn't a division by zero
+
+DIFFUSERS_PARAMS = {'height': 512, 'width': 512, 'guidance_scale': 7.5}
+
+
+class Cancelled(Exception):
+    """The attempt lost the race and stopped"""
+
+
+class ProviderError(Exception):
+    """
+    One attempt failed; transient errors (503, timeouts, bad payloads) are worth retrying
+    retry_after is the provider's own estimate in seconds, if it gave one
+    """
+
+    def __init__(self, reason, transient=True, retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.transient = transient
+        self.retry_after = retry_after
+
+
+class _Cancellable:
+    """A streaming response whose body iteration stops once cancel is set"""
+
+    def __init__(self, response, cancel):
+        self.response = response
+        self.headers = response.headers
+        self.cancel = cancel
+
+    def iter_content(self, chunk_size):
+        for chunk in self.response.iter_content(chunk_size):
+            if self.cancel.is_set():
+                raise Cancelled()
+            yield chunk
+
+
+def _fetch(send, staging, cancel, trace):
+    """Send a request and stream a 200 body to staging; raises ProviderError or Cancelled"""
+    import requests
+    from generate_hf_api import retry_hint
+
+    try:
+        with timed(trace, 'request'):
+            response = send()
+    except requests.exceptions.Timeout:
+        raise ProviderError('timeout') from None
+    except requests.exceptions.ConnectionError as e:
+        raise ProviderError(f'connection error: {str(e)[:80]}') from None
+    with response:
+        if cancel.is_set():
+            raise Cancelled()
+        if response.status_code in (429, 503):
+            raise ProviderError(f'HTTP {response.status_code}', retry_after=retry_hint(response))
+        if response.status_code != 200:
+            raise ProviderError(f'HTTP {response.status_code}: {response.text[:100]}', transient=response.status_code >= 500)
+        try:
+            with timed(trace, 'download'):
+                written = stream_to_file(_Cancellable(response, cancel), staging)
+        except (IOError, requests.exceptions.RequestException) as e:
+            raise ProviderError(f'download failed: {str(e)[:80]}') from None
+    trace.add_bytes(written)
+
+
+def _discard(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class Provider(abc.ABC):
+    """Turns a prompt into an image file at a staging path"""
+
+    name = None
+    initial_p90 = 30.0  # Seconds; the hedge delay until real latencies are known
+
+    @abc.abstractmethod
+    def generate(self, prompt, staging, seed=None, cancel=None, trace=None):
+        """Write the raw image to staging; raise ProviderError on failure, Cancelled once cancel is set"""
+
+
+class PollinationsProvider(Provider):
+    name = 'pollinations'
+    initial_p90 = 20.0
+
+    def __init__(self, base_url=None, timeout=60):
+        from generate import load_backend
+
+        self.backend = load_backend('pollinations')
+        self.base_url = base_url or self.backend.POLLINATIONS_URL
+        self.timeout = timeout
+
+    def generate(self, prompt, staging, seed=None, cancel=None, trace=None):
+        params = self.backend.IMAGE_PARAMS if seed is None else dict(self.backend.IMAGE_PARAMS, seed=seed)
+        url = f"{self.base_url}/prompt/{quote(prompt)}"
+        _fetch(lambda: get_session().get(url, params=params, timeout=self.timeout, stream=True), staging, cancel, trace)
+
+
+class HFApiProvider(Provider):
+    name = 'hf-api'
+    initial_p90 = 15.0
+
+    def __init__(self, base_url=None, timeout=30):
+        from generate_hf_api import HF_API_BASE, HF_MODEL
+
+        self.api_url = f"{base_url or HF_API_BASE}/models/{HF_MODEL}"
+        self.timeout = timeout
+
+    def generate(self, prompt, staging, seed=None, cancel=None, trace=None):
+        payload = {'inputs': prompt}
+        if seed is not None:
+            payload['parameters'] = {'seed': seed}
+            payload['options'] = {'use_cache': False}
+        headers = {'Authorization': 'Bearer hf_token'}
+        _fetch(lambda: get_session().post(self.api_url, headers=headers, json=payload, timeout=self.timeout, stream=True),
+               staging, cancel, trace)
+
+
+class DiffusersProvider(Provider):
+    """
+    The local pipeline (or a running sd_daemon.py), one image at a time
+    Loaded on first use, so listing providers stays cheap
+    """
+
+    name = 'diffusers'
+    initial_p90 = 120.0
+
+    def __init__(self, profile='cpu-fast', use_daemon=True):
+        self.profile = profile
+        self.use_daemon = use_daemon
+        self.pipe = None
+        self.load_lock = threading.Lock()
+        self.run_lock = threading.Lock()
+
+    def pipeline(self):
+        with self.load_lock:
+            if self.pipe is None:
+                from sd_daemon import connect
+                from sd_pipeline import load_pipeline
+
+                self.pipe = connect(self.profile, use_daemon=self.use_daemon) or load_pipeline(profile=self.profile)
+                if hasattr(self.pipe, 'set_progress_bar_config'):
+                    self.pipe.set_progress_bar_config(disable=True)
+        return self.pipe
+
+    def generate(self, prompt, staging, seed=None, cancel=None, trace=None):
+        import io
+
+        from sd_daemon import seed_params
+        from sd_pipeline import PROFILES
+
+        cancel = cancel or threading.Event()
+        pipe = self.pipeline()
+        # Wait for the pipeline without missing a cancel
+        while not self.run_lock.acquire(timeout=0.2):
+            if cancel.is_set():
+                raise Cancelled()
+        try:
+            def on_step_end(pipe, step, timestep, callback_kwargs):
+                if cancel.is_set():
+                    raise Cancelled()
+                return callback_kwargs
+
+            params = dict(DIFFUSERS_PARAMS, num_inference_steps=PROFILES[self.profile]['num_inference_steps'])
+            if seed is not None:
+                params.update(seed_params(pipe, seed))
+            try:
+                with timed(trace, 'inference'):
+                    # sd_daemon's RemotePipeline drops the callback; its calls run to the end
+                    image = pipe(prompt, callback_on_step_end=on_step_end, **params).images[0]
+            except Cancelled:
+                raise
+            except Exception as e:
+                raise ProviderError(f'pipeline error: {str(e)[:80]}', transient=False) from None
+        finally:
+            self.run_lock.release()
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        atomic_write(staging, buffer.getvalue())
+        trace.add_bytes(len(buffer.getvalue()))
+
+
+PROVIDERS = {
+    'pollinations': PollinationsProvider,
+    'hf-api': HFApiProvider,
+    'diffusers': DiffusersProvider,
+}
+
+
+class ProviderStats:
+    """Online latency and health of one provider"""
+
+    def __init__(self, name, initial_p90, state=None):
+        state = state or {}
+        self.name = name
+        self.initial_p90 = initial_p90
+        self.latencies = deque(state.get('latencies', []), maxlen=WINDOW)
+        self.ewma = state.get('ewma')
+        self.success = state.get('success', 1.0)
+        self.counts = dict({'attempts': 0, 'wins': 0, 'failures': 0, 'hedges': 0, 'cancelled': 0}, **state.get('counts', {}))
+        self.failures = 0  # Consecutive
+        self.down_until = 0.0  # time.monotonic(); not carried across runs
+
+    def p90(self):
+        from job_pool import percentile
+
+        if len(self.latencies) < MIN_SAMPLES:
+            return self.initial_p90
+        return percentile(list(self.latencies), 90)
+
+    def expected(self):
+        """Expected seconds to get a good image: typical latency over the chance of success"""
+        latency = self.ewma if self.ewma is not None else self.initial_p90 / 2
+        return latency / max(self.success, MIN_SUCCESS)
+
+    def _observe(self, seconds):
+        self.ewma = seconds if self.ewma is None else (1 - EWMA_ALPHA) * self.ewma + EWMA_ALPHA * seconds
+
+    def record_success(self, seconds):
+        self.latencies.append(seconds)
+        self._observe(seconds)
+        self.success = (1 - EWMA_ALPHA) * self.success + EWMA_ALPHA
+        self.failures = 0
+        self.down_until = 0.0
+
+    def record_failure(self, error):
+        self.success = (1 - EWMA_ALPHA) * self.success
+        self.failures += 1
+        self.counts['failures'] += 1
+        cooldown = 0.0
+        if self.failures >= FAILURES_TO_TRIP:
+            cooldown = min(COOLDOWN[1], COOLDOWN[0] * 2 ** (self.failures - FAILURES_TO_TRIP))
+        hint = getattr(error, 'retry_after', None)
+        if cooldown or hint:
+            self.down_until = max(self.down_until, time.monotonic() + max(cooldown, hint or 0.0))
+
+    def record_cancelled(self, seconds):
+        # A lost race says the latency was at least this long; it only informs when
+        # that is more than we already expect (otherwise it was merely started late)
+        self.counts['cancelled'] += 1
+        if self.ewma is None or seconds > self.ewma:
+            self.latencies.append(seconds)
+            self._observe(seconds)
+
+    def state(self):
+        return {'latencies': [round(s, 3) for s in self.latencies], 'ewma': self.ewma, 'success': self.success,
+                'counts': self.counts}
+
+
+class HedgedRouter:
+    """
+    Runs each job on the currently fastest provider, hedged with the next one
+    generate() is thread-safe; run_jobs workers call it concurrently
+    """
+
+    def __init__(self, providers, state_path=STATE_FILE, max_hedges=1):
+        self.providers = list(providers)
+        self.state_path = state_path
+        self.max_hedges = max_hedges
+        self.lock = threading.Lock()
+        self.attempt_ids = itertools.count()
+        saved = self._load()
+        self.stats = {p.name: ProviderStats(p.name, p.initial_p90, saved.get(p.name)) for p in self.providers}
+
+    def _load(self):
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self.lock:
+            saved = self._load()
+            saved.update({name: stats.state() for name, stats in self.stats.items()})
+        atomic_write(self.state_path, (json.dumps(saved, indent=1, sort_keys=True) + '\n').encode('utf-8'))
+
+    def ranked(self):
+        """Providers in routing order: in rotation by expected time, then the rest by when they return"""
+        now = time.monotonic()
+        with self.lock:
+            return sorted(self.providers, key=lambda p: (self.stats[p.name].down_until > now,
+                                                         self.stats[p.name].down_until,
+                                                         self.stats[p.name].expected()))
+
+    def _start(self, provider, prompt, dest, seed, results):
+        attempt = {
+            'provider': provider,
+            'cancel': threading.Event(),
+            'trace': JobTrace(os.path.basename(dest), provider.name),
+            'staging': f"{staging_path(dest)}.{provider.name}.{next(self.attempt_ids)}",
+            'started': time.monotonic(),
+        }
+        with self.lock:
+            self.stats[provider.name].counts['attempts'] += 1
+
+        def run():
+            try:
+                provider.generate(prompt, attempt['staging'], seed, attempt['cancel'], attempt['trace'])
+                error = None
+            except Exception as e:
+                error = e
+            # Under the lock, so either this sees the cancel or the winner sees 'finished'
+            # and cleans up; a loser's staging file never survives the race
+            with self.lock:
+                attempt['finished'] = True
+                abandoned = attempt['cancel'].is_set()
+            if abandoned:
+                _discard(attempt['staging'])
+            results.put((attempt, error))
+
+        # Daemon threads: an abandoned attempt never holds up the run
+        threading.Thread(target=run, name=f'{provider.name}-attempt', daemon=True).start()
+        return attempt
+
+    def generate(self, prompt, dest, seed=None, cache=None, key=None, trace=None, label=None):
+        """
+        Publish an image for prompt at dest (through the cache entry for key) from
+        whichever provider delivers a valid one first; returns that provider's name
+        Raises job_pool.RetryLater when every provider failed and one of them may
+        recover, ProviderError when none will
+        """
+        from job_pool import RetryLater
+
+        label = label or os.path.basename(dest)
+        trace = trace if trace is not None else JobTrace(label, 'hedged')
+        now = time.monotonic()
+        order = self.ranked()
+        with self.lock:
+            waits = [self.stats[p.name].down_until - now for p in order]
+        if min(waits) > 0:
+            raise RetryLater(f"every provider is cooling down ({', '.join(p.name for p in order)})", min(waits))
+        order = [p for p, wait in zip(order, waits) if wait <= 0]
+
+        results = queue.Queue()
+        pending, errors = [], []
+        hedges = 0
+
+        def launch():
+            attempt = self._start(order.pop(0), prompt, dest, seed, results)
+            pending.append(attempt)
+            with self.lock:
+                return attempt, time.monotonic() + self.stats[attempt['provider'].name].p90()
+
+        current, hedge_at = launch()
+        while pending:
+            wait = None
+            if order and hedges < self.max_hedges:
+                wait = max(0.0, hedge_at - time.monotonic())
+            try:
+                attempt, error = results.get(timeout=wait)
+            except queue.Empty:
+                hedges += 1
+                trace.count('hedges')
+                with self.lock:
+                    self.stats[order[0].name].counts['hedges'] += 1
+                print(f"  🔀 {label}: {current['provider'].name} is past its p90 "
+                      f"({hedge_at - current['started']:.1f}s), hedging on {order[0].name}")
+                current, hedge_at = launch()
+                continue
+
+            pending.remove(attempt)
+            name = attempt['provider'].name
+            seconds = time.monotonic() - attempt['started']
+            if error is None:
+                try:
+                    finish_download(attempt['staging'], dest, cache, key, trace)
+                except ImageRejected as e:
+                    error = ProviderError(f'rejected, {e}')
+            if error is None:
+                with self.lock:
+                    self.stats[name].record_success(seconds)
+                    self.stats[name].counts['wins'] += 1
+                    for loser in pending:
+                        loser['cancel'].set()
+                        self.stats[loser['provider'].name].record_cancelled(time.monotonic() - loser['started'])
+                    # Losers that finished before the cancel left their result unread in the queue
+                    finished = [loser for loser in pending if loser.get('finished')]
+                for loser in finished:
+                    _discard(loser['staging'])
+                for stage, value in attempt['trace'].stages.items():
+                    trace.add(stage, value)
+                trace.add_bytes(attempt['trace'].bytes)
+                trace.count(f'won_{name}')
+                if pending:
+                    trace.count('cancelled')
+                trace.backend = name
+                return name
+
+            if not isinstance(error, ProviderError):
+                error = ProviderError(f'{type(error).__name__}: {str(error)[:80]}', transient=False)
+            print(f"  ⚠ {label}: {name} failed after {seconds:.1f}s ({error.reason})")
+            trace.count('provider_errors')
+            with self.lock:
+                self.stats[name].record_failure(error)
+            errors.append(error)
+            _discard(attempt['staging'])
+            if not pending and order:
+                # Nothing left in flight: fail over straight away rather than waiting for a hedge
+                trace.count('failovers')
+                current, hedge_at = launch()
+
+        trace.error = '; '.join(e.reason for e in errors)[:200]
+        if any(e.transient for e in errors):
+            hints = [e.retry_after for e in errors if e.retry_after]
+            raise RetryLater(f"all providers failed ({errors[-1].reason})", min(hints) if hints else None)
+        raise ProviderError(f"all providers failed ({errors[-1].reason})", transient=False)
+
+    def summary(self):
+        lines = [f"   {'provider':<13} {'p90':>7} {'ewma':>7} {'success':>8} {'attempts':>9} {'wins':>5} "
+                 f"{'hedged':>7} {'cancelled':>10}"]
+        with self.lock:
+            for name, stats in sorted(self.stats.items(), key=lambda item: item[1].expected()):
+                ewma = f"{stats.ewma:.2f}s" if stats.ewma is not None else '-'
+                counts = stats.counts
+                lines.append(f"   {name:<13} {stats.p90():>6.2f}s {ewma:>7} {100 * stats.success:>7.0f}% "
+                             f"{counts['attempts']:>9} {counts['wins']:>5} {counts['hedges']:>7} {counts['cancelled']:>10}")
+        return '\n'.join(lines)
+
+
+def add_provider_args(parser):
+    """Command-line flags for choosing and reaching the providers"""
+    parser.add_argument('--providers', default='pollinations,hf-api',
+                        help=f"comma-separated providers to route between (of {', '.join(PROVIDERS)}; default: pollinations,hf-api)")
+    parser.add_argument('--pollinations-url', default=None, help='Pollinations endpoint (default: $POLLINATIONS_URL or the public service)')
+    parser.add_argument('--hf-url', default=None, help='Inference API host (default: $HF_API_BASE or the public API)')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per HTTP request (default: 60)')
+    parser.add_argument('--profile', default='cpu-fast', help='speed profile for the diffusers provider (default: cpu-fast)')
+    parser.add_argument('--max-hedges', type=int, default=1, help='extra providers a slow job may be sent to (default: 1)')
+    parser.add_argument('--provider-state', default=STATE_FILE, help='where latency/health persists between runs')
+
+
+def router_from_args(args):
+    names = [name.strip() for name in args.providers.split(',') if name.strip()]
+    unknown = [name for name in names if name not in PROVIDERS]
+    if unknown or not names:
+        raise SystemExit(f"✗ Unknown provider(s): {', '.join(unknown) or '(none given)'} (use {', '.join(PROVIDERS)})")
+    built = {
+        'pollinations': lambda: PollinationsProvider(args.pollinations_url, args.timeout),
+        'hf-api': lambda: HFApiProvider(args.hf_url, args.timeout),
+        'diffusers': lambda: DiffusersProvider(args.profile),
+    }
+    return HedgedRouter([built[name]() for name in names], args.provider_state or None, args.max_hedges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--state', default=STATE_FILE, help='state file to read (default: .cache/providers.json)')
+    args = parser.parse_args()
+
+    try:
+        with open(args.state) as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        raise SystemExit(f"✗ No provider state at {os.path.relpath(args.state)} yet") from None
+    router = HedgedRouter([], state_path=None)
+    for name, state in saved.items():
+        router.stats[name] = ProviderStats(name, PROVIDERS[name].initial_p90 if name in PROVIDERS else 30.0, state)
+    print(f"\n📡 Providers ({os.path.relpath(args.state)}), in routing order:\n")
+    print(router.summary())
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,32 @@ Quick AI Burger Image Generation - Optimized for Speed
 Uses minimal inference steps and memory optimizations
 """
 
-import torch
-from diffusers import StableDiffusionPipeline
+import argparse
+import os
+import sys
+import time
 from pathlib import Path
 import gc
 
+from derive_views import DEFAULT_STRENGTH, LatentStore, derive_keys, generate_pairs, img2img_for, plan_pairs
+from gen_cache import add_cache_args, cache_from_args, cache_key, restore_cached
+from image_finish import save_generated
+from low_memory import MemoryBudgetExceeded, add_low_memory_args, load_low_memory_pipeline
+from menu_data import item_subject, menu_views, view_label
+from menu_plan import add_menu_args, plan_from_args
+from phash_index import add_dedupe_args, ensure_unique, index_from_args
+from prompt_embeds import add_embedding_args, embeddings_from_args, prompt_args
+from sd_int8 import Int8Modules, add_int8_args, int8_categories_from_args, int8_model_id, mark_int8
+from sd_pipeline import MODEL_ID, PROFILES, load_pipeline, seconds_per_image
+from telemetry import add_telemetry_args, telemetry_from_args, timed_pipe
+
+# Step count comes from the speed profile (see sd_pipeline.PROFILES)
+GENERATION_PARAMS = {
+    'height': 512,
+    'width': 768,
+    'guidance_scale': 7.5,
+}
+
 # Create directories
 dirs = {
     'burgers': './public/images/burgers',
@@ -16,106 +37,274 @@ dirs = {
     'drinks': './public/images/drinks',
 }
 
-for dir_path in dirs.values():
-    Path(dir_path).mkdir(parents=True, exist_ok=True)
-
-# Simplified burger list (5 most important burgers)
-burgers = [
-    {
-        'id': 'classic',
-        'name': 'The Ahkii Classic',
-        'prompt': 'delicious cheeseburger with beef patty, cheese, lettuce, tomato, onions, studio photography, professional food photo',
-        'cross_prompt': 'cross section of cheeseburger showing layers of beef, cheese, lettuce, tomato, onions, food photography',
-    },
-    {
-        'id': 'double-trouble',
-        'name': 'The Double Trouble',
-        'prompt': 'double patty cheeseburger with two beef patties, double cheese, caramelized onions, professional food photography',
-        'cross_prompt': 'cross section double cheeseburger showing two beef patties with melted cheese and caramelized onions, food photo',
-    },
-    {
-        'id': 'heatwave',
-        'name': 'The Heatwave',
-        'prompt': 'spicy burger with jalapeños, pepperjack cheese, crispy onions, hot sauce, professional food photography',
-        'cross_prompt': 'cross section spicy burger showing jalapeños, pepperjack cheese, crispy onions, hot sauce, food photo',
-    },
-]
-
-print("\n🍔 QUICK AI BURGER IMAGE GENERATION\n")
-print("Loading Stable Diffusion model (optimized)...")
-
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Device: {device.upper()}\n")
-
-try:
-    pipe = StableDiffusionPipeline.from_pretrained(
-        "runwayml/stable-diffusion-v1-5",
-        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
-        safety_checker=None,
-    )
-    pipe = pipe.to(device)
-
-    # Optimize for speed
-    pipe.enable_attention_slicing()
-    if device == "cuda":
-        pipe.enable_sequential_cpu_offload()
-
-    successful = 0
-    failed = 0
-
-    print("📸 Generating burger images...\n")
-
-    for burger in burgers:
-        try:
-            # Normal view - only 15 steps for speed
-            print(f"Generating {burger['name']}...")
-            image = pipe(
-                burger['prompt'],
-                height=512,
-                width=768,
-                num_inference_steps=15,  # Low steps = faster
-                guidance_scale=7.5
-            ).images[0]
-
-            normal_path = Path(dirs['burgers']) / f"{burger['id']}.jpg"
-            image.save(normal_path)
-            print(f"   ✓ Saved normal view")
-            successful += 1
-
-            # Cross section
-            image = pipe(
-                burger['cross_prompt'],
-                height=512,
-                width=768,
-                num_inference_steps=15,
-                guidance_scale=7.5
-            ).images[0]
-
-            cross_path = Path(dirs['burgers']) / f"{burger['id']}-cross.jpg"
-            image.save(cross_path)
-            print(f"   ✓ Saved cross-section\n")
-            successful += 1
-
-            # Free memory
+def make_dirs():
+    for dir_path in dirs.values():
+        Path(dir_path).mkdir(parents=True, exist_ok=True)
+
+# The burgers this quick run covers (ids in data/menu.ts)
+QUICK_ITEMS = ('classic', 'double-trouble', 'heatwave')
+
+def create_prompt(item, cross_section=False):
+    """Short prompt from the menu item's name and description"""
+    return f"{item_subject(item, cross_section)}, professional food photography"
+
+def profile_params(profile):
+    """pipe() arguments for a speed profile"""
+    return dict(GENERATION_PARAMS, num_inference_steps=PROFILES[profile]['num_inference_steps'])
+
+
+def build_jobs(profile='default'):
+    """Normal and cross-section view for each of QUICK_ITEMS, prompted from data/menu.ts"""
+    jobs = []
+    for item, view, url in menu_views():
+        if item['id'] in QUICK_ITEMS:
+            jobs.append({'label': view_label(item, view), 'prompt': create_prompt(item, view == 'cross'),
+                         'path': os.path.join('./public', url.lstrip('/')), 'category': 'burgers',
+                         'pair': item['id'], 'view': view})
+    for job in jobs:
+        job['key'] = job_key(job['prompt'], profile)
+    return jobs
+
+
+def job_key(prompt, profile, seed=None, quantization=None):
+    # The scheduler and int8 weights change the image, so they are part of the cache key
+    params = dict(profile_params(profile), scheduler=PROFILES[profile]['scheduler'])
+    if quantization:
+        params['quantization'] = quantization
+    return cache_key(prompt, MODEL_ID, params, seed)
+
+
+def benchmark(compile_unet=False):
+    """Print seconds per image for every profile on the normal views of QUICK_ITEMS"""
+    prompts = [job['prompt'] for job in build_jobs() if job['view'] == 'normal']
+    results = {}
+
+    print("⏱  Benchmarking speed profiles (normal views, nothing is saved)\n")
+    for name, settings in PROFILES.items():
+        print(f"[{name}] {settings['description']}")
+        pipe = load_pipeline(profile=name, compile_unet=compile_unet)
+        results[name] = seconds_per_image(pipe, prompts, **profile_params(name))
+        print(f"   {results[name]:.1f}s per image\n")
+        del pipe
+        gc.collect()
+
+    baseline = results['default']
+    print("="*60)
+    for name, seconds in results.items():
+        print(f"{name:>10}: {seconds:6.1f}s per image  ({baseline / seconds:.2f}x)")
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quick burger image generation with Stable Diffusion")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default',
+                        help='speed profile (cpu-fast: few-step DPM-Solver++ with CPU thread tuning)')
+    parser.add_argument('--compile', action='store_true', help='torch.compile the UNet (slow first image, faster after)')
+    parser.add_argument('--benchmark', action='store_true', help='print seconds per image for each profile and exit')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='load the model in this process even if sd_daemon.py is running')
+    parser.add_argument('--derive-cross', action='store_true',
+                        help='make each cross-section by img2img from its seeded normal view (implies --no-daemon)')
+    parser.add_argument('--cross-strength', type=float, default=DEFAULT_STRENGTH,
+                        help=f'fraction of the steps the derived cross-section re-runs (default: {DEFAULT_STRENGTH})')
+    add_cache_args(parser)
+    add_menu_args(parser)
+    add_dedupe_args(parser)
+    add_telemetry_args(parser)
+    add_embedding_args(parser)
+    add_low_memory_args(parser)
+    add_int8_args(parser)
+    args = parser.parse_args()
+    if args.low_memory and (args.derive_cross or args.compile or args.int8):
+        parser.error('--low-memory runs plain generation only (not --derive-cross, --compile or --int8)')
+    cache = cache_from_args(args)
+
+    if args.benchmark:
+        benchmark(args.compile)
+        return
+
+    print("\n🍔 QUICK AI BURGER IMAGE GENERATION\n")
+
+    # Unchanged burgers come from the cache without loading the model at all
+    all_jobs = build_jobs(args.profile)
+    int8_jobs = mark_int8(all_jobs, int8_categories_from_args(args, MODEL_ID))
+    for job in int8_jobs:
+        job['key'] = job_key(job['prompt'], args.profile, quantization=job['quantization'])
+    # Every job here is a burger, so the pipeline is int8 only if the burgers are
+    int8 = bool(int8_jobs)
+    if args.derive_cross:
+        # Seeded, derived views are different images, so they have their own cache keys
+        derive_keys(all_jobs, lambda job, seed: job_key(job['prompt'], args.profile, seed, job.get('quantization')),
+                    args.cross_strength)
+    # --changed narrows the run to the menu plan; pairing below still sees every view
+    plan, planned = plan_from_args(args, all_jobs)
+    jobs = restore_cached(planned, cache, force=args.force)
+    print(f"\n♻️  {len(planned) - len(jobs)} cached, {len(jobs)} to generate\n")
+    if not jobs:
+        plan.save()
+        print("✅ Everything is up to date, nothing to generate\n")
+        return
+
+    # Deferred so --help and the job listing don't pay for importing torch
+    import torch
+    from sd_daemon import connect, seed_params
+
+    make_dirs()
+    # Low-memory mode is for CPU build agents
+    device = "cuda" if torch.cuda.is_available() and not args.low_memory else "cpu"
+    telemetry = telemetry_from_args(args, 'quick_generate', 'diffusers')
+    index = None
+
+    try:
+        # A running sd_daemon.py already holds a warm pipeline; otherwise load one here
+        # Deriving needs the pipeline's modules in this process
+        pipe = connect(args.profile, use_daemon=not (args.no_daemon or args.derive_cross or args.low_memory or int8))
+        if pipe is not None:
+            telemetry.backend = 'sd-daemon'
+        else:
+            print(f"Loading Stable Diffusion model ({args.profile} profile)...")
+            print(f"Device: {device.upper()}\n")
+            load_started = time.perf_counter()
+            if args.low_memory:
+                ceiling = f"{args.max_rss_mb}MB" if args.max_rss_mb else "none"
+                print(f"🧠 Low-memory mode: mapped weights, peak RSS ceiling {ceiling}\n")
+                pipe = load_low_memory_pipeline(MODEL_ID, args.profile, args.max_rss_mb)
+            else:
+                pipe = load_pipeline(device=device, profile=args.profile, compile_unet=args.compile)
+            if device == "cuda":
+                pipe.enable_sequential_cpu_offload()
+            if int8:
+                # Burgers are the only category here, so the fp32 modules can go
+                Int8Modules(pipe, MODEL_ID, keep_fp32=False)
+            telemetry.load(time.perf_counter() - load_started)
+        params = profile_params(args.profile)
+        index = index_from_args(args, jobs)
+        # Re-rolls and reruns reuse the prompt's text-encoder output
+        embeddings = embeddings_from_args(args, pipe, int8_model_id(MODEL_ID) if int8 else MODEL_ID)
+
+        def save(job, image, key):
+            trace = telemetry.trace(job)
+            # Low-memory mode measures each image's peak RSS, re-rolls included
+            peak = getattr(pipe, 'last_peak_mb', None)
+            if peak is not None:
+                trace.peak_rss_mb = max(peak, trace.peak_rss_mb or 0)
+            # Blank or corrupt output raises image_finish.ImageRejected and counts as a failure
+            save_generated(image, job['path'], cache, key, trace)
+
+        def saved(job):
+            peak = telemetry.trace(job).peak_rss_mb
+            note = f" (peak RSS {peak:.0f}MB)" if peak is not None else ""
+            print(f"   ✓ Saved {Path(job['path']).name}{note}\n")
+
+        def reroller(job):
+            # A near-duplicate of another burger image is re-rolled straight away
+            def reroll(seed):
+                trace = telemetry.trace(job)
+                trace.count('rerolls')
+                image = timed_pipe(pipe, [trace], **prompt_args(embeddings, job['prompt']), **params,
+                                   **seed_params(pipe, seed)).images[0]
+                save(job, image, job_key(job['prompt'], args.profile, seed, job.get('quantization')))
+                return True
+            return reroll
+
+        successful = 0
+        failed = 0
+
+        print("📸 Generating burger images...\n")
+        telemetry.start()
+
+        # Each pending burger's views one pair at a time: the normal view, then its
+        # cross-section derived from the normal view's latents
+        pairs, jobs = plan_pairs(all_jobs, jobs) if args.derive_cross else ([], jobs)
+        img2img = img2img_for(pipe) if pairs else None
+        store = LatentStore()
+        for pair in pairs:
+            pending = [pair[view] for view in ('normal', 'cross') if pair[f'{view}_pending']]
+            for job in pending:
+                telemetry.trace(job).add('queue', telemetry.elapsed())
+                print(f"Generating {job['label']}...")
+            try:
+                for job, image in generate_pairs(pipe, img2img, [pair], params, args.cross_strength, store,
+                                                 embeddings, telemetry.trace):
+                    save(job, image, job['key'])
+                    # A txt2img re-roll would break the pair's shared latents (derive_views.py)
+                    ensure_unique(index, job, None, cache, args.max_rerolls)
+                    saved(job)
+                    successful += 1
+                    telemetry.record(job, True)
+                    pending.remove(job)
+            except Exception as e:
+                print(f"   ✗ Error: {str(e)[:80]}\n")
+                for job in pending:
+                    failed += 1
+                    telemetry.trace(job).error = str(e)[:200]
+                    telemetry.record(job, False)
             gc.collect()
             if device == "cuda":
                 torch.cuda.empty_cache()
 
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)[:80]}\n")
-            failed += 2
+        for job in jobs:
+            trace = telemetry.trace(job)
+            trace.add('queue', telemetry.elapsed())
+            try:
+                print(f"Generating {job['label']}...")
+                image = timed_pipe(pipe, [trace], **prompt_args(embeddings, job['prompt']), **params).images[0]
+                save(job, image, job['key'])
+                ensure_unique(index, job, reroller(job), cache, args.max_rerolls)
+                saved(job)
+                successful += 1
+                telemetry.record(job, True)
 
-    print("="*60)
-    print(f"✅ Generated {successful} images")
-    if failed > 0:
-        print(f"⚠ Failed: {failed} images")
-    print("="*60)
-    print("\n✨ AI burger images ready!")
-    print(f"📁 Saved to: {dirs['burgers']}\n")
-
-except Exception as e:
-    print(f"\n❌ Error: {e}\n")
-    print("Make sure you have:")
-    print("1. Enough disk space (5GB+ for model)")
-    print("2. 8GB+ RAM available")
-    print("3. Run: pip install torch diffusers transformers pillow\n")
+                # Free memory
+                gc.collect()
+                if device == "cuda":
+                    torch.cuda.empty_cache()
+
+            except MemoryBudgetExceeded as e:
+                # The next image would need the same memory; stop instead of failing them all
+                failed += 1
+                trace.error = str(e)
+                telemetry.record(job, False)
+                raise
+            except Exception as e:
+                print(f"   ✗ Error: {str(e)[:80]}\n")
+                failed += 1
+                trace.error = str(e)[:200]
+                telemetry.record(job, False)
+
+        telemetry.close()
+        plan.save()
+        if index is not None:
+            index.save()
+        print("="*60)
+        print(f"✅ Generated {successful} images")
+        if failed > 0:
+            print(f"⚠ Failed: {failed} images")
+        if embeddings is not None:
+            print(embeddings.summary())
+        peaks = [job['trace'].peak_rss_mb for job in all_jobs if job.get('trace') and job['trace'].peak_rss_mb]
+        if peaks:
+            print(f"🧠 Peak RSS per image: {min(peaks):.0f}-{max(peaks):.0f}MB (ceiling {args.max_rss_mb or 'none'})")
+        print("="*60)
+        print("\n✨ AI burger images ready!")
+        print(f"📁 Saved to: {dirs['burgers']}\n")
+
+    except MemoryBudgetExceeded as e:
+        # Keep what finished, and fail the build so the breach is seen
+        telemetry.close()
+        plan.save()
+        if index is not None:
+            index.save()
+        print(f"\n❌ Stopped: {e}")
+        print(f"   Finished images are saved; raise --max-rss-mb above {e.peak_mb:.0f} or use a bigger agent\n")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}\n")
+        print("Make sure you have:")
+        print("1. Enough disk space (5GB+ for model)")
+        print("2. 8GB+ RAM available (or try --low-memory)")
+        print("3. Run: pip install torch diffusers transformers pillow\n")
+
+
+if __name__ == "__main__":
+    main()
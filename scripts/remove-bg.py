@@ -1,48 +1,360 @@
 #!/usr/bin/env python3
 """
 Remove white/light backgrounds from burger images and make them transparent
+
+Usage:
+    python3 scripts/remove-bg.py                     # burger-transparent-{1,2,3}.png, in place
+    python3 scripts/remove-bg.py 'public/images/3burgers/*.png' 'public/images/stickers/*.png'
+    python3 scripts/remove-bg.py 'public/images/team/*.png' --out-dir public/images/cutouts --workers 4
+    python3 scripts/remove-bg.py 'public/images/hero-slider/*.png' --band-rows 64
+    python3 scripts/remove-bg.py --bench-memory                # synthetic 1k/2k/4k squares
+    python3 scripts/remove-bg.py 'public/images/team/*.png' --bench-memory
+
+Files whose output is already up to date (by mtime, or content hash with
+--check hash) are skipped; --force reprocesses everything.
+
+--band-rows N streams PNGs through in N-row bands (see png_stream.py), so peak
+memory is about N x width x 4 bytes per worker whatever the image height; other
+formats, palette/16-bit and interlaced PNGs fall back to whole-image processing.
 """
+import argparse
+import glob
+import hashlib
+import json
 import os
-from PIL import Image
-import numpy as np
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gen_cache import FILE_MODE, atomic_write
+from telemetry import peak_rss_bytes, reset_peak_rss
 
 # Directory containing burger images
 burger_dir = os.path.join(os.path.dirname(__file__), '../public/images/burgers')
 
-# Process each burger transparent image
-for i in range(1, 4):
-    image_path = os.path.join(burger_dir, f'burger-transparent-{i}.png')
+# Remembers what each output was produced from, so reruns can skip it
+STATE_FILE = os.path.join(os.path.dirname(__file__), '../.cache/remove-bg.json')
+
+# Define threshold for white/light colors (values > 240 for all channels)
+# This will catch the white background while preserving burger colors
+DEFAULT_THRESHOLD = 240
+
+# Rows per band in --band-rows mode when benchmarking
+BENCH_BAND_ROWS = 64
+BENCH_SIZES = [(1000, 1000), (2000, 2000), (2000, 8000), (4000, 4000)]  # same width, 4x taller: banded peak should not move
+
+
+def legacy_sources():
+    """The three transparent burgers this script originally handled"""
+    return [os.path.join(burger_dir, f'burger-transparent-{i}.png') for i in range(1, 4)]
+
+
+def remove_background(data, threshold=DEFAULT_THRESHOLD):
+    """
+    Make white/light pixels transparent, in place, on an RGBA uint8 array
+    A pixel is white if its darkest channel is above the threshold, which is the
+    same test as R, G and B all > threshold but needs one H x W reduction
+    instead of three full boolean masks
+    """
+    import numpy as np
+
+    white = np.min(data[:, :, :3], axis=2) > threshold
+    data[:, :, 3][white] = 0
+    return data
+
+
+def output_path(src, out_dir=None, root=None):
+    """Where the transparent version of src goes (always a PNG, since it needs alpha)"""
+    stem, ext = os.path.splitext(src)
+    if out_dir is None:
+        return src if ext.lower() == '.png' else stem + '.png'
+    relative = os.path.relpath(stem, root) if root else os.path.basename(stem)
+    return os.path.join(out_dir, relative + '.png')
+
 
-    if not os.path.exists(image_path):
-        print(f"⚠ File not found: {image_path}")
-        continue
+def fingerprint(path, check='mtime'):
+    if check == 'hash':
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
 
+
+def load_state():
     try:
-        # Open image
-        img = Image.open(image_path).convert('RGBA')
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state):
+    atomic_write(STATE_FILE, json.dumps(state, indent=2, sort_keys=True).encode('utf-8'))
+
 
-        # Convert to numpy array
+def is_up_to_date(src, out, state, threshold, check):
+    """True if out was produced from src's current contents with the same settings"""
+    entry = state.get(os.path.abspath(out))
+    if not entry or entry.get('threshold') != threshold or entry.get('check') != check:
+        return False
+    if not os.path.exists(out) or fingerprint(out, check) != entry['out']:
+        return False
+    # In place, the output *is* the source, so matching the output is enough
+    return src == out or fingerprint(src, check) == entry['src']
+
+
+def save_png(image, dest):
+    """Write via a temp file + rename so a crash never leaves a half-written PNG"""
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.png')
+    os.close(fd)
+    try:
+        image.save(tmp, format='PNG')
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def process_file(src, out, threshold=DEFAULT_THRESHOLD):
+    """Remove the background from one image; runs in a worker process"""
+    import numpy as np
+    from PIL import Image
+
+    started = time.perf_counter()
+    size = os.path.getsize(src)
+    with Image.open(src) as img:
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        # The one full-size copy: a writable array we edit in place
         data = np.array(img)
 
-        # Define threshold for white/light colors (values > 240 for all channels)
-        # This will catch the white background while preserving burger colors
-        threshold = 240
+    remove_background(data, threshold)
+    save_png(Image.fromarray(data, 'RGBA'), out)
+
+    height, width = data.shape[:2]
+    return {
+        'src': src,
+        'out': out,
+        'pixels': width * height,
+        'bytes': size,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def can_stream(src):
+    import png_stream
+
+    if not src.lower().endswith('.png'):
+        return False
+    try:
+        return png_stream.read_info(src).streamable
+    except ValueError:
+        return False
+
+
+def process_file_tiled(src, out, threshold=DEFAULT_THRESHOLD, band_rows=BENCH_BAND_ROWS):
+    """
+    Remove the background band by band, writing each band out as soon as it is done
+    Only one band is ever in memory; non-streamable inputs go through process_file
+    """
+    import png_stream
+
+    if not can_stream(src):
+        return process_file(src, out, threshold)
+
+    started = time.perf_counter()
+    size = os.path.getsize(src)
+    info = png_stream.read_info(src)
+    writer = png_stream.BandWriter(out, info.width, info.height, info.extra_chunks)
+    try:
+        for band in png_stream.iter_bands(src, band_rows):
+            writer.write(remove_background(band, threshold))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    return {
+        'src': src,
+        'out': out,
+        'pixels': info.width * info.height,
+        'bytes': size,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def measure_memory(src, out, threshold, band_rows):
+    """Run one mode in this (fresh) process; peak RSS growth over the imported baseline"""
+    import numpy  # noqa: F401  (part of the baseline, not the measurement)
+    import png_stream  # noqa: F401
+    from PIL import Image, PngImagePlugin  # noqa: F401
+
+    baseline = reset_peak_rss()
+    if band_rows:
+        result = process_file_tiled(src, out, threshold, band_rows)
+    else:
+        result = process_file(src, out, threshold)
+    result['peak'] = peak_rss_bytes() - baseline
+    return result
+
+
+def synthetic_png(dest, width, height):
+    """A burger-ish disc on white, written band by band so making it costs no memory either"""
+    import numpy as np
+    import png_stream
+
+    writer = png_stream.BandWriter(dest, width, height)
+    ys = np.arange(height)
+    xs = np.arange(width)
+    radius = min(width, height) * 0.4
+    for top in range(0, height, 256):
+        y = ys[top:top + 256, None]
+        inside = (xs[None, :] - width / 2) ** 2 + (y - height / 2) ** 2 < radius ** 2
+        band = np.full((y.shape[0], width, 4), 255, dtype=np.uint8)
+        band[inside, 0] = 180
+        band[inside, 1] = (110 + (y * 7 + xs[None, :] * 3) % 60)[inside]
+        band[inside, 2] = 40
+        writer.write(band)
+    writer.close()
+
+
+def bench_memory(sources, threshold, band_rows):
+    """Peak memory of whole-array vs banded processing, each run in a fresh process"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='remove-bg-bench-') as tmp:
+        if not sources:
+            for width, height in BENCH_SIZES:
+                path = os.path.join(tmp, f'synthetic-{width}x{height}.png')
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    pool.submit(synthetic_png, path, width, height).result()
+                sources.append(path)
+
+        print(f"\n🧠 Peak memory, whole-array vs {band_rows}-row bands (fresh process per run)\n")
+        print(f"  {'image':<32} {'size':>11} {'whole':>10} {'banded':>10} {'whole s':>8} {'banded s':>9}")
+        for src in sources:
+            runs = {}
+            for mode, rows in (('whole', 0), ('banded', band_rows)):
+                out = os.path.join(tmp, f'out-{mode}.png')
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    runs[mode] = pool.submit(measure_memory, src, out, threshold, rows).result()
+            from PIL import Image
+            with Image.open(runs['whole']['out']) as a, Image.open(runs['banded']['out']) as b:
+                same = a.tobytes() == b.convert('RGBA').tobytes()
+            with Image.open(src) as img:
+                dims = f"{img.width}x{img.height}"
+            print(f"  {os.path.basename(src)[:32]:<32} {dims:>11} "
+                  f"{runs['whole']['peak'] / 1e6:8.1f}MB {runs['banded']['peak'] / 1e6:8.1f}MB "
+                  f"{runs['whole']['seconds']:8.2f} {runs['banded']['seconds']:9.2f}"
+                  f"{'' if same else '   ✗ outputs differ'}")
+    print()
+
+
+def expand(patterns):
+    """Glob patterns -> sorted, de-duplicated image files"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                files.add(os.path.normpath(path))
+    return sorted(files)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('patterns', nargs='*', help='image globs (default: the burger-transparent PNGs)')
+    parser.add_argument('--out-dir', default=None, help='write results here instead of in place')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes (default: all cores)')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help=f'white cut-off 0-255 (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--check', choices=['mtime', 'hash'], default='mtime', help='how to detect up-to-date outputs')
+    parser.add_argument('--force', action='store_true', help='reprocess even up-to-date files')
+    parser.add_argument('--band-rows', type=int, default=0, help='stream PNGs in bands of this many rows (default: whole image)')
+    parser.add_argument('--bench-memory', action='store_true', help='compare peak memory of whole-array and banded modes, then exit')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.bench_memory:
+        bench_memory(expand(args.patterns), args.threshold, args.band_rows or BENCH_BAND_ROWS)
+        return
+
+    if args.patterns:
+        sources = expand(args.patterns)
+    else:
+        sources = []
+        for path in legacy_sources():
+            if os.path.exists(path):
+                sources.append(os.path.normpath(path))
+            else:
+                print(f"⚠ File not found: {path}")
+
+    if not sources:
+        print("⚠ No images matched")
+        return
 
-        # Create a mask for white/light pixels
-        # A pixel is considered white if R, G, B are all > threshold
-        white_mask = (data[:,:,0] > threshold) & (data[:,:,1] > threshold) & (data[:,:,2] > threshold)
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(s)) for s in sources])
+    state = load_state()
+    todo = []
+    skipped = 0
+    for src in sources:
+        out = output_path(src, args.out_dir, root)
+        if not args.force and is_up_to_date(src, out, state, args.threshold, args.check):
+            skipped += 1
+        else:
+            todo.append((src, out))
 
-        # Set alpha channel to 0 for white pixels (make transparent)
-        data[white_mask, 3] = 0
+    mode = f", {args.band_rows}-row bands" if args.band_rows else ""
+    print(f"\n🍔 Background removal: {len(todo)} to process, {skipped} up to date, {args.workers} workers{mode}\n")
 
-        # Create new image from modified data
-        result = Image.fromarray(data, 'RGBA')
+    done = []
+    failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        if args.band_rows:
+            futures = {pool.submit(process_file_tiled, src, out, args.threshold, args.band_rows): (src, out)
+                       for src, out in todo}
+        else:
+            futures = {pool.submit(process_file, src, out, args.threshold): (src, out) for src, out in todo}
+        for future in as_completed(futures):
+            src, out = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"✗ Error processing {os.path.basename(src)}: {e}")
+                failed += 1
+                continue
+            done.append(result)
+            megapixels = result['pixels'] / 1e6
+            print(f"✓ Processed: {os.path.relpath(src)}  "
+                  f"{megapixels:.2f} MP in {result['seconds']:.2f}s ({megapixels / result['seconds']:.1f} MP/s)")
+            state[os.path.abspath(out)] = {
+                'src': fingerprint(src, args.check),
+                'out': fingerprint(out, args.check),
+                'threshold': args.threshold,
+                'check': args.check,
+            }
+    elapsed = time.perf_counter() - started
+    save_state(state)
 
-        # Save back to file
-        result.save(image_path)
-        print(f"✓ Processed: burger-transparent-{i}.png")
+    if done:
+        megapixels = sum(r['pixels'] for r in done) / 1e6
+        megabytes = sum(r['bytes'] for r in done) / 1e6
+        print(f"\n⏱  {len(done)} files in {elapsed:.2f}s: {len(done) / elapsed:.1f} files/s, "
+              f"{megapixels / elapsed:.1f} MP/s, {megabytes / elapsed:.1f} MB/s")
+    if failed:
+        print(f"✗ {failed} files failed")
+    print("\n✓ Background removal complete!")
 
-    except Exception as e:
-        print(f"✗ Error processing burger-transparent-{i}.png: {e}")
 
-print("\n✓ Background removal complete!")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Encode every image under public/images into responsive WebP/AVIF widths
+and write a srcset manifest for the frontend
+
+Usage:
+    python3 scripts/responsive-images.py                   # everything, all cores
+    python3 scripts/responsive-images.py --workers 2 --widths 320 640 1024
+    python3 scripts/responsive-images.py --force           # re-encode even unchanged sources
+
+Derivatives go to public/images/_responsive/<same path>-<width>.<ext>, and
+data/image-manifest.json maps each original URL to them:
+
+    "/images/burgers/classic.jpg": {
+      "width": 768, "height": 768,
+      "srcset": {"avif": "/images/_responsive/burgers/classic-320.avif 320w, ...", "webp": "..."},
+      "sources": {"avif": [{"src": ..., "width": 320, "height": 320, "bytes": 9120}, ...], ...}
+    }
+
+Only sources whose contents (size + mtime) or encode settings changed are
+re-encoded; derivatives of deleted sources are removed
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gen_cache import atomic_write
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+IMAGES_DIR = os.path.join(ROOT, 'public/images')
+OUT_DIR = os.path.join(IMAGES_DIR, '_responsive')
+MANIFEST = os.path.join(ROOT, 'data/image-manifest.json')
+STATE_FILE = os.path.join(ROOT, '.cache/responsive-images.json')
+
+# Breakpoints the layouts actually use: phone, tablet / 2x phone, desktop, 2x tablet
+DEFAULT_WIDTHS = [320, 640, 960, 1280]
+
+# Encoder settings per format; quality chosen by eye on the burger photos
+FORMATS = {
+    'avif': {'quality': 55, 'speed': 6},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def public_url(path):
+    return '/' + os.path.relpath(os.path.abspath(path), os.path.abspath(os.path.join(ROOT, 'public'))).replace(os.sep, '/')
+
+
+def find_sources(images_dir=IMAGES_DIR, out_dir=OUT_DIR):
+    """Every raster image under images_dir, skipping our own output"""
+    out_dir = os.path.abspath(out_dir)
+    sources = []
+    for directory, subdirs, files in os.walk(images_dir):
+        subdirs[:] = sorted(d for d in subdirs if os.path.abspath(os.path.join(directory, d)) != out_dir)
+        for name in sorted(files):
+            if name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith('.'):
+                sources.append(os.path.normpath(os.path.join(directory, name)))
+    return sources
+
+
+def target_widths(original_width, widths):
+    """Requested widths narrower than the original, plus the original itself (never upscale)"""
+    return sorted({w for w in widths if w < original_width} | {original_width})
+
+
+def derivative_path(src, width, fmt, images_dir=IMAGES_DIR, out_dir=OUT_DIR):
+    stem = os.path.splitext(os.path.relpath(src, images_dir))[0]
+    return os.path.join(out_dir, f'{stem}-{width}.{fmt}')
+
+
+def settings_hash(widths):
+    blob = json.dumps({'widths': widths, 'formats': FORMATS}, sort_keys=True)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:16]
+
+
+def fingerprint(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state):
+    atomic_write(STATE_FILE, json.dumps(state, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def is_up_to_date(src, entry, settings):
+    if not entry or entry.get('settings') != settings or entry.get('src') != fingerprint(src):
+        return False
+    return all(os.path.exists(os.path.join(ROOT, 'public', d['src'].lstrip('/')))
+               for variants in entry['manifest']['sources'].values() for d in variants)
+
+
+def encode_source(src, widths, images_dir=IMAGES_DIR, out_dir=OUT_DIR):
+    """Encode one source at every width and format; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    started = time.perf_counter()
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    width, height = img.size
+
+    sources = {fmt: [] for fmt in FORMATS}
+    written = 0
+    # Widest first, each step resized from the original so quality never compounds
+    for w in sorted(target_widths(width, widths), reverse=True):
+        h = max(1, round(height * w / width))
+        resized = img if w == width else img.resize((w, h), Image.LANCZOS, reducing_gap=3.0)
+        for fmt, options in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt.upper(), **options)
+            dest = derivative_path(src, w, fmt, images_dir, out_dir)
+            atomic_write(dest, buffer.getvalue())
+            written += buffer.tell()
+            sources[fmt].append({'src': public_url(dest), 'width': w, 'height': h, 'bytes': buffer.tell()})
+
+    for variants in sources.values():
+        variants.sort(key=lambda d: d['width'])
+    return {
+        'src': src,
+        'manifest': {
+            'width': width,
+            'height': height,
+            'alpha': has_alpha,
+            'srcset': {fmt: ', '.join(f"{d['src']} {d['width']}w" for d in variants)
+                       for fmt, variants in sources.items()},
+            'sources': sources,
+        },
+        'pixels': width * height,
+        'bytes': os.path.getsize(src),
+        'written': written,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def prune(state, live_sources):
+    """Delete derivatives (and state) of sources that are gone; returns files removed"""
+    removed = 0
+    live = {os.path.abspath(s) for s in live_sources}
+    for key in [k for k in state if k not in live]:
+        for variants in state[key]['manifest']['sources'].values():
+            for d in variants:
+                path = os.path.join(ROOT, 'public', d['src'].lstrip('/'))
+                if os.path.exists(path):
+                    os.unlink(path)
+                    removed += 1
+        del state[key]
+    return removed
+
+
+def write_manifest(state, path=MANIFEST):
+    manifest = {public_url(src): entry['manifest'] for src, entry in state.items()}
+    data = json.dumps(dict(sorted(manifest.items())), indent=2) + '\n'
+    try:
+        with open(path) as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, data.encode('utf-8'))
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS, help=f'target widths in px (default: {DEFAULT_WIDTHS})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes (default: all cores)')
+    parser.add_argument('--manifest', default=MANIFEST, help='manifest JSON path (default: data/image-manifest.json)')
+    parser.add_argument('--force', action='store_true', help='re-encode even unchanged sources')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    widths = sorted(set(args.widths))
+    settings = settings_hash(widths)
+
+    sources = find_sources()
+    state = load_state()
+    removed = prune(state, sources)
+    todo = [src for src in sources
+            if args.force or not is_up_to_date(src, state.get(os.path.abspath(src)), settings)]
+
+    print(f"\n🖼  Responsive images: {len(todo)} to encode, {len(sources) - len(todo)} up to date, "
+          f"{len(FORMATS)} formats x {len(widths)} widths, {args.workers} workers\n")
+
+    done = []
+    failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(encode_source, src, widths): src for src in todo}
+        for future in as_completed(futures):
+            src = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"✗ Error encoding {os.path.relpath(src)}: {e}")
+                failed += 1
+                continue
+            done.append(result)
+            state[os.path.abspath(src)] = {'src': fingerprint(src), 'settings': settings, 'manifest': result['manifest']}
+            largest = {fmt: variants[-1]['bytes'] for fmt, variants in result['manifest']['sources'].items()}
+            print(f"✓ Encoded: {os.path.relpath(src)}  {result['bytes'] / 1024:.0f}KB -> "
+                  + ', '.join(f"{fmt} {size / 1024:.0f}KB" for fmt, size in largest.items())
+                  + f"  ({result['seconds']:.2f}s)")
+            # Save as we go so an interrupted run keeps its finished work
+            save_state(state)
+    elapsed = time.perf_counter() - started
+    save_state(state)
+
+    if write_manifest(state, args.manifest):
+        print(f"\n📝 Wrote {os.path.relpath(args.manifest)} ({len(state)} images)")
+    if removed:
+        print(f"🗑  Removed {removed} stale derivatives")
+    if done:
+        megapixels = sum(r['pixels'] for r in done) / 1e6
+        print(f"\n⏱  {len(done)} sources in {elapsed:.2f}s: {len(done) / elapsed:.1f} images/s, "
+              f"{megapixels / elapsed:.1f} MP/s, {sum(r['written'] for r in done) / 1e6:.1f} MB written")
+    if failed:
+        print(f"✗ {failed} sources failed")
+
+    originals = sum(os.path.getsize(src) for src in state)
+    best = sum(min(v[-1]['bytes'] for v in entry['manifest']['sources'].values()) for entry in state.values())
+    if originals:
+        print(f"📉 Full-width payload: {originals / 1e6:.1f} MB originals -> {best / 1e6:.1f} MB smallest format "
+              f"({100 * (1 - best / originals):.0f}% less)")
+    print("\n✓ Responsive images complete!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Resident Stable Diffusion worker
+Loads the pipeline once and serves generation jobs over local HTTP, so the
+generator scripts skip the 1-2 minute model load on every run
+
+Usage:
+    python3 scripts/sd_daemon.py --profile cpu-fast --preload
+    python3 scripts/quick_generate.py          # picks up the daemon automatically
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+DAEMON_URL = os.environ.get('SD_DAEMON_URL', 'http://127.0.0.1:7861')
+
+# Port to serve on when $SD_DAEMON_URL doesn't name one
+DEFAULT_PORT = 7861
+
+# pipe() arguments a client may forward to the daemon
+FORWARDED_PARAMS = ('height', 'width', 'num_inference_steps', 'guidance_scale', 'seed')
+
+
+# ---------------------------------------------------------------------------
+# Client side: stdlib only, so the generators stay cheap to start
+# ---------------------------------------------------------------------------
+
+def daemon_available(url=DAEMON_URL, timeout=0.5):
+    """True if a daemon answers /health at url"""
+    try:
+        with urllib.request.urlopen(f"{url}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+class RemotePipeline:
+    """Stand-in for StableDiffusionPipeline that sends pipe() calls to the daemon"""
+
+    def __init__(self, url=DAEMON_URL, profile='default', timeout=3600):
+        self.url = url
+        self.profile = profile
+        self.timeout = timeout
+
+    def __call__(self, prompt, **params):
+        from PIL import Image
+
+        payload = {'prompt': prompt, 'profile': self.profile}
+        payload.update({k: v for k, v in params.items() if k in FORWARDED_PARAMS})
+        request = urllib.request.Request(
+            f"{self.url}/generate",
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"daemon error {e.code}: {e.read()[:200].decode('utf-8', 'replace')}") from None
+
+        images = [Image.open(io.BytesIO(base64.b64decode(data))) for data in body['images']]
+        return SimpleNamespace(images=images)
+
+
+def seed_params(pipe, seed):
+    """pipe() arguments that fix the seed, for a local pipeline or a RemotePipeline"""
+    if isinstance(pipe, RemotePipeline):
+        return {'seed': seed}
+    import torch
+
+    return {'generator': torch.Generator('cpu').manual_seed(int(seed))}
+
+
+def connect(profile='default', url=DAEMON_URL, use_daemon=True):
+    """A RemotePipeline if a daemon is running, else None (caller loads locally)"""
+    if use_daemon and daemon_available(url):
+        print(f"🔌 Using resident pipeline at {url} ({profile} profile)\n")
+        return RemotePipeline(url, profile)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+class PipelineHost:
+    """Keeps one warmed pipeline per profile and serialises access to them"""
+
+    def __init__(self, model_id, device=None, compile_unet=False):
+        self.model_id = model_id
+        self.device = device
+        self.compile_unet = compile_unet
+        self.pipes = {}
+        self.embeddings = {}
+        self.lock = threading.Lock()
+        self.served = 0
+
+    def get(self, profile):
+        from prompt_embeds import PromptEmbeddingCache
+        from sd_pipeline import load_pipeline
+
+        if profile not in self.pipes:
+            print(f"📦 Loading {self.model_id} ({profile} profile)...")
+            started = time.perf_counter()
+            self.pipes[profile] = load_pipeline(self.model_id, self.device, profile, self.compile_unet)
+            # Clients send text; the daemon keeps the embeddings so repeats skip the text encoder
+            self.embeddings[profile] = PromptEmbeddingCache(self.pipes[profile], self.model_id)
+            print(f"   ✓ Ready in {time.perf_counter() - started:.1f}s")
+        return self.pipes[profile]
+
+    def generate(self, job):
+        import torch
+
+        params = {k: job[k] for k in FORWARDED_PARAMS if k in job and k != 'seed'}
+        with self.lock:
+            profile = job.get('profile', 'default')
+            pipe = self.get(profile)
+            if job.get('seed') is not None:
+                params['generator'] = torch.Generator('cpu').manual_seed(int(job['seed']))
+            images = pipe(**self.embeddings[profile].prompt_args(job['prompt']), **params).images
+            self.served += len(images)
+
+        encoded = []
+        for image in images:
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')  # Lossless: the client picks the final format
+            encoded.append(base64.b64encode(buffer.getvalue()).decode('ascii'))
+        return encoded
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_error(404)
+            return
+        host = self.server.host
+        self.send_json(200, {'model': host.model_id, 'profiles': sorted(host.pipes), 'served': host.served})
+
+    def do_POST(self):
+        if self.path != '/generate':
+            self.send_error(404)
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            started = time.perf_counter()
+            images = self.server.host.generate(job)
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        elapsed = time.perf_counter() - started
+        label = job['prompt'] if isinstance(job['prompt'], str) else f"batch of {len(job['prompt'])}"
+        print(f"   ✓ {label[:60]} ({elapsed:.1f}s)")
+        self.send_json(200, {'images': images, 'seconds': elapsed})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    from sd_pipeline import MODEL_ID, PROFILES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=urllib.parse.urlsplit(DAEMON_URL).port or DEFAULT_PORT)
+    parser.add_argument('--model', default=MODEL_ID)
+    parser.add_argument('--device', default=None, help='cuda or cpu (default: cuda if available)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                        help='profile(s) to load up front with --preload (default: default)')
+    parser.add_argument('--preload', action='store_true', help='load and warm the pipeline before accepting jobs')
+    parser.add_argument('--compile', action='store_true', help='torch.compile the UNet')
+    args = parser.parse_args()
+
+    host = PipelineHost(args.model, args.device, args.compile)
+    if args.preload:
+        for profile in args.profile or ['default']:
+            # One tiny generation warms kernels and allocators before real jobs arrive
+            host.generate({'prompt': 'warm-up', 'profile': profile, 'height': 64, 'width': 64, 'num_inference_steps': 2})
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), DaemonHandler)
+    server.daemon_threads = True
+    server.host = host
+    print(f"\n🍔 Stable Diffusion daemon listening on http://127.0.0.1:{args.port}")
+    print("   Generators will use it automatically (pass --no-daemon to opt out)\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Daemon stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Int8 mode for CPU generation: dynamically quantized UNet and text encoder
+Every nn.Linear (the UNet's attention projections and feed-forwards, all of the
+CLIP text encoder) gets int8 weights and int8 matmuls with activations quantized
+on the fly; convolutions stay fp32. Quantized modules are cached under
+.cache/quantized, so later runs reload them instead of quantizing again
+
+The gate generates a fixed-seed reference set per menu category in fp32 and in
+int8 and reports PSNR/SSIM against fp32 alongside the speedup. --int8 then uses
+int8 for the categories that passed the last gate, or those given with
+--int8-categories; without a gate report everything stays fp32. int8 images
+have their own cache keys
+
+Usage:
+    python3 scripts/sd_int8.py --gate                     # writes .cache/quantized/gate.json
+    python3 scripts/sd_int8.py --gate --per-category 1 --steps 10 --size 512x384
+    python3 scripts/sd_int8.py                            # last gate report
+    python3 scripts/generate_hf_images.py --int8
+    python3 scripts/generate_hf_images.py --int8 --int8-categories burgers,sides
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+
+from gen_cache import atomic_write
+from sd_pipeline import MODEL_ID, PROFILES
+
+QUANTIZED_DIR = os.path.join(os.path.dirname(__file__), '../.cache/quantized')
+GATE_REPORT = os.path.join(QUANTIZED_DIR, 'gate.json')
+
+# Tag in the cache keys (and embedding model ids) of everything made in int8
+QUANTIZATION = 'int8'
+QUANTIZED_MODULES = ('unet', 'text_encoder')
+CATEGORIES = ('burgers', 'sides', 'drinks')
+
+# A category passes the gate when int8 is faster and its images stay this close to fp32
+DEFAULT_MIN_SSIM = 0.85
+DEFAULT_PER_CATEGORY = 2
+
+
+def int8_model_id(model_id):
+    """Model id for caches keyed by model (prompt embeddings): the int8 text encoder's output differs"""
+    return f'{model_id}+{QUANTIZATION}'
+
+
+def quantized_path(model_id, name):
+    import torch
+
+    # Pickled packed weights are only guaranteed to load in the torch that wrote them
+    digest = hashlib.sha256(f'{model_id}|{name}|{QUANTIZATION}|{torch.__version__}'.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(QUANTIZED_DIR, f'{name}-{digest}.pt')
+
+
+def quantize_module(module):
+    """An int8 copy of module: dynamically quantized nn.Linear layers, everything else as is"""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_int8_modules(pipe, model_id=MODEL_ID):
+    """{name: int8 module} for pipe's UNet and text encoder, from .cache/quantized or quantized now"""
+    import torch
+
+    modules = {}
+    for name in QUANTIZED_MODULES:
+        path = quantized_path(model_id, name)
+        if os.path.exists(path):
+            # Our own cache; quantized modules are pickled whole, so weights_only=False
+            modules[name] = torch.load(path, weights_only=False)
+            if name == 'unet':
+                # The pickle carries the attention setup of whichever pipeline quantized it
+                modules[name].set_attn_processor(dict(pipe.unet.attn_processors))
+            continue
+        print(f"🔢 Quantizing the {name} to int8...")
+        modules[name] = quantize_module(getattr(pipe, name))
+        os.makedirs(QUANTIZED_DIR, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        torch.save(modules[name], tmp)
+        os.replace(tmp, path)
+    return modules
+
+
+class Int8Modules:
+    """
+    Switches a CPU pipeline between its fp32 and int8 UNet/text encoder
+    keep_fp32=False drops the fp32 modules for runs that only need int8
+    """
+
+    def __init__(self, pipe, model_id=MODEL_ID, keep_fp32=True):
+        self.pipe = pipe
+        self.int8 = load_int8_modules(pipe, model_id)
+        self.fp32 = {name: getattr(pipe, name) for name in QUANTIZED_MODULES} if keep_fp32 else None
+        if not keep_fp32:
+            self.use(True)
+
+    def use(self, int8):
+        modules = self.int8 if int8 else self.fp32
+        if modules is None:
+            raise RuntimeError('the fp32 modules were released (keep_fp32=False)')
+        for name, module in modules.items():
+            setattr(self.pipe, name, module)
+
+
+def mark_int8(jobs, categories):
+    """Tag the jobs of the int8 categories; returns them (their cache keys need recomputing)"""
+    marked = [job for job in jobs if job.get('category') in categories]
+    for job in marked:
+        job['quantization'] = QUANTIZATION
+    return marked
+
+
+def by_mode(jobs):
+    """[(int8, jobs)] with the fp32 jobs first, leaving out an empty group"""
+    groups = [(False, [job for job in jobs if not job.get('quantization')]),
+              (True, [job for job in jobs if job.get('quantization')])]
+    return [(int8, group) for int8, group in groups if group]
+
+
+def _luma(image):
+    import numpy as np
+
+    return np.asarray(image.convert('L'), dtype=np.float64)
+
+
+def _gaussian_blur(x, sigma=1.5, radius=5):
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    taps = np.arange(-radius, radius + 1)
+    kernel = np.exp(-taps ** 2 / (2 * sigma ** 2))
+    kernel /= kernel.sum()
+    # Separable: along rows, then along columns ('valid' region only)
+    x = sliding_window_view(x, kernel.size, axis=1) @ kernel
+    return sliding_window_view(x, kernel.size, axis=0) @ kernel
+
+
+def ssim(a, b):
+    """Mean SSIM of two same-size PIL images on luma (11x11 Gaussian window, sigma 1.5)"""
+    a, b = _luma(a), _luma(b)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_a, mu_b = _gaussian_blur(a), _gaussian_blur(b)
+    var_a = _gaussian_blur(a * a) - mu_a ** 2
+    var_b = _gaussian_blur(b * b) - mu_b ** 2
+    covariance = _gaussian_blur(a * b) - mu_a * mu_b
+    index = ((2 * mu_a * mu_b + c1) * (2 * covariance + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(index.mean())
+
+
+def psnr(a, b):
+    """PSNR in dB of two same-size PIL images over RGB; inf when identical"""
+    import numpy as np
+
+    mse = float(np.mean((np.asarray(a.convert('RGB'), dtype=np.float64) - np.asarray(b.convert('RGB'), dtype=np.float64)) ** 2))
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def gate_jobs(per_category=DEFAULT_PER_CATEGORY):
+    """The first few of generate_hf_images.py's images in each category"""
+    from generate_hf_images import build_jobs
+
+    picked = {}
+    for job in build_jobs():
+        group = picked.setdefault(job['category'], [])
+        if len(group) < per_category:
+            group.append(job)
+    return [job for category in CATEGORIES for job in picked.get(category, [])]
+
+
+def png_bytes(image):
+    import io
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _render(pipe, jobs, params, size):
+    """[(image, seconds)] for each job at its fixed seed"""
+    import torch
+    from derive_views import view_seed
+
+    results = []
+    for job in jobs:
+        width, height = size or (job['width'], job['height'])
+        started = time.perf_counter()
+        image = pipe(job['prompt'], width=width, height=height, generator=torch.Generator('cpu').manual_seed(view_seed(job['prompt'])),
+                     **params).images[0]
+        results.append((image, time.perf_counter() - started))
+    return results
+
+
+def run_gate(model_id=MODEL_ID, profile='default', per_category=DEFAULT_PER_CATEGORY, steps=None, size=None,
+             min_ssim=DEFAULT_MIN_SSIM, report_path=GATE_REPORT):
+    """Generate the reference set in fp32 and int8, compare, print and save the per-category verdicts"""
+    from sd_pipeline import load_pipeline
+
+    jobs = gate_jobs(per_category)
+    params = {'num_inference_steps': steps or PROFILES[profile]['num_inference_steps']}
+    pipe = load_pipeline(model_id, device='cpu', profile=profile)
+    pipe.set_progress_bar_config(disable=True)
+    switch = Int8Modules(pipe, model_id)
+    samples_dir = os.path.join(os.path.dirname(report_path), 'gate')
+
+    rendered = {}
+    for int8 in (False, True):
+        switch.use(int8)
+        print(f"🖼️  {len(jobs)} reference images in {'int8' if int8 else 'fp32'}...")
+        # Warm-up so kernel selection doesn't count against either mode
+        pipe(jobs[0]['prompt'], width=64, height=64, num_inference_steps=1)
+        rendered[int8] = _render(pipe, jobs, params, size)
+
+    categories = {}
+    for job, (reference, fp32_seconds), (image, int8_seconds) in zip(jobs, rendered[False], rendered[True]):
+        stem = os.path.splitext(os.path.basename(job['path']))[0]
+        for mode, picture in (('fp32', reference), ('int8', image)):
+            atomic_write(os.path.join(samples_dir, f'{stem}-{mode}.png'), png_bytes(picture))
+        entry = categories.setdefault(job['category'], {'psnr': [], 'ssim': [], 'fp32_seconds': 0.0, 'int8_seconds': 0.0})
+        entry['psnr'].append(psnr(reference, image))
+        entry['ssim'].append(ssim(reference, image))
+        entry['fp32_seconds'] += fp32_seconds
+        entry['int8_seconds'] += int8_seconds
+
+    results = {}
+    for category, entry in categories.items():
+        speedup = entry['fp32_seconds'] / entry['int8_seconds']
+        worst_ssim = min(entry['ssim'])
+        results[category] = {
+            'images': len(entry['ssim']),
+            'psnr': min(entry['psnr']),
+            'ssim': worst_ssim,
+            'fp32_seconds': entry['fp32_seconds'] / len(entry['ssim']),
+            'int8_seconds': entry['int8_seconds'] / len(entry['ssim']),
+            'speedup': speedup,
+            'passed': worst_ssim >= min_ssim and speedup > 1.0,
+        }
+    report = {'model': model_id, 'profile': profile, 'steps': params['num_inference_steps'],
+              'size': list(size) if size else None, 'min_ssim': min_ssim, 'categories': results}
+    # Python's json writes an identical image's infinite PSNR as Infinity and reads it back
+    atomic_write(report_path, (json.dumps(report, indent=1, sort_keys=True) + '\n').encode('utf-8'))
+    print_report(report)
+    print(f"   Image pairs: {os.path.relpath(samples_dir)}\n")
+    return report
+
+
+def print_report(report):
+    print(f"\n🔢 int8 vs fp32, {report['model']} ({report['profile']} profile, {report['steps']} steps, "
+          f"SSIM >= {report['min_ssim']:g} to pass; worst image per category)\n")
+    print(f"{'category':<10} {'images':>6} {'PSNR':>8} {'SSIM':>6} {'fp32':>8} {'int8':>8} {'speedup':>8}")
+    for category in CATEGORIES:
+        if category not in report['categories']:
+            continue
+        result = report['categories'][category]
+        print(f"{category:<10} {result['images']:>6} {result['psnr']:>6.1f}dB {result['ssim']:>6.3f} "
+              f"{result['fp32_seconds']:>7.1f}s {result['int8_seconds']:>7.1f}s {result['speedup']:>7.2f}x  "
+              f"{'✅ use int8' if result['passed'] else '✗ keep fp32'}")
+    print()
+
+
+def load_report(path=GATE_REPORT):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def gated_categories(model_id=MODEL_ID, path=GATE_REPORT):
+    """Categories that passed the last gate for model_id, or None when it has not been gated"""
+    report = load_report(path)
+    if report is None or report.get('model') != model_id:
+        return None
+    return {category for category, result in report['categories'].items() if result['passed']}
+
+
+def add_int8_args(parser):
+    """Command-line flags for the local generators"""
+    parser.add_argument('--int8', action='store_true',
+                        help='CPU only: int8 UNet and text encoder for the categories that passed sd_int8.py --gate')
+    parser.add_argument('--int8-categories', default=None,
+                        help=f"comma-separated categories to make in int8, overriding the gate ({','.join(CATEGORIES)})")
+
+
+def int8_categories_from_args(args, model_id=MODEL_ID):
+    """The set of categories to generate in int8 (empty without --int8, on a GPU, or with no gate report)"""
+    if not args.int8:
+        return set()
+    import torch
+
+    if torch.cuda.is_available():
+        print("⚠ --int8 is for CPU generation; using the GPU in fp16 instead\n")
+        return set()
+    if args.int8_categories:
+        categories = {category.strip() for category in args.int8_categories.split(',') if category.strip()}
+    else:
+        categories = gated_categories(model_id)
+        if categories is None:
+            # Nothing has passed a gate yet; only --int8-categories overrides it
+            print("⚠ No int8 gate report for this model; staying in fp32. "
+                  "Run python3 scripts/sd_int8.py --gate first\n")
+            return set()
+    print(f"🔢 int8: {', '.join(sorted(categories)) or 'no categories (none passed the gate)'}\n")
+    return categories
+
+
+def _size(text):
+    width, _, height = text.partition('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gate', action='store_true', help='run the quality gate (otherwise print the last report)')
+    parser.add_argument('--model', default=MODEL_ID)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default')
+    parser.add_argument('--per-category', type=int, default=DEFAULT_PER_CATEGORY,
+                        help=f'reference images per category (default: {DEFAULT_PER_CATEGORY})')
+    parser.add_argument('--steps', type=int, default=None, help="denoising steps (default: the profile's)")
+    parser.add_argument('--size', type=_size, default=None, help="WxH for every image (default: each job's own size)")
+    parser.add_argument('--min-ssim', type=float, default=DEFAULT_MIN_SSIM,
+                        help=f'worst-image SSIM a category needs to pass (default: {DEFAULT_MIN_SSIM})')
+    args = parser.parse_args()
+
+    if args.gate:
+        run_gate(args.model, args.profile, args.per_category, args.steps, args.size, args.min_ssim)
+        return
+    report = load_report()
+    if report is None:
+        print("\nNo gate report yet: python3 scripts/sd_int8.py --gate\n")
+        return
+    print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Shared Stable Diffusion pipeline loading for the local generators
+Speed profiles bundle the scheduler, step count and CPU tuning that go together
+"""
+
+import os
+import time
+
+# torch/diffusers are imported lazily: callers that only need MODEL_ID or
+# PROFILES (job planning, cache keys) must not pay several seconds for them
+
+MODEL_ID = "runwayml/stable-diffusion-v1-5"
+
+# num_inference_steps is part of the profile because a few-step solver only
+# pays off when the step count drops with it
+PROFILES = {
+    'default': {
+        'description': 'Stock scheduler, 15 steps, attention slicing',
+        'scheduler': None,
+        'num_inference_steps': 15,
+        'attention_slicing': True,
+        'cpu_tuning': False,
+    },
+    'cpu-fast': {
+        'description': 'DPM-Solver++ (Karras sigmas), 8 steps, all cores, channels_last',
+        'scheduler': 'dpmsolver++',
+        'num_inference_steps': 8,
+        'attention_slicing': False,  # Slicing saves memory but costs CPU time
+        'cpu_tuning': True,
+    },
+}
+
+
+def default_device():
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def available_cores():
+    """Cores this process may run on (respects taskset/cgroup affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def tune_cpu_threads(threads=None):
+    """Size torch's intra-op pool to the cores we actually have"""
+    import torch
+
+    threads = threads or available_cores()
+    torch.set_num_threads(threads)
+    try:
+        # Parallelism comes from inside each op; extra inter-op threads just contend
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any parallel work has run
+        pass
+    return threads
+
+
+def use_profile_scheduler(pipe, profile):
+    """Swap in the profile's scheduler; profiles without one keep the model's"""
+    from diffusers import DPMSolverMultistepScheduler
+
+    if PROFILES[profile]['scheduler'] == 'dpmsolver++':
+        pipe.scheduler = DPMSolverMultistepScheduler.from_config(
+            pipe.scheduler.config,
+            algorithm_type="dpmsolver++",
+            use_karras_sigmas=True,
+        )
+
+
+def load_pipeline(model_id=MODEL_ID, device=None, profile='default', compile_unet=False):
+    """Load StableDiffusionPipeline configured for a speed profile"""
+    import torch
+    from diffusers import StableDiffusionPipeline
+
+    settings = PROFILES[profile]
+    device = device or default_device()
+
+    if device == "cpu" and settings['cpu_tuning']:
+        tune_cpu_threads()
+
+    pipe = StableDiffusionPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        safety_checker=None,  # Disable safety checker for food images
+    )
+
+    use_profile_scheduler(pipe, profile)
+    pipe = pipe.to(device)
+
+    if settings['attention_slicing']:
+        pipe.enable_attention_slicing()
+
+    if settings['cpu_tuning']:
+        # NHWC layout lets oneDNN pick its fastest convolution kernels
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+
+    if compile_unet:
+        pipe.unet = torch.compile(pipe.unet)
+
+    return pipe
+
+
+def seconds_per_image(pipe, prompts, **params):
+    """Average wall time of one pipe() call per prompt, after a warm-up call"""
+    # Warm-up absorbs torch.compile and oneDNN kernel selection
+    pipe(prompts[0], **dict(params, num_inference_steps=2))
+    started = time.perf_counter()
+    for prompt in prompts:
+        pipe(prompt, **params)
+    return (time.perf_counter() - started) / len(prompts)
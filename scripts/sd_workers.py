@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Multi-process Stable Diffusion on many-core CPU hosts
+One pipeline's intra-op threading stops scaling long before a big host runs out
+of cores, so this runs N pipeline processes instead, each pinned to its own
+slice of the cores with a matching torch/OpenMP thread count
+
+Jobs go to one queue per worker; a worker whose queue is empty steals from the
+others. The pipeline's modules are exported once to .cache/shared-weights and
+every worker maps that file (torch.load mmap=True), so the weights sit in the
+page cache once rather than once per worker
+
+Usage:
+    python3 scripts/generate_hf_images.py --workers 4
+    python3 scripts/sd_workers.py --benchmark                   # images/minute at 1, 2, 4 and 8 workers
+    python3 scripts/sd_workers.py --benchmark --counts 1 2 --images 8 --steps 4
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import queue
+import time
+
+from sd_pipeline import MODEL_ID, PROFILES, available_cores
+
+SHARED_WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), '../.cache/shared-weights')
+
+# Pipeline components that get exported; the safety checker is never loaded
+COMPONENTS = ('vae', 'text_encoder', 'tokenizer', 'unet', 'scheduler')
+
+BENCHMARK_COUNTS = (1, 2, 4, 8)
+BENCHMARK_PROMPT = 'cheeseburger {}, professional food photography, studio lighting'
+
+POLL_SECONDS = 0.1  # How long an idle worker waits on its own queue before trying to steal
+
+
+def partition_cores(cores, workers):
+    """
+    Split the cores into `workers` contiguous slices, so a worker's threads share caches
+    With more workers than cores, workers share single cores round-robin
+    """
+    cores = sorted(cores)
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    slices, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cores[start:end])
+        start = end
+    return slices
+
+
+def shared_weights_path(model_id=MODEL_ID, profile='default'):
+    digest = hashlib.sha256(f'{model_id}|{profile}|float32'.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(SHARED_WEIGHTS_DIR, f'{profile}-{digest}.pt')
+
+
+def export_shared_weights(model_id=MODEL_ID, profile='default'):
+    """
+    Write the profile's CPU pipeline modules to one file workers can mmap; returns its path
+    The modules are pickled after sd_pipeline.load_pipeline() has configured them
+    (scheduler, attention slicing, channels_last), so loading them changes nothing
+    and the mapped pages are never copied
+    """
+    import gc
+
+    import torch
+    from sd_pipeline import load_pipeline
+
+    path = shared_weights_path(model_id, profile)
+    if os.path.exists(path):
+        return path
+    print(f"📦 Exporting {model_id} ({profile}) for the workers to share...")
+    pipe = load_pipeline(model_id, device='cpu', profile=profile)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    torch.save({name: getattr(pipe, name) for name in COMPONENTS}, tmp)
+    os.replace(tmp, path)
+    del pipe
+    gc.collect()
+    print(f"   {os.path.getsize(path) / 1e9:.2f}GB -> {os.path.relpath(path)}")
+    return path
+
+
+def load_shared_pipeline(path):
+    """A StableDiffusionPipeline whose weights are views of the mmapped export"""
+    import torch
+    from diffusers import StableDiffusionPipeline
+
+    # Our own export; the pickled modules need weights_only=False
+    components = torch.load(path, mmap=True, weights_only=False)
+    pipe = StableDiffusionPipeline(**components, safety_checker=None, feature_extractor=None,
+                                   requires_safety_checker=False)
+    pipe.set_progress_bar_config(disable=True)
+    return pipe
+
+
+def memory_mb(pid):
+    """(rss, pss) of a process in MB; PSS splits shared pages between the processes mapping them"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in ('Rss', 'Pss'):
+                    values[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get('Rss', 0.0), values.get('Pss', 0.0)
+
+
+def _next_message(index, queues):
+    """(message, stolen) from this worker's own queue, else from another's; None when all are empty"""
+    try:
+        return queues[index].get(timeout=POLL_SECONDS), False
+    except queue.Empty:
+        pass
+    # Start with the next worker so thieves spread over the victims
+    for other in itertools.islice(itertools.cycle(range(len(queues))), index + 1, index + len(queues)):
+        try:
+            return queues[other].get_nowait(), True
+        except queue.Empty:
+            continue
+    return None
+
+
+def worker_main(index, cores, config, queues, results, closing):
+    """Body of one worker process: pin, load, then generate until closed"""
+    # Before torch is imported, so OpenMP sizes its pool for this slice
+    os.sched_setaffinity(0, cores)
+    os.environ['OMP_NUM_THREADS'] = os.environ['MKL_NUM_THREADS'] = str(len(cores))
+
+    from prompt_embeds import PromptEmbeddingCache, prompt_args
+    from sd_daemon import seed_params
+    from sd_pipeline import tune_cpu_threads
+    from telemetry import JobTrace, timed_pipe
+
+    started = time.perf_counter()
+    try:
+        threads = tune_cpu_threads(len(cores))
+        pipe = load_shared_pipeline(config['weights'])
+        embeddings = PromptEmbeddingCache(pipe, config['model_id']) if config['embed_cache'] else None
+        if config.get('warmup'):
+            # oneDNN picks kernels on the first call at a shape; keep that out of the timings
+            pipe(BENCHMARK_PROMPT.format('warm-up'), **config['warmup'])
+    except Exception as e:
+        results.put({'ready': index, 'error': f'{type(e).__name__}: {e}'})
+        return
+    results.put({'ready': index, 'seconds': time.perf_counter() - started, 'threads': threads, 'cores': cores,
+                 'pid': os.getpid()})
+
+    while True:
+        taken = _next_message(index, queues)
+        if taken is None:
+            if closing.is_set():
+                return
+            continue
+        message, stolen = taken
+        trace = JobTrace(message['id'], 'diffusers-pool')
+        trace.add('queue', max(0.0, time.time() - message['submitted']))
+        result = {'id': message['id'], 'worker': index, 'stolen': stolen, 'image': None, 'error': None}
+        try:
+            params = dict(message['params'])
+            if message['seed'] is not None:
+                params.update(seed_params(pipe, message['seed']))
+            result['image'] = timed_pipe(pipe, [trace], **prompt_args(embeddings, message['prompt']), **params).images[0]
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+        result['stages'] = trace.stages
+        results.put(result)
+
+
+class WorkerPool:
+    """
+    N pinned pipeline processes sharing mmapped weights
+    submit() returns an id; results() yields each finished job as a dict with
+    'id', 'tag' (whatever was passed to submit), 'image' (PIL) or 'error',
+    'stages', 'worker' and 'stolen'
+    """
+
+    def __init__(self, workers, model_id=MODEL_ID, profile='default', embed_cache=True, warmup=None):
+        self.workers = workers
+        self.model_id = model_id
+        self.profile = profile
+        self.embed_cache = embed_cache
+        self.warmup = warmup
+        self.processes = []
+        self.ready = []
+        self.tags = {}
+        self.ids = itertools.count()
+        self.next_queue = itertools.cycle(range(workers))
+        self.done = {'jobs': [0] * workers, 'stolen': [0] * workers}
+
+    def start(self):
+        """Export the weights if needed and start the workers; returns the slowest worker's load time"""
+        # spawn, not fork: a forked child inherits torch's OpenMP pool in an unusable state
+        import multiprocessing
+
+        weights = export_shared_weights(self.model_id, self.profile)
+        context = multiprocessing.get_context('spawn')
+        self.queues = [context.Queue() for _ in range(self.workers)]
+        self.results_queue = context.Queue()
+        self.closing = context.Event()
+        config = {'weights': weights, 'model_id': self.model_id, 'embed_cache': self.embed_cache, 'warmup': self.warmup}
+        for index, cores in enumerate(partition_cores(os.sched_getaffinity(0), self.workers)):
+            process = context.Process(target=worker_main, name=f'sd-worker-{index}', daemon=True,
+                                      args=(index, cores, config, self.queues, self.results_queue, self.closing))
+            process.start()
+            self.processes.append(process)
+
+        while len(self.ready) < self.workers:
+            message = self._get()
+            if message.get('error'):
+                self.close()
+                raise RuntimeError(f"worker {message['ready']} failed to load: {message['error']}")
+            self.ready.append(message)
+        self.ready.sort(key=lambda message: message['ready'])
+        return max(message['seconds'] for message in self.ready)
+
+    def submit(self, prompt, params, seed=None, tag=None):
+        job_id = next(self.ids)
+        self.tags[job_id] = tag
+        message = {'id': job_id, 'prompt': prompt, 'params': params, 'seed': seed, 'submitted': time.time()}
+        self.queues[next(self.next_queue)].put(message)
+        return job_id
+
+    def _get(self):
+        while True:
+            try:
+                return self.results_queue.get(timeout=1)
+            except queue.Empty:
+                dead = [p for p in self.processes if p.exitcode not in (None, 0)]
+                if dead:
+                    self.close()
+                    raise RuntimeError(f"{dead[0].name} exited with code {dead[0].exitcode}") from None
+
+    def results(self):
+        """Finished jobs in completion order, until nothing is outstanding (submit() may be called meanwhile)"""
+        while self.tags:
+            result = self._get()
+            result['tag'] = self.tags.pop(result['id'])
+            self.done['jobs'][result['worker']] += 1
+            self.done['stolen'][result['worker']] += result['stolen']
+            yield result
+
+    def memory(self):
+        """(total RSS, total PSS) of the workers in MB"""
+        usage = [memory_mb(p.pid) for p in self.processes if p.is_alive()]
+        return sum(rss for rss, _ in usage), sum(pss for _, pss in usage)
+
+    def summary(self):
+        lines = []
+        for message, jobs, stolen in zip(self.ready, self.done['jobs'], self.done['stolen']):
+            cores = message['cores']
+            span = f"{cores[0]}-{cores[-1]}" if len(cores) > 1 else f"{cores[0]}"
+            lines.append(f"   worker {message['ready']}: cores {span} ({message['threads']} threads), "
+                         f"{jobs} images, {stolen} stolen")
+        return '\n'.join(lines)
+
+    def close(self):
+        if not self.processes:
+            return
+        self.closing.set()
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+
+def scaling_benchmark(counts, images, model_id, profile, steps, height, width):
+    """images/minute at each worker count, with the workers' memory once loaded"""
+    params = {'height': height, 'width': width, 'num_inference_steps': steps}
+    rows = []
+    for workers in counts:
+        print(f"⏱  {workers} worker{'s' if workers > 1 else ''}: {images} images at {width}x{height}, {steps} steps")
+        pool = WorkerPool(workers, model_id, profile, embed_cache=False, warmup=dict(params, num_inference_steps=1))
+        try:
+            load = pool.start()
+            rss, pss = pool.memory()
+            started = time.perf_counter()
+            for i in range(images):
+                pool.submit(BENCHMARK_PROMPT.format(i), params)
+            failed = sum(1 for result in pool.results() if result['error'])
+            elapsed = time.perf_counter() - started
+        finally:
+            pool.close()
+        if failed:
+            raise SystemExit(f"✗ {failed} benchmark images failed")
+        rows.append((workers, images / elapsed * 60, load, rss, pss))
+        print(f"   {rows[-1][1]:.1f} images/min (load {load:.1f}s, RSS {rss:.0f}MB, PSS {pss:.0f}MB)\n")
+
+    base = rows[0][1] / rows[0][0]
+    print("=" * 72)
+    print(f"{'workers':>8} {'img/min':>9} {'speedup':>8} {'efficiency':>11} {'RSS MB':>9} {'PSS MB':>9}")
+    for workers, rate, _, rss, pss in rows:
+        print(f"{workers:>8} {rate:>9.1f} {rate / rows[0][1]:>7.2f}x {100 * rate / (base * workers):>10.0f}% "
+              f"{rss:>9.0f} {pss:>9.0f}")
+    print("=" * 72)
+    print(f"{available_cores()} cores available; PSS counts each shared weight page once across the workers\n")
+
+
+def add_worker_args(parser):
+    """Command-line flags for generators that can run a WorkerPool"""
+    parser.add_argument('--workers', type=int, default=1,
+                        help='pipeline processes, each pinned to its share of the CPU cores (default: 1, in-process)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='store_true', help='measure images/minute at each worker count')
+    parser.add_argument('--counts', type=int, nargs='+', default=list(BENCHMARK_COUNTS),
+                        help='worker counts to benchmark (default: 1 2 4 8)')
+    parser.add_argument('--images', type=int, default=16, help='images per worker count (default: 16)')
+    parser.add_argument('--model', default=MODEL_ID, help=f'model id or local path (default: {MODEL_ID})')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='cpu-fast', help='speed profile (default: cpu-fast)')
+    parser.add_argument('--steps', type=int, default=None, help="steps per image (default: the profile's)")
+    parser.add_argument('--size', type=int, nargs=2, default=(512, 512), metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        cores = os.sched_getaffinity(0)
+        print(f"\n🧮 {len(cores)} cores available")
+        for workers in BENCHMARK_COUNTS:
+            slices = partition_cores(cores, workers)
+            print(f"   {workers} workers: {', '.join(str(len(s)) for s in slices)} threads each")
+        print()
+        return
+    steps = args.steps or PROFILES[args.profile]['num_inference_steps']
+    scaling_benchmark(args.counts, args.images, args.model, args.profile, steps, args.size[1], args.size[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Structured per-job telemetry for the image generators
+Every finished job appends one JSON line to .cache/metrics/jobs.jsonl with its
+stage timings, bytes, retries and backend; --prometheus-textfile also writes the
+run's totals in node_exporter textfile format for the dashboards
+
+Stages (seconds, summed over a job's attempts and re-rolls):
+    queue      waiting for a worker or the rate limiter
+    backoff    parked between retries
+    load       model load (a run-level "load" event, not per job)
+    request    request sent until response headers: network plus remote generation
+    download   response body streamed to disk
+    denoise    local UNet steps; decode is the VAE decode and postprocessing after them
+    inference  a pipe() call that can't be split (e.g. through sd_daemon.py)
+    save       encoding and writing the image
+Batched pipe() time is shared equally between the images in the batch
+
+Usage:
+    python3 scripts/telemetry.py                 # stage summary of each script's last run
+    python3 scripts/telemetry.py --all
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from gen_cache import atomic_write
+
+METRICS_LOG = os.environ.get('GEN_METRICS_LOG', os.path.join(os.path.dirname(__file__), '../.cache/metrics/jobs.jsonl'))
+
+# Upper bounds (seconds) of the job duration histogram in the Prometheus export
+JOB_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+
+class JobTrace:
+    """Stage timings and counters for one job; lives on the job dict across retries"""
+
+    def __init__(self, label, backend):
+        self.label = label
+        self.backend = backend
+        self.stages = {}
+        self.counters = {}
+        self.bytes = 0
+        self.peak_rss_mb = None
+        self.error = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_bytes(self, n):
+        self.bytes += n or 0
+
+
+@contextmanager
+def timed(trace, stage):
+    """Add the time spent in the block to trace's stage (no-op when trace is None)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add(stage, time.perf_counter() - started)
+
+
+def _proc_status(field):
+    """A memory field from /proc/self/status in bytes, or None off Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Start a fresh high-water mark (Linux); returns the current RSS to measure from"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    current = _proc_status('VmRSS')
+    return current if current is not None else peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """This process's peak RSS since start or the last reset_peak_rss()"""
+    peak = _proc_status('VmHWM')
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+def _takes_step_callback(pipe):
+    import inspect
+
+    try:
+        return 'callback_on_step_end' in inspect.signature(pipe.__call__).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def timed_pipe(pipe, traces, prompt=None, **params):
+    """
+    pipe(prompt, **params) with its wall time shared across traces (one per image)
+    prompt may be None when params carry prompt_embeds (see prompt_embeds.py)
+    Pipelines that accept callback_on_step_end get denoise and decode recorded
+    separately, timed from the last step's callback; others record inference
+    """
+    last_step = []
+    if _takes_step_callback(pipe):
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            last_step[:] = [time.perf_counter()]
+            return callback_kwargs
+        params['callback_on_step_end'] = on_step_end
+
+    started = time.perf_counter()
+    try:
+        return pipe(prompt, **params)
+    finally:
+        ended = time.perf_counter()
+        share = 1 / max(1, len(traces))
+        for trace in traces:
+            if trace is None:
+                continue
+            if last_step:
+                trace.add('denoise', (last_step[0] - started) * share)
+                trace.add('decode', (ended - last_step[0]) * share)
+            else:
+                trace.add('inference', (ended - started) * share)
+
+
+class Telemetry:
+    """
+    Writes job events for one generator run and keeps the totals for the Prometheus export
+    log_path=None keeps everything in memory (the textfile still works)
+    """
+
+    def __init__(self, script, backend, log_path=METRICS_LOG, textfile=None):
+        self.script = script
+        self.backend = backend
+        self.log_path = log_path
+        self.textfile = textfile
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_started = time.monotonic()
+        self.lock = threading.Lock()
+        self.jobs = []
+        self.loads = []
+
+    def start(self):
+        """Restart the run clock (queue time is measured from here)"""
+        self.run_started = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.run_started
+
+    def trace(self, job):
+        """The job's trace, created on first use"""
+        if 'trace' not in job:
+            job['trace'] = JobTrace(job.get('label') or os.path.basename(job.get('path', '')), self.backend)
+        return job['trace']
+
+    def write(self, event):
+        if not self.log_path:
+            return
+        line = json.dumps(dict(event, ts=round(time.time(), 3), run=self.run_id, script=self.script)) + '\n'
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(line)
+
+    def record(self, job, ok, attempts=1, seconds=None):
+        """Log a finished job; seconds defaults to the sum of its stages"""
+        trace = self.trace(job)
+        if seconds is None:
+            seconds = sum(trace.stages.values())
+        event = {
+            'event': 'job',
+            'backend': trace.backend,
+            'job': trace.label,
+            'ok': bool(ok),
+            'seconds': round(seconds, 4),
+            'attempts': attempts,
+            'retries': attempts - 1,
+            'bytes': trace.bytes,
+            'stages': {stage: round(value, 4) for stage, value in trace.stages.items()},
+        }
+        if trace.counters:
+            event['counters'] = dict(trace.counters)
+        if trace.peak_rss_mb is not None:
+            event['peak_rss_mb'] = round(trace.peak_rss_mb, 1)
+        if trace.error and not ok:
+            event['error'] = trace.error
+        with self.lock:
+            self.jobs.append(event)
+        self.write(event)
+
+    def job_done(self, result):
+        """run_jobs(on_finish=...) hook: queue/backoff come from the scheduler"""
+        trace = self.trace(result['job'])
+        for stage in ('queue', 'backoff'):
+            if result.get(stage):
+                trace.add(stage, result[stage])
+        self.record(result['job'], result['ok'], result['attempts'], result['seconds'])
+
+    def load(self, seconds, backend=None):
+        """Log a model load"""
+        backend = backend or self.backend
+        with self.lock:
+            self.loads.append((backend, seconds))
+        self.write({'event': 'load', 'backend': backend, 'seconds': round(seconds, 4)})
+
+    def close(self):
+        """Log the run summary and write the Prometheus textfile, if one was asked for"""
+        elapsed = self.elapsed()
+        ok = sum(1 for job in self.jobs if job['ok'])
+        self.write({'event': 'run', 'backend': self.backend, 'ok': ok, 'failed': len(self.jobs) - ok,
+                    'seconds': round(elapsed, 4), 'images_per_sec': round(ok / elapsed, 4) if elapsed > 0 else 0.0})
+        if self.textfile:
+            atomic_write(self.textfile, self.prometheus(elapsed).encode('utf-8'))
+
+    def prometheus(self, elapsed):
+        """The run's totals as Prometheus text exposition (gauges describe the last run)"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in dict(script=self.script, **labels).items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value if isinstance(value, int) else round(value, 6)}")
+
+        by_backend = {}
+        for job in self.jobs:
+            by_backend.setdefault(job['backend'], []).append(job)
+
+        metric('imagegen_last_run_timestamp_seconds', 'gauge', 'When the last generator run finished',
+               [('', {}, time.time())])
+        metric('imagegen_last_run_duration_seconds', 'gauge', 'Wall time of the last generator run',
+               [('', {}, elapsed)])
+        metric('imagegen_last_run_jobs', 'gauge', 'Jobs finished in the last run, by outcome',
+               [('', {'backend': b, 'status': s}, sum(1 for j in jobs if j['ok'] == (s == 'ok')))
+                for b, jobs in by_backend.items() for s in ('ok', 'failed')])
+        metric('imagegen_last_run_retries', 'gauge', 'Retried attempts in the last run',
+               [('', {'backend': b}, sum(j['retries'] for j in jobs)) for b, jobs in by_backend.items()])
+        metric('imagegen_last_run_bytes', 'gauge', 'Image bytes written in the last run',
+               [('', {'backend': b}, sum(j['bytes'] for j in jobs)) for b, jobs in by_backend.items()])
+
+        stage_samples = []
+        for backend, jobs in by_backend.items():
+            stages = sorted({stage for job in jobs for stage in job['stages']})
+            for stage in stages:
+                values = [job['stages'][stage] for job in jobs if stage in job['stages']]
+                labels = {'backend': backend, 'stage': stage}
+                stage_samples += [('_sum', labels, sum(values)), ('_count', labels, len(values))]
+        metric('imagegen_last_run_stage_seconds', 'summary', 'Time spent per stage across the jobs of the last run',
+               stage_samples)
+
+        histogram = []
+        for backend, jobs in by_backend.items():
+            for bound in JOB_BUCKETS + ('+Inf',):
+                count = sum(1 for job in jobs if bound == '+Inf' or job['seconds'] <= bound)
+                histogram.append(('_bucket', {'backend': backend, 'le': bound}, count))
+            histogram += [('_sum', {'backend': backend}, sum(job['seconds'] for job in jobs)),
+                          ('_count', {'backend': backend}, len(jobs))]
+        metric('imagegen_last_run_job_seconds', 'histogram', 'Per-job wall time in the last run', histogram)
+
+        if self.loads:
+            metric('imagegen_last_run_model_load_seconds', 'gauge', 'Model load time in the last run',
+                   [('', {'backend': backend}, seconds) for backend, seconds in self.loads])
+        return '\n'.join(lines) + '\n'
+
+
+def add_telemetry_args(parser):
+    """Command-line flags shared by every generator"""
+    parser.add_argument('--metrics-log', default=METRICS_LOG, help='JSON-lines job log (default: .cache/metrics/jobs.jsonl)')
+    parser.add_argument('--no-metrics', action='store_true', help="don't write the job log")
+    parser.add_argument('--prometheus-textfile', default=None,
+                        help='also write run totals here for the node_exporter textfile collector (*.prom)')
+
+
+def telemetry_from_args(args, script, backend):
+    return Telemetry(script, backend, None if args.no_metrics else args.metrics_log, args.prometheus_textfile)
+
+
+def read_events(path):
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                pass  # A line cut short by a crash
+    return events
+
+
+def main():
+    from job_pool import percentile
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', default=METRICS_LOG, help='job log to read (default: .cache/metrics/jobs.jsonl)')
+    parser.add_argument('--all', action='store_true', help='summarise every run, not just the latest per script')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"✗ No job log at {os.path.relpath(args.log)} yet")
+    jobs = [e for e in read_events(args.log) if e.get('event') == 'job']
+    if not args.all:
+        latest = {}
+        for event in jobs:
+            latest[event['script']] = event['run']
+        jobs = [e for e in jobs if latest[e['script']] == e['run']]
+
+    groups = {}
+    for event in jobs:
+        groups.setdefault((event['script'], event['backend']), []).append(event)
+    for (script, backend), events in sorted(groups.items()):
+        ok = sum(1 for e in events if e['ok'])
+        print(f"\n📊 {script} [{backend}]: {ok}/{len(events)} ok, "
+              f"{sum(e['retries'] for e in events)} retries, {sum(e['bytes'] for e in events) / 1e6:.1f}MB")
+        print(f"   {'stage':<10} {'mean':>8} {'p95':>8} {'total':>9} {'share':>6}")
+        total = sum(sum(e['stages'].values()) for e in events) or 1
+        stages = sorted({stage for e in events for stage in e['stages']})
+        for stage in sorted(stages, key=lambda s: -sum(e['stages'].get(s, 0) for e in events)):
+            values = [e['stages'][stage] for e in events if stage in e['stages']]
+            print(f"   {stage:<10} {sum(values) / len(values):>7.2f}s {percentile(values, 95):>7.2f}s "
+                  f"{sum(values):>8.1f}s {100 * sum(values) / total:>5.0f}%")
+    print()
+
+
+if __name__ == '__main__':
+    main()
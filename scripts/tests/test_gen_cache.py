@@ -0,0 +1,87 @@
+"""cache_key, GenerationCache eviction and restore_cached"""
+
+import os
+
+from gen_cache import GenerationCache, cache_key, restore_cached
+
+
+def test_cache_key_ignores_param_order():
+    assert (cache_key('burger', 'sd', {'steps': 4, 'guidance': 7.5}, seed=1)
+            == cache_key('burger', 'sd', {'guidance': 7.5, 'steps': 4}, seed=1))
+
+
+def test_cache_key_changes_with_every_input():
+    base = cache_key('burger', 'sd', {'steps': 4}, seed=1)
+    assert cache_key('burger', 'sd') == cache_key('burger', 'sd', {}, None)
+    assert len({base,
+                cache_key('cheeseburger', 'sd', {'steps': 4}, seed=1),
+                cache_key('burger', 'flux', {'steps': 4}, seed=1),
+                cache_key('burger', 'sd', {'steps': 8}, seed=1),
+                cache_key('burger', 'sd', {'steps': 4}, seed=2)}) == 5
+
+
+def stored(cache, name, size, mtime):
+    key = cache_key(name, 'sd')
+    path = cache.store(key, b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return key, path
+
+
+def test_evict_drops_least_recently_used(tmp_path):
+    cache = GenerationCache(tmp_path, max_bytes=250)
+    _, oldest = stored(cache, 'a', 100, 1000)
+    _, middle = stored(cache, 'b', 100, 2000)
+    _, newest = stored(cache, 'c', 100, 3000)
+
+    cache.evict()
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(middle) and os.path.exists(newest)
+
+
+def test_lookup_refreshes_lru_position(tmp_path):
+    cache = GenerationCache(tmp_path, max_bytes=250)
+    key, oldest = stored(cache, 'a', 100, 1000)
+    _, middle = stored(cache, 'b', 100, 2000)
+    stored(cache, 'c', 100, 3000)
+
+    assert cache.lookup(key) == oldest
+    cache.evict()
+
+    assert os.path.exists(oldest)
+    assert not os.path.exists(middle)
+
+
+def test_evict_spares_keep(tmp_path):
+    cache = GenerationCache(tmp_path, max_bytes=150)
+    _, oldest = stored(cache, 'a', 100, 1000)
+    _, newest = stored(cache, 'b', 100, 2000)
+
+    cache.evict(keep=oldest)
+
+    assert os.path.exists(oldest)
+    assert not os.path.exists(newest)
+
+
+def test_restore_cached_skips_stale_jobs(tmp_path):
+    cache = GenerationCache(tmp_path / 'cache')
+    fresh = {'key': cache_key('fresh', 'sd'), 'path': str(tmp_path / 'fresh.jpg')}
+    stale = {'key': cache_key('stale', 'sd'), 'path': str(tmp_path / 'stale.jpg'), 'stale': True}
+    missing = {'key': cache_key('missing', 'sd'), 'path': str(tmp_path / 'missing.jpg')}
+    cache.store(fresh['key'], b'fresh')
+    cache.store(stale['key'], b'stale')
+
+    pending = restore_cached([fresh, stale, missing], cache)
+
+    assert pending == [stale, missing]
+    assert (tmp_path / 'fresh.jpg').read_bytes() == b'fresh'
+    assert not (tmp_path / 'stale.jpg').exists()
+
+
+def test_restore_cached_force_restores_nothing(tmp_path):
+    cache = GenerationCache(tmp_path / 'cache')
+    job = {'key': cache_key('burger', 'sd'), 'path': str(tmp_path / 'burger.jpg')}
+    cache.store(job['key'], b'burger')
+
+    assert restore_cached([job], cache, force=True) == [job]
+    assert not (tmp_path / 'burger.jpg').exists()
@@ -0,0 +1,104 @@
+"""menu_plan.plan_images against a small menu.ts"""
+
+import pytest
+
+from menu_data import load_menu_items, public_file
+from menu_plan import menu_state, plan_images
+
+MENU_TS = """\
+export const MENU_ITEMS: MenuItem[] = [
+  // BURGERS
+  {
+    id: 'classic',
+    name: 'The Classic',
+    description: 'Beef patty, cheese, lettuce',
+    price: 11.99,
+    image: '/images/burgers/classic.jpg',
+    crossSectionImage: '/images/burgers/classic-cross.jpg',
+    category: 'burger',
+  },
+  {
+    id: 'heatwave',
+    name: 'The Heatwave',
+    description: 'Jalapeños, pepperjack cheese',
+    price: 12.99,
+    image: '/images/burgers/heatwave.jpg',
+    crossSectionImage: '/images/burgers/heatwave-cross.jpg',
+    category: 'burger',
+  },
+  // SIDES
+  {
+    id: 'fries',
+    name: 'Fries',
+    description: 'Skin-on fries, sea salt',
+    price: 3.99,
+    image: '/images/sides/fries.jpg',
+    category: 'sides',
+  },
+]
+"""
+
+
+@pytest.fixture
+def items(tmp_path):
+    path = tmp_path / 'menu.ts'
+    path.write_text(MENU_TS, encoding='utf-8')
+    return load_menu_items(str(path))
+
+
+def exists_except(*urls):
+    missing = {public_file(url) for url in urls}
+    return lambda path: path not in missing
+
+
+def edited(items, item_id, **fields):
+    return [dict(item, **fields) if item['id'] == item_id else item for item in items]
+
+
+def test_fixture_parses(items):
+    assert [item['id'] for item in items] == ['classic', 'heatwave', 'fries']
+    assert items[1]['description'] == 'Jalapeños, pepperjack cheese'
+
+
+def test_nothing_to_do(items):
+    assert plan_images(items, menu_state(items), exists_except()) == {}
+
+
+def test_missing(items):
+    planned = plan_images(items, menu_state(items), exists_except('/images/burgers/heatwave-cross.jpg'))
+    assert planned == {'/images/burgers/heatwave-cross.jpg': 'missing'}
+
+
+def test_first_run_plans_missing_files_only(items):
+    assert plan_images(items, None, exists_except('/images/sides/fries.jpg')) == {'/images/sides/fries.jpg': 'missing'}
+
+
+def test_new_item(items):
+    previous = menu_state([item for item in items if item['id'] != 'fries'])
+    assert plan_images(items, previous, exists_except()) == {'/images/sides/fries.jpg': 'new item'}
+
+
+def test_renamed_id_with_known_images_is_not_new(items):
+    previous = menu_state(edited(items, 'fries', id='chips'))
+    assert plan_images(items, previous, exists_except()) == {}
+
+
+def test_name_changed(items):
+    previous = menu_state(items)
+    planned = plan_images(edited(items, 'classic', name='The Original'), previous, exists_except())
+    assert planned == {'/images/burgers/classic.jpg': 'name changed',
+                       '/images/burgers/classic-cross.jpg': 'name changed'}
+
+
+def test_description_changed(items):
+    previous = menu_state(items)
+    planned = plan_images(edited(items, 'fries', description='Curly fries'), previous, exists_except())
+    assert planned == {'/images/sides/fries.jpg': 'description changed'}
+
+
+def test_missing_wins_over_changed(items):
+    previous = menu_state(items)
+    planned = plan_images(edited(items, 'classic', description='Smash patty'), previous,
+                          exists_except('/images/burgers/classic-cross.jpg'))
+    assert planned == {'/images/burgers/classic.jpg': 'description changed',
+                       '/images/burgers/classic-cross.jpg': 'missing'}
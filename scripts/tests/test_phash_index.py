@@ -0,0 +1,73 @@
+"""BKTree radius queries and near_duplicate()"""
+
+import random
+
+import pytest
+
+from phash_index import BKTree, PerceptualIndex, hamming, near_duplicate
+
+
+def test_bktree_matches_brute_force():
+    rng = random.Random(1)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    # Close neighbours of the first few values, so small radii find something
+    values += [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for value in values[:30]]
+    tree = BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, i)
+
+    for query in values[:10] + [rng.getrandbits(64) for _ in range(10)]:
+        for radius in (0, 2, 8, 20):
+            expected = {(hamming(query, value), value, i) for i, value in enumerate(values)
+                        if hamming(query, value) <= radius}
+            assert set(tree.search(query, radius)) == expected
+
+
+def test_bktree_keeps_every_item_of_equal_hashes():
+    tree = BKTree()
+    tree.add(0b1010, 'a')
+    tree.add(0b1010, 'b')
+    tree.add(0b1011, 'c')
+    assert sorted(tree.search(0b1010, 0)) == [(0, 0b1010, 'a'), (0, 0b1010, 'b')]
+    assert sorted(item for _, _, item in tree.search(0b1010, 1)) == ['a', 'b', 'c']
+    assert tree.size == 3
+
+
+def test_bktree_empty():
+    assert BKTree().search(0, 64) == []
+
+
+@pytest.fixture
+def images(tmp_path):
+    """Two copies of one picture (a view and its derived twin) and an unrelated one"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(1)
+    paths = {}
+    for name, seed in (('normal', 1), ('cross', 1), ('other', 2)):
+        pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        if name == 'cross':
+            pixels[0, :4] = rng.integers(0, 256, (4, 3))
+        paths[name] = str(tmp_path / f'{name}.png')
+        Image.fromarray(pixels).save(paths[name])
+    return paths
+
+
+@pytest.fixture
+def index(tmp_path, images):
+    index = PerceptualIndex(path=str(tmp_path / 'index.json'))
+    index.refresh(dirs=[str(tmp_path)])
+    return index
+
+
+def test_near_duplicate_finds_the_copy(index, images):
+    distance, match = near_duplicate(index, {'path': images['cross']})
+    assert match == index.key(images['normal'])
+    assert distance <= index.threshold
+    assert near_duplicate(index, {'path': images['other']}) is None
+
+
+def test_near_duplicate_allows_derived_from(index, images):
+    assert near_duplicate(index, {'path': images['cross'], 'derived_from': [images['normal']]}) is None
+    assert near_duplicate(index, {'path': images['normal'], 'derived_from': [images['cross']]}) is None
@@ -0,0 +1,51 @@
+"""HedgedRouter against the fake_servers.py stand-ins"""
+
+import glob
+import os
+import threading
+import time
+
+import pytest
+
+from fake_servers import FakeServer, HFHandler, PollinationsHandler
+from providers import HFApiProvider, HedgedRouter, PollinationsProvider
+
+JOBS = 8
+
+
+@pytest.fixture
+def racing_servers():
+    # Similar latencies on both sides, so hedged attempts often finish close together
+    servers = [FakeServer(handler, latency='lognormal:0.4,1.0', seed=seed).start()
+               for seed, handler in enumerate((PollinationsHandler, HFHandler))]
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def wait_for_attempts(timeout=30):
+    """Abandoned attempts finish on their own threads; give them time to clean up"""
+    deadline = time.monotonic() + timeout
+    while any(t.name.endswith('-attempt') for t in threading.enumerate()):
+        if time.monotonic() > deadline:
+            raise AssertionError("attempt threads still running")
+        time.sleep(0.05)
+
+
+def test_losing_attempts_leave_no_staging_files(racing_servers, tmp_path):
+    pollinations, hf = racing_servers
+    providers = [PollinationsProvider(pollinations.url, timeout=30), HFApiProvider(hf.url, timeout=30)]
+    for provider in providers:
+        # Hedge almost at once, so every job races both providers
+        provider.initial_p90 = 0.01
+    router = HedgedRouter(providers, state_path=None, max_hedges=1)
+
+    for i in range(JOBS):
+        dest = os.path.join(tmp_path, f'burger-{i}.jpg')
+        router.generate(f'burger {i}', dest, seed=i)
+        assert os.path.exists(dest)
+    wait_for_attempts()
+
+    assert glob.glob(os.path.join(tmp_path, '.tmp-*')) == []
+    assert sum(stats.counts['hedges'] for stats in router.stats.values()) > 0
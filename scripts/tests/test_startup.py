@@ -0,0 +1,55 @@
+"""generate.py --list/--dry-run stay fast and never pull in the heavy dependencies"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench_startup import BACKENDS, GENERATE, HEAVY_MODULES, MODES, import_profile, median_ms
+
+REPO_ROOT = os.path.dirname(os.path.dirname(GENERATE))
+BUDGET_MS = 200.0
+RUNS = 3
+
+
+@pytest.fixture(scope='module')
+def bare_interpreter():
+    """Median start-up of python -c pass and the modules it imports on its own"""
+    return median_ms(['-c', 'pass'], RUNS), {name for name, _ in import_profile(['-c', 'pass'])}
+
+
+def generate(*args):
+    return subprocess.run([sys.executable, GENERATE] + list(args), cwd=REPO_ROOT,
+                          capture_output=True, text=True)
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_no_heavy_imports(backend, mode, tmp_path, bare_interpreter):
+    _, startup_modules = bare_interpreter
+    command = [GENERATE, backend, mode, '--cache-dir', str(tmp_path)]
+    imported = {name.split('.')[0] for name, _ in import_profile(command) if name not in startup_modules}
+    assert imported.isdisjoint(HEAVY_MODULES), sorted(imported & set(HEAVY_MODULES))
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_within_budget(backend, mode, tmp_path, bare_interpreter):
+    baseline, _ = bare_interpreter
+    added = median_ms([GENERATE, backend, mode, '--cache-dir', str(tmp_path)], RUNS) - baseline
+    assert added <= BUDGET_MS, f"{backend} {mode} adds {added:.0f}ms"
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('backend', ['quick', 'hedged'])
+def test_profile(backend, mode, tmp_path):
+    result = generate(backend, mode, '--profile', 'cpu-fast', '--cache-dir', str(tmp_path))
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize('backend', ['pollinations', 'hf-api', 'diffusers'])
+def test_profile_rejected(backend):
+    result = generate(backend, '--list', '--profile', 'cpu-fast')
+    assert result.returncode == 2
+    assert '--profile is not supported' in result.stderr